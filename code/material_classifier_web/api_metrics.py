@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API调用统计模块，记录大模型请求的Token用量和提示词前缀缓存命中情况
+"""
+
+import contextvars
+import threading
+
+# 当前线程（异步任务）中记录的Token总数，用于将Token用量归属到发起请求的分类级
+_context_tokens = contextvars.ContextVar("context_tokens", default=0)
+
+
+class TokenUsageStats:
+    """线程安全的Token用量统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.prompt_cache_hit_tokens = 0
+            self.prompt_cache_miss_tokens = 0
+
+    def record(self, usage):
+        """
+        记录一次API响应中的用量信息
+
+        兼容DeepSeek的 prompt_cache_hit_tokens / prompt_cache_miss_tokens 字段，
+        以及OpenAI格式的 prompt_tokens_details.cached_tokens 字段
+
+        参数:
+            usage: 响应中的usage对象，可以为None
+        """
+        if usage is None:
+            return
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+
+        hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+        if hit_tokens is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit_tokens = getattr(details, "cached_tokens", None) if details is not None else None
+        hit_tokens = hit_tokens or 0
+
+        miss_tokens = getattr(usage, "prompt_cache_miss_tokens", None)
+        if miss_tokens is None:
+            miss_tokens = max(prompt_tokens - hit_tokens, 0)
+
+        _context_tokens.set(_context_tokens.get() + prompt_tokens + completion_tokens)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.prompt_cache_hit_tokens += hit_tokens
+            self.prompt_cache_miss_tokens += miss_tokens
+
+    @staticmethod
+    def context_tokens():
+        """
+        当前线程（异步任务）中累计记录的Token数，调用前后的差值即为期间发出的请求所用Token
+
+        返回值:
+            int: Token数
+        """
+        return _context_tokens.get()
+
+    def snapshot(self):
+        """
+        获取当前统计数据
+
+        返回值:
+            dict: 请求数、各类Token数以及提示词缓存命中率
+        """
+        with self._lock:
+            cached_total = self.prompt_cache_hit_tokens + self.prompt_cache_miss_tokens
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "prompt_cache_hit_tokens": self.prompt_cache_hit_tokens,
+                "prompt_cache_miss_tokens": self.prompt_cache_miss_tokens,
+                "prompt_cache_hit_rate": (self.prompt_cache_hit_tokens / cached_total) if cached_total else 0.0,
+            }
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步物料分类模块
+基于AsyncOpenAI客户端和信号量，在单个进程内保持大量并发的大模型请求
+"""
+
+import asyncio
+import time
+from openai import AsyncOpenAI
+from config import Config
+from logger import logger
+from api_metrics import TokenUsageStats
+from material_classifier import MaterialClassifier
+from circuit_breaker import STATE_OPEN, CircuitOpenError
+from classification_cache import ClassificationCache
+from http_transport import create_async_http_client
+from single_flight import AsyncSingleFlight
+
+# 自适应并发控制器没有空闲名额时，重新尝试占用名额的间隔（秒）
+CONCURRENCY_POLL_INTERVAL = 0.05
+
+
+class AsyncMaterialClassifier:
+    """
+    异步物料分类器
+
+    规则集、物料格式化、响应解析和结果验证与MaterialClassifier共用，
+    仅大模型请求改为异步发送，并通过信号量限制同时进行的请求数；
+    与同步分类器共用限流配额、熔断器和自适应并发控制器，相同物料的并发请求在事件循环内合并。
+    一个实例应在同一个事件循环内使用
+    """
+
+    def __init__(self, max_concurrency=None):
+        """
+        初始化异步物料分类器
+
+        参数:
+            max_concurrency (int): 同时进行的大模型请求上限（默认为Config.ASYNC_MAX_CONCURRENCY）
+        """
+        self.classifier = MaterialClassifier()
+        self.model = self.classifier.model
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+
+        self.client = AsyncOpenAI(
+            api_key=self.classifier.api_key,
+            base_url=self.classifier.api_url,
+            http_client=create_async_http_client(),
+            max_retries=0,  # 重试由_call_deepseek_api统一负责
+        )
+
+        # 本地分类级（含SQLite缓存读写和首次使用时的历史结果导入）在线程池中执行，不阻塞事件循环；
+        # 大模型分类改为异步请求
+        self.local_cascade = self.classifier.cascade.without("deepseek_api")
+
+        # 信号量在首次使用时于当前事件循环中创建
+        self._semaphore = None
+        # 相同物料的并发大模型请求只发送一次
+        self._single_flight = AsyncSingleFlight()
+
+    def _get_semaphore(self):
+        """获取限制并发请求数的信号量"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _request_completion(self, prompt, rule_set, system_prompt=None):
+        """
+        异步发送一次对话补全请求，返回模型输出的文本内容
+
+        参数:
+            prompt (str): 用户提示词
+            rule_set (RuleSet): 提供系统提示词的规则集
+            system_prompt (str): 指定的系统提示词，默认为完整分类规则
+
+        返回值:
+            str: 模型输出内容
+
+        异常:
+            CircuitOpenError: 大模型接口已熔断
+        """
+        messages = self.classifier._build_messages(prompt, rule_set, system_prompt)
+
+        # 与同步分类器共用熔断器，熔断期间直接拒绝
+        circuit_breaker = self.classifier.get_circuit_breaker()
+        circuit_breaker.before_request()
+
+        async with self._get_semaphore():
+            # 与同步分类器共用限流配额，等待时不阻塞事件循环
+            rate_limiter = self.classifier.get_rate_limiter()
+            estimated_tokens = rate_limiter.estimate_tokens(messages)
+            wait = rate_limiter.reserve(estimated_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # 与同步分类器共用自适应并发控制器：在途请求数受其上限约束，限流和服务端错误时降低上限
+            controller = self.classifier.get_concurrency_controller()
+            started_at = controller.try_acquire()
+            while started_at is None:
+                await asyncio.sleep(CONCURRENCY_POLL_INTERVAL)
+                started_at = controller.try_acquire()
+
+            sent_at = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(
+                    messages=messages, **self.classifier._completion_options()
+                )
+            except BaseException as e:
+                # 任务被取消时同样释放名额，但不计为接口失败
+                controller.release(started_at, e)
+                if isinstance(e, Exception):
+                    circuit_breaker.record_failure()
+                raise
+            controller.release(started_at)
+            circuit_breaker.record_success()
+            # 与同步分类器共用耗时分布统计
+            self.classifier.get_request_hedger().latency.record(time.monotonic() - sent_at)
+            rate_limiter.settle(estimated_tokens, self.classifier._total_tokens(response))
+
+        return self.classifier._extract_content(response)
+
+    async def _call_deepseek_api(self, prompt, rule_set=None, system_prompt=None):
+        """
+        异步调用DeepSeek API，失败时指数退避重试
+
+        参数:
+            prompt (str): 请求的提示词
+            rule_set (RuleSet): 本次分类使用的规则集（默认为当前规则集）
+            system_prompt (str): 指定的系统提示词，默认为完整分类规则
+
+        返回值:
+            dict: API返回的分类结果
+
+        异常:
+            Exception: API调用异常
+        """
+        rule_set = rule_set or self.classifier.rule_set
+
+        for attempt in range(Config.MAX_RETRIES):
+            try:
+                content = await self._request_completion(prompt, rule_set, system_prompt)
+                parsed_result = self.classifier._parse_classification_content(content)
+
+                # 添加分类来源信息
+                parsed_result["classification_source"] = "deepseek_api"
+
+                return parsed_result
+
+            except CircuitOpenError:
+                # 熔断期间不重试也不退避，直接推迟该物料
+                raise
+
+            except Exception as e:
+                logger.error(
+                    f"API调用失败 (尝试 {attempt+1}/{Config.MAX_RETRIES}): {str(e)}"
+                )
+
+                # 本次失败导致熔断时不再退避重试
+                if attempt < Config.MAX_RETRIES - 1 and self.classifier.get_circuit_breaker().state != STATE_OPEN:
+                    await asyncio.sleep(2**attempt)  # 指数退避，不阻塞其他请求
+                else:
+                    raise
+
+    def _record_llm_tier(self, started, tokens, hit):
+        """将一次异步大模型分类计入分级统计（与同步分类器的大模型分类级共用统计项）"""
+        self.local_cascade.stats.record(
+            "deepseek_api",
+            1,
+            int(hit),
+            int(not hit),
+            time.perf_counter() - started,
+            TokenUsageStats.context_tokens() - tokens,
+        )
+
+    async def _classify_by_llm(self, formatted_data, material_info, rule_set):
+        """
+        异步调用大模型分类，验证通过后写入缓存
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果
+        """
+        result = await self._call_deepseek_api(
+            self.classifier._generate_prompt(material_info),
+            rule_set,
+            self.classifier._select_system_prompt(formatted_data, rule_set),
+        )
+        self.classifier.validate_classification_result(result, rule_set)
+        await asyncio.to_thread(self.classifier._cache_result, formatted_data, rule_set, result)
+        return result
+
+    async def classify_material(self, material_data):
+        """
+        异步对单个物料进行分类
+
+        参数:
+            material_data (dict): 物料数据，包含"物料名称", "图号/型号", "材料", "分类/品牌"等键
+
+        返回值:
+            dict: 分类结果，包含"main_category"和"sub_category"键
+
+        异常:
+            Exception: 分类失败异常
+        """
+        # 整个分类过程固定使用同一个规则集，规则热加载不影响进行中的分类
+        rule_set = self.classifier.rule_set
+        formatted_data, material_info = self.classifier._format_material(material_data)
+
+        try:
+            logger.info(f"开始分类物料: {material_info}")
+
+            # 步骤1: 依次尝试关键词、缓存、型号前缀、近邻、品牌先验等本地分类级
+            result = await asyncio.to_thread(self.local_cascade.classify, formatted_data, material_info, rule_set)
+            if result:
+                return result
+
+            logger.info("本地关键词匹配失败，将使用大模型进行分类...")
+
+            # 步骤2: 异步调用API进行分类，相同物料的并发请求只发送一次；按大模型分类级计入统计
+            started, tokens = time.perf_counter(), TokenUsageStats.context_tokens()
+            flight_key = ClassificationCache.make_key(formatted_data, rule_set.version, self.model)
+            try:
+                result, shared = await self._single_flight.do(
+                    flight_key, lambda: self._classify_by_llm(formatted_data, material_info, rule_set)
+                )
+            except Exception:
+                self._record_llm_tier(started, tokens, hit=False)
+                raise
+            self._record_llm_tier(started, tokens, hit=True)
+            if shared:
+                logger.info(f"合并相同物料的大模型请求: {material_info} -> {result}")
+            result = dict(result)
+
+            logger.info(f"大模型分类成功: {material_info} -> {result}")
+            return result
+
+        except Exception as e:
+            logger.error(f"物料分类失败: {material_info} -> {str(e)}")
+            raise
+
+    async def classify_batch(self, materials_list):
+        """
+        异步批量分类物料，所有物料并发处理，大模型请求数受信号量限制
+
+        参数:
+            materials_list (list): 物料数据列表
+
+        返回值:
+            list: 与materials_list一一对应的分类结果列表，格式同MaterialClassifier.classify_batch
+        """
+        async def classify_one(material):
+            try:
+                classification_result = await self.classify_material(material)
+                return {"original_data": material, "classification": classification_result, "status": "success"}
+            except Exception as e:
+                return self.classifier._error_result(material, e)
+
+        return await asyncio.gather(*(classify_one(material) for material in materials_list))
+
+    async def aclose(self):
+        """关闭异步HTTP客户端"""
+        await self.client.close()
+
+
+def classify_batch_async(materials_list, max_concurrency=None):
+    """
+    在新的事件循环中运行异步批量分类，供同步代码调用
+
+    参数:
+        materials_list (list): 物料数据列表
+        max_concurrency (int): 同时进行的大模型请求上限（默认为Config.ASYNC_MAX_CONCURRENCY）
+
+    返回值:
+        list: 分类结果列表，格式同MaterialClassifier.classify_batch
+    """
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency)
+        try:
+            return await classifier.classify_batch(materials_list)
+        finally:
+            await classifier.aclose()
+
+    return asyncio.run(run())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌/供应商分类先验模块
+由历史分类结果统计每个品牌和供应商下各分类出现的次数，用于在多个关键词匹配之间排序，
+以及在某个分类占绝对多数时直接给出分类及其置信度
+"""
+
+from result_history import ResultHistory
+
+
+def normalize_party(name):
+    """
+    标准化品牌/供应商名称：转小写并去除空白字符，与关键词匹配的标准化方式一致
+
+    参数:
+        name: 品牌或供应商名称
+
+    返回值:
+        str: 标准化后的名称
+    """
+    if not name or (isinstance(name, float) and name != name):
+        return ""
+    return str(name).lower().strip().replace(" ", "").replace("\t", "").replace("\n", "")
+
+
+class BrandPrior(ResultHistory):
+    """
+    品牌/供应商 -> 分类频次表
+
+    每个品牌（供应商）记录各分类的次数、总次数和当前次数最多的分类，查询均为O(1)的字典访问
+    """
+
+    FORMAT_VERSION = 2
+    DESCRIPTION = "品牌分类先验表"
+
+    # 统计维度：(物料数据中的字段, 说明)
+    FIELDS = (("品牌", "品牌"), ("供应商", "供应商"))
+
+    def _clear(self):
+        """清空频次表"""
+        super()._clear()
+        # 字段 -> {标准化名称: [总次数, 多数分类, {分类: 次数}]}
+        self._tables = {field: {} for field, _ in self.FIELDS}
+
+    def __len__(self):
+        """已统计的品牌和供应商数"""
+        return sum(len(table) for table in self._tables.values())
+
+    def add_record(self, formatted_data, label):
+        """
+        导入一条历史分类结果
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据，包含"品牌"、"供应商"等键
+            label (tuple): (大类, 二级类)
+        """
+        for field, _ in self.FIELDS:
+            name = normalize_party(formatted_data.get(field))
+            if not name:
+                continue
+            entry = self._tables[field].setdefault(name, [0, None, {}])
+            counts = entry[2]
+            counts[label] = counts.get(label, 0) + 1
+            entry[0] += 1
+            if entry[1] is None or counts[label] > counts[entry[1]]:
+                entry[1] = label
+
+    def count(self, field, name, label):
+        """
+        查询某品牌（供应商）下某分类的历史次数
+
+        参数:
+            field (str): "品牌" 或 "供应商"
+            name (str): 标准化后的名称
+            label (tuple): (大类, 二级类)
+
+        返回值:
+            int: 历史次数
+        """
+        entry = self._tables[field].get(name)
+        return entry[2].get(label, 0) if entry else 0
+
+    def rank(self, candidates, normalized_brand, normalized_supplier=""):
+        """
+        按历史频次从候选分类中选出最可能的分类
+
+        参数:
+            candidates (list): [(大类, 二级类), ...]，按规则表顺序排列
+            normalized_brand (str): 标准化后的物料品牌
+            normalized_supplier (str): 标准化后的供应商
+
+        返回值:
+            tuple: 历史次数最多的候选分类（次数相同时取规则表中靠前的）；所有候选均无历史记录时返回None
+        """
+        best, best_count = None, 0
+        for label in candidates:
+            label_count = self.count("品牌", normalized_brand, label) + self.count("供应商", normalized_supplier, label)
+            if label_count > best_count:
+                best, best_count = label, label_count
+        return best
+
+    def predict(self, normalized_brand, normalized_supplier, min_support, min_share):
+        """
+        当品牌（或供应商）下某个分类占绝对多数时给出该分类
+
+        参数:
+            normalized_brand (str): 标准化后的物料品牌
+            normalized_supplier (str): 标准化后的供应商
+            min_support (int): 品牌（供应商）的最少历史次数
+            min_share (float): 多数分类的最低占比（0~1），作为置信度
+
+        返回值:
+            tuple: ((大类, 二级类), 置信度, 依据字段)，品牌和供应商都满足时取置信度较高的；否则返回None
+        """
+        prediction = None
+        for (field, description), name in zip(self.FIELDS, (normalized_brand, normalized_supplier)):
+            entry = self._tables[field].get(name) if name else None
+            if not entry or entry[0] < min_support:
+                continue
+            total, label, counts = entry
+            share = counts[label] / total
+            if share >= min_share and (prediction is None or share > prediction[1]):
+                prediction = (label, round(share, 3), description)
+        return prediction
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+候选分类检索模块
+按字符二元组与分类规则（分类名、关键词、释义、常用品牌）的重合程度为物料挑选候选二级分类，
+用于构建只包含候选分类的精简提示词
+"""
+
+import math
+
+
+def _normalize_text(text):
+    """标准化文本：转小写并去除空白字符"""
+    return "".join(str(text).lower().split()) if text else ""
+
+
+def _bigrams(text):
+    """文本的字符二元组集合"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class CandidateRetriever:
+    """
+    候选分类检索器
+
+    每条规则的文本切分为字符二元组并建立倒排索引，二元组按IDF加权，
+    规则得分按规则文本长度归一化，避免释义较长的规则总是排在前面
+    """
+
+    def __init__(self, classification_mapping):
+        """
+        初始化检索器
+
+        参数:
+            classification_mapping: 分类映射字典
+                格式: {(normalized_main, normalized_sub): (original_main, original_sub, keywords, explanation, common_brands)}
+        """
+        self._keys = list(classification_mapping.keys())
+
+        rule_grams = []
+        for orig_main, orig_sub, keywords, explanation, common_brands in classification_mapping.values():
+            grams = set()
+            for text in (orig_main, orig_sub, keywords, explanation, common_brands):
+                grams |= _bigrams(_normalize_text(text))
+            rule_grams.append(grams)
+
+        document_frequency = {}
+        for grams in rule_grams:
+            for gram in grams:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+
+        # 二元组 -> ((规则序号, 权重), ...)，权重 = IDF / sqrt(规则二元组数)
+        rule_count = len(rule_grams)
+        postings = {}
+        for rule_index, grams in enumerate(rule_grams):
+            length_norm = math.sqrt(len(grams)) or 1.0
+            for gram in grams:
+                weight = math.log(rule_count / document_frequency[gram]) / length_norm
+                if weight > 0:
+                    postings.setdefault(gram, []).append((rule_index, weight))
+        self._postings = {gram: tuple(entries) for gram, entries in postings.items()}
+
+    def score(self, text):
+        """
+        计算物料文本与各规则的相关度
+
+        参数:
+            text (str): 物料文本
+
+        返回值:
+            list: 按得分从高到低排列的 (得分, 规则序号)
+        """
+        scores = {}
+        for gram in _bigrams(_normalize_text(text)):
+            for rule_index, weight in self._postings.get(gram, ()):
+                scores[rule_index] = scores.get(rule_index, 0.0) + weight
+        return sorted(((score, rule_index) for rule_index, score in scores.items()), key=lambda item: (-item[0], item[1]))
+
+    def retrieve(self, text, top_k, min_score):
+        """
+        检索候选分类
+
+        参数:
+            text (str): 物料文本
+            top_k (int): 最多返回的候选数
+            min_score (float): 最高得分低于该值时认为置信度不足
+
+        返回值:
+            list: 候选分类在分类映射中的键，按相关度排列；置信度不足时返回None
+        """
+        ranked = self.score(text)
+        if not ranked or ranked[0][0] < min_score:
+            return None
+        return [self._keys[rule_index] for _, rule_index in ranked[:top_k]]
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分级分类流水线模块
+分类方式（关键词、缓存、历史结果、近邻索引、大模型等）按顺序注册为若干级，
+每一级返回分类结果或放行给下一级，并按级统计命中率、耗时和成本（大模型Token数）
+"""
+
+import threading
+import time
+
+
+class CascadeTier:
+    """
+    流水线中的一级分类方式
+
+    classify(formatted_data, material_info, rule_set) 返回分类结果，未命中时返回None（放行给下一级），
+    出错时抛出异常；classify_batch(items, rule_set, **options) 一次处理多条物料，
+    返回与items一一对应的分类结果、None或异常对象，未提供时逐条调用classify
+    """
+
+    def __init__(self, name, classify, classify_batch=None, cost_meter=None):
+        """
+        初始化分类级
+
+        参数:
+            name (str): 分类级名称（统计时使用）
+            classify (callable): 单条分类函数
+            classify_batch (callable): 批量分类函数，默认逐条调用classify
+            cost_meter (callable): 返回当前线程（异步任务）累计成本的函数，前后差值记为本级成本；为None时成本为0
+        """
+        self.name = name
+        self.classify = classify
+        self._classify_batch = classify_batch
+        self.cost_meter = cost_meter
+
+    def classify_batch(self, items, rule_set, **options):
+        """
+        批量分类
+
+        参数:
+            items (list): [(formatted_data, material_info), ...]
+            rule_set (RuleSet): 本次分类使用的规则集
+            **options: 传给批量分类函数的附加参数（逐条分类时忽略）
+
+        返回值:
+            list: 与items一一对应的分类结果、None（未命中）或异常对象（分类失败）
+        """
+        if self._classify_batch is not None:
+            return self._classify_batch(items, rule_set, **options)
+
+        outcomes = []
+        for formatted_data, material_info in items:
+            try:
+                outcomes.append(self.classify(formatted_data, material_info, rule_set))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    def cost(self):
+        """当前线程（异步任务）的累计成本"""
+        return self.cost_meter() if self.cost_meter is not None else 0
+
+
+class CascadeStats:
+    """线程安全的分级统计：每级处理的物料数、命中数、失败数、累计耗时和成本"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self._tiers = {}
+
+    def record(self, name, items, hits, errors, seconds, cost=0):
+        """
+        记录一级分类的一次运行
+
+        参数:
+            name (str): 分类级名称
+            items (int): 本次处理的物料数
+            hits (int): 命中（得到分类结果）的物料数
+            errors (int): 分类失败的物料数
+            seconds (float): 耗时（秒）
+            cost (float): 成本（大模型Token数）
+        """
+        with self._lock:
+            tier = self._tiers.setdefault(name, {"items": 0, "hits": 0, "errors": 0, "seconds": 0.0, "cost": 0})
+            tier["items"] += items
+            tier["hits"] += hits
+            tier["errors"] += errors
+            tier["seconds"] += seconds
+            tier["cost"] += cost
+
+    def snapshot(self):
+        """
+        获取当前统计数据
+
+        返回值:
+            dict: {分类级名称: {"items", "hits", "errors", "hit_rate", "seconds", "avg_latency_ms", "cost"}}，
+                按首次运行的顺序排列
+        """
+        with self._lock:
+            return {
+                name: {
+                    "items": tier["items"],
+                    "hits": tier["hits"],
+                    "errors": tier["errors"],
+                    "hit_rate": (tier["hits"] / tier["items"]) if tier["items"] else 0.0,
+                    "seconds": tier["seconds"],
+                    "avg_latency_ms": (tier["seconds"] * 1000 / tier["items"]) if tier["items"] else 0.0,
+                    "cost": tier["cost"],
+                }
+                for name, tier in self._tiers.items()
+            }
+
+
+class ClassificationCascade:
+    """
+    分级分类流水线
+
+    物料依次经过各级分类，在第一个命中的级别返回；批量分类时同一级的所有待分类物料一起处理，
+    未命中的物料整体进入下一级
+    """
+
+    def __init__(self, tiers=(), stats=None):
+        """
+        初始化流水线
+
+        参数:
+            tiers (iterable): 按顺序排列的CascadeTier
+            stats (CascadeStats): 统计对象，多个流水线可共享；默认新建
+        """
+        self._tiers = []
+        self.stats = stats if stats is not None else CascadeStats()
+        for tier in tiers:
+            self.register(tier)
+
+    @property
+    def names(self):
+        """按顺序排列的分类级名称"""
+        return tuple(tier.name for tier in self._tiers)
+
+    def register(self, tier, before=None):
+        """
+        注册一级分类
+
+        参数:
+            tier (CascadeTier): 分类级
+            before (str): 插入到该名称的分类级之前，默认追加到末尾
+
+        异常:
+            ValueError: 名称重复或before指定的分类级不存在
+        """
+        if tier.name in self.names:
+            raise ValueError(f"分类级名称重复: {tier.name}")
+        if before is None:
+            self._tiers.append(tier)
+            return
+        if before not in self.names:
+            raise ValueError(f"分类级不存在: {before}")
+        self._tiers.insert(self.names.index(before), tier)
+
+    def without(self, *names):
+        """
+        去掉指定分类级后的新流水线，与原流水线共享统计
+
+        参数:
+            *names: 要去掉的分类级名称
+
+        返回值:
+            ClassificationCascade: 新流水线
+        """
+        return ClassificationCascade([tier for tier in self._tiers if tier.name not in names], self.stats)
+
+    def classify(self, formatted_data, material_info, rule_set):
+        """
+        单条物料依次经过各级分类
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 第一个命中的分类级给出的分类结果，各级均未命中时返回None
+
+        异常:
+            Exception: 某一级分类出错时直接抛出，不再尝试后续分类级
+        """
+        for tier in self._tiers:
+            started, cost = time.perf_counter(), tier.cost()
+            try:
+                result = tier.classify(formatted_data, material_info, rule_set)
+            except Exception:
+                self.stats.record(tier.name, 1, 0, 1, time.perf_counter() - started, tier.cost() - cost)
+                raise
+            self.stats.record(tier.name, 1, int(bool(result)), 0, time.perf_counter() - started, tier.cost() - cost)
+            if result:
+                return result
+        return None
+
+    def classify_batch(self, items, rule_set, **options):
+        """
+        批量物料依次经过各级分类，每级一次处理全部待分类物料
+
+        参数:
+            items (list): [(formatted_data, material_info), ...]
+            rule_set (RuleSet): 本次分类使用的规则集
+            **options: 传给各级批量分类函数的附加参数
+
+        返回值:
+            list: 与items一一对应的分类结果、异常对象（分类失败）或None（各级均未命中）
+        """
+        outcomes = [None] * len(items)
+        pending = list(range(len(items)))
+
+        for tier in self._tiers:
+            if not pending:
+                break
+
+            started, cost = time.perf_counter(), tier.cost()
+            try:
+                tier_outcomes = tier.classify_batch([items[index] for index in pending], rule_set, **options)
+            except Exception as e:
+                tier_outcomes = [e] * len(pending)
+
+            remaining = []
+            hits = errors = 0
+            for index, outcome in zip(pending, tier_outcomes):
+                if not outcome:
+                    remaining.append(index)
+                    continue
+                outcomes[index] = outcome
+                if isinstance(outcome, Exception):
+                    errors += 1
+                else:
+                    hits += 1
+
+            self.stats.record(tier.name, len(pending), hits, errors, time.perf_counter() - started, tier.cost() - cost)
+            pending = remaining
+
+        return outcomes
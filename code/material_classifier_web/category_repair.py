@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分类名称修复模块
+大模型返回的分类名称与分类标准略有出入时（全角符号、分隔符不同、缺少后半部分、
+二级类正确但大类错误等），在本地找到对应的标准分类，避免整次请求作废
+"""
+
+import difflib
+import re
+import unicodedata
+
+# 分类名称中可互换的分隔符和括号，规范化时全部去掉
+_SEPARATORS = re.compile(r"[\s、,，/／\\|;；:：·.。()（）\[\]【】_-]+")
+
+# 二级类与标准二级类中某一段（按分隔符切分）完全一致时的得分
+SEGMENT_MATCH_SCORE = 0.9
+
+# 二级类与标准二级类互相包含时的得分
+CONTAINMENT_MATCH_SCORE = 0.9
+
+# 否定前缀：字符相似但含义相反（如"非接触式"与"接触式"），两者的否定字不一致时不修复
+_NEGATIONS = "非无不"
+
+# 模糊匹配的优先级：分段一致 > 互相包含 > 字符相似度
+_TIER_SEGMENT, _TIER_CONTAINMENT, _TIER_RATIO = 2, 1, 0
+
+
+def canonical_name(name):
+    """
+    分类名称的规范形式：全角转半角、转小写、去除分隔符和空白
+
+    参数:
+        name: 分类名称
+
+    返回值:
+        str: 规范化后的名称
+    """
+    if not name:
+        return ""
+    return _SEPARATORS.sub("", unicodedata.normalize("NFKC", str(name)).lower())
+
+
+def _negations(canonical):
+    """名称中的否定字（排序后），用于识别含义相反的分类"""
+    return sorted(ch for ch in canonical if ch in _NEGATIONS)
+
+
+def _segments(name):
+    """按分隔符切分名称，返回各段的规范形式"""
+    text = unicodedata.normalize("NFKC", str(name)).lower()
+    return {segment for segment in _SEPARATORS.split(text) if segment}
+
+
+class CategoryRepairer:
+    """
+    分类名称修复器
+
+    构建时预先计算所有分类的规范名称索引，修复时依次尝试：
+    规范名称完全一致 -> 二级类唯一对应某个大类 -> 二级类模糊匹配
+    （分段一致优先于互相包含，再优先于字符相似度；否定字不一致的分类不参与模糊匹配）
+    """
+
+    def __init__(self, classification_mapping):
+        """
+        初始化修复器
+
+        参数:
+            classification_mapping: 分类映射字典
+                格式: {(normalized_main, normalized_sub): (original_main, original_sub, keywords, explanation, common_brands)}
+        """
+        self._pairs = {}
+        self._subs = {}
+        self._mains = {}
+        self._entries = []
+
+        for key, (orig_main, orig_sub, _, _, _) in classification_mapping.items():
+            canonical_main = canonical_name(orig_main)
+            canonical_sub = canonical_name(orig_sub)
+            self._pairs.setdefault((canonical_main, canonical_sub), []).append(key)
+            self._subs.setdefault(canonical_sub, []).append(key)
+            self._mains.setdefault(canonical_main, []).append(len(self._entries))
+            self._entries.append((key, canonical_sub, _segments(orig_sub)))
+
+    def repair(self, main_category, sub_category, min_score):
+        """
+        为不符合标准的分类结果查找对应的标准分类
+
+        参数:
+            main_category: 模型返回的大类
+            sub_category: 模型返回的二级类
+            min_score (float): 模糊匹配的最低相似度（0~1）
+
+        返回值:
+            tuple: (分类映射中的键, 修复方式, 得分)；无法可靠修复时返回None
+                修复方式为 normalized / sub_category / fuzzy
+        """
+        canonical_main = canonical_name(main_category)
+        canonical_sub = canonical_name(sub_category)
+        if not canonical_sub:
+            return None
+
+        keys = self._pairs.get((canonical_main, canonical_sub), [])
+        if len(keys) == 1:
+            return keys[0], "normalized", 1.0
+
+        # 二级类存在但挂在其他大类下
+        keys = self._subs.get(canonical_sub, [])
+        if len(keys) == 1:
+            return keys[0], "sub_category", 1.0
+
+        # 大类正确时只在该大类下模糊匹配二级类
+        entry_indexes = self._mains.get(canonical_main, range(len(self._entries)))
+        negations = _negations(canonical_sub)
+        scored = sorted(
+            (
+                (self._sub_rank(canonical_sub, index), index)
+                for index in entry_indexes
+                if _negations(self._entries[index][1]) == negations
+            ),
+            reverse=True,
+        )
+        if not scored:
+            return None
+
+        best_rank, best_index = scored[0]
+        best_score = self._rank_score(best_rank)
+        # 得分不足或与第二名并列时不修复，交由调用方按原逻辑处理
+        if best_score < min_score or (len(scored) > 1 and scored[1][0] == best_rank):
+            return None
+        return self._entries[best_index][0], "fuzzy", round(best_score, 3)
+
+    def _sub_rank(self, canonical_sub, entry_index):
+        """
+        二级类与第entry_index个标准分类的匹配排序键
+
+        返回值:
+            tuple: (匹配优先级, 字符相似度)
+        """
+        _, candidate_sub, segments = self._entries[entry_index]
+        ratio = difflib.SequenceMatcher(None, canonical_sub, candidate_sub).ratio()
+        if canonical_sub in segments:
+            return _TIER_SEGMENT, ratio
+        if candidate_sub and (canonical_sub in candidate_sub or candidate_sub in canonical_sub):
+            return _TIER_CONTAINMENT, ratio
+        return _TIER_RATIO, ratio
+
+    @staticmethod
+    def _rank_score(rank):
+        """排序键对应的修复得分"""
+        tier, ratio = rank
+        if tier == _TIER_SEGMENT:
+            return max(ratio, SEGMENT_MATCH_SCORE)
+        if tier == _TIER_CONTAINMENT:
+            return max(ratio, CONTAINMENT_MATCH_SCORE)
+        return ratio
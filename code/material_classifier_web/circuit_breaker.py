@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型请求熔断模块
+连续失败达到阈值后熔断，熔断期间直接拒绝请求；冷却时间过后放行一个探测请求，
+探测成功则恢复，失败则重新熔断
+"""
+
+import threading
+import time
+from logger import logger
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝发送请求"""
+
+
+class CircuitBreaker:
+    """
+    线程安全的熔断器，在所有分类线程之间共享
+    """
+
+    def __init__(self, failure_threshold, recovery_timeout, clock=time.monotonic):
+        """
+        初始化熔断器
+
+        参数:
+            failure_threshold (int): 触发熔断的连续失败次数
+            recovery_timeout (float): 熔断后放行探测请求前的冷却时间（秒）
+            clock: 单调时钟函数，便于测试替换
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._rejected = 0
+
+    @property
+    def state(self):
+        """当前状态（closed / open / half_open）"""
+        with self._lock:
+            return self._state
+
+    def before_request(self):
+        """
+        发送请求前调用，熔断期间抛出CircuitOpenError
+
+        异常:
+            CircuitOpenError: 熔断器处于打开状态，或半开状态下已有探测请求
+        """
+        with self._lock:
+            if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("熔断冷却结束，放行探测请求")
+
+            if self._state == STATE_CLOSED:
+                return
+            if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+
+            self._rejected += 1
+            raise CircuitOpenError(f"大模型接口已熔断（连续失败 {self._failures} 次），请求已推迟")
+
+    def record_success(self):
+        """请求成功，关闭熔断器并清零失败计数"""
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info("探测请求成功，熔断器恢复")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """请求失败，连续失败达到阈值或探测失败时打开熔断器"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == STATE_HALF_OPEN or (
+                self._state == STATE_CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = STATE_OPEN
+                self._opened_at = self._clock()
+                logger.error(
+                    f"API连续失败 {self._failures} 次，熔断 {self.recovery_timeout} 秒，期间的请求将直接推迟"
+                )
+
+    def snapshot(self):
+        """
+        获取熔断器状态
+
+        返回值:
+            dict: 状态、连续失败次数和被拒绝的请求数
+        """
+        with self._lock:
+            return {"state": self._state, "failures": self._failures, "rejected": self._rejected}
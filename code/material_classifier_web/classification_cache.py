@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型分类结果缓存模块
+使用本地SQLite数据库持久化大模型的分类结果，键为标准化后的物料字段、规则集版本和模型名称，
+分类说明文件变化后旧版本的结果不再命中，超过容量时按最近最少使用淘汰（旧版本结果随之清除）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from logger import logger
+
+# 每写入多少条结果检查一次容量
+EVICTION_CHECK_INTERVAL = 100
+
+
+def normalize_material_fields(formatted_data):
+    """
+    标准化物料字段，用于生成缓存键
+
+    参数:
+        formatted_data (dict): 格式化后的物料数据（见MaterialClassifier._format_material）
+
+    返回值:
+        dict: 去除首尾空白、合并连续空白并统一大小写后的非空字段
+    """
+    normalized = {}
+    for key, value in formatted_data.items():
+        text = " ".join(str(value).split()).casefold() if value is not None else ""
+        if text:
+            normalized[key] = text
+    return normalized
+
+
+class ClassificationCache:
+    """
+    线程安全的大模型分类结果缓存
+    """
+
+    def __init__(self, db_file, max_entries):
+        """
+        初始化缓存，数据库文件不存在时自动创建
+
+        参数:
+            db_file (str): SQLite数据库文件路径
+            max_entries (int): 最多保留的结果条数（0表示不限制）
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS classification_cache ("
+                "cache_key TEXT PRIMARY KEY, "
+                "rule_version TEXT NOT NULL, "
+                "result TEXT NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_classification_cache_last_used "
+                "ON classification_cache (last_used)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(formatted_data, rule_version, model):
+        """
+        生成缓存键
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            rule_version (str): 规则集版本（分类说明文件内容哈希）
+            model (str): 模型名称
+
+        返回值:
+            str: 缓存键
+        """
+        payload = json.dumps(
+            [normalize_material_fields(formatted_data), rule_version, model],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, formatted_data, rule_version, model):
+        """
+        查询缓存的分类结果
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            rule_version (str): 规则集版本
+            model (str): 模型名称
+
+        返回值:
+            dict: 缓存的分类结果，未命中时返回None
+        """
+        key = self.make_key(formatted_data, rule_version, model)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM classification_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE classification_cache SET last_used = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, formatted_data, rule_version, model, result):
+        """
+        写入分类结果
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            rule_version (str): 规则集版本
+            model (str): 模型名称
+            result (dict): 分类结果
+        """
+        key = self.make_key(formatted_data, rule_version, model)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classification_cache (cache_key, rule_version, result, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, rule_version, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+            self._writes += 1
+            if self.max_entries and self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近使用时间淘汰超出容量的结果（调用方需持有锁）"""
+        deleted = self._conn.execute(
+            "DELETE FROM classification_cache WHERE cache_key IN ("
+            "SELECT cache_key FROM classification_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        if deleted:
+            logger.info(f"分类结果缓存超出容量，淘汰 {deleted} 条最近最少使用的结果")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型请求自适应并发控制模块
+采用AIMD（加性增、乘性减）策略：请求健康时逐步提高并发上限，
+遇到限流（429）、服务端错误（5xx）或超时时按比例降低并发上限
+"""
+
+import threading
+import time
+import openai
+from logger import logger
+
+
+def is_overload_error(error):
+    """
+    判断异常是否表示服务端过载（限流、5xx或超时）
+
+    参数:
+        error (Exception): 请求抛出的异常
+
+    返回值:
+        bool: 是否需要降低并发
+    """
+    if isinstance(error, (openai.APITimeoutError, TimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+class AdaptiveConcurrencyController:
+    """
+    线程安全的AIMD并发控制器
+
+    每个大模型请求发送前调用acquire()，完成后调用release()报告耗时和结果
+    """
+
+    def __init__(self, initial_limit, min_limit, max_limit, target_latency,
+                 backoff_ratio=0.5, latency_smoothing=0.2, clock=time.monotonic):
+        """
+        初始化并发控制器
+
+        参数:
+            initial_limit (int): 初始并发上限
+            min_limit (int): 并发上限的下限
+            max_limit (int): 并发上限的上限
+            target_latency (float): 目标请求耗时（秒），平滑耗时超过该值时不再提高并发
+            backoff_ratio (float): 过载时并发上限的缩小比例
+            latency_smoothing (float): 耗时指数移动平均的平滑系数
+            clock: 单调时钟函数，便于测试替换
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff_ratio = backoff_ratio
+        self.latency_smoothing = latency_smoothing
+        self._clock = clock
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._latency = None
+        self._throttle_events = 0
+        # 最近一次降低并发的时间，在此之前发出的请求再失败不重复降低
+        self._last_backoff = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """当前并发上限"""
+        return int(self._limit)
+
+    def acquire(self):
+        """
+        等待直到在途请求数低于当前并发上限，并占用一个名额
+
+        返回值:
+            float: 请求开始时间，需要在release()时传回
+        """
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            return self._clock()
+
+    def try_acquire(self):
+        """
+        在途请求数低于当前并发上限时占用一个名额，否则立即返回（供异步分类器轮询，不阻塞事件循环）
+
+        返回值:
+            float: 请求开始时间，需要在release()时传回；没有空闲名额时返回None
+        """
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                return None
+            self._in_flight += 1
+            return self._clock()
+
+    def release(self, started_at, error=None):
+        """
+        释放名额并根据请求结果调整并发上限
+
+        参数:
+            started_at (float): acquire()返回的请求开始时间
+            error (Exception): 请求失败时的异常，成功时为None
+        """
+        latency = self._clock() - started_at
+        with self._condition:
+            self._in_flight -= 1
+
+            if error is not None and is_overload_error(error):
+                self._throttle_events += 1
+                if self._last_backoff is None or started_at >= self._last_backoff:
+                    # 乘性减：同一批在途请求只降低一次
+                    old_limit = self.limit
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_backoff = self._clock()
+                    logger.warning(f"大模型请求过载({type(error).__name__})，并发上限 {old_limit} -> {self.limit}")
+            elif error is None:
+                if self._latency is None:
+                    self._latency = latency
+                else:
+                    self._latency += self.latency_smoothing * (latency - self._latency)
+
+                if self._latency <= self.target_latency:
+                    # 加性增：每个并发上限窗口的请求全部成功后上限加1
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """
+        获取当前并发控制状态
+
+        返回值:
+            dict: 并发上限、在途请求数、平滑耗时（秒）和限流事件数
+        """
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "latency": self._latency,
+                "throttle_events": self._throttle_events,
+            }
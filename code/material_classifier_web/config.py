@@ -11,8 +11,13 @@ class Config:
     DEEPSEEK_MODEL = "deepseek-chat"  # 使用的模型
 
     # ==================== 请求配置 ====================
-    REQUEST_TIMEOUT = 30  # API请求超时时间（秒）
+    REQUEST_TIMEOUT = 30  # API请求超时时间（秒），包括读取响应、发送请求和等待空闲连接
+    HTTP_CONNECT_TIMEOUT = 5  # 建立连接超时时间（秒）
     MAX_RETRIES = 3  # 最大重试次数
+    HTTP_POOL_SIZE = 100  # HTTP连接池最大连接数（所有分类线程共享）
+    HTTP_KEEPALIVE_CONNECTIONS = 32  # 连接池中保持的空闲长连接数
+    HTTP_KEEPALIVE_EXPIRY = 60  # 空闲长连接保持时间（秒）
+    HTTP2_ENABLED = False  # 是否启用HTTP/2（需要安装 httpx[http2]）
 
     # ==================== 日志配置 ====================
     LOG_FILE = "material_classification.log"  # 日志文件路径
@@ -20,13 +25,52 @@ class Config:
 
     # ==================== 分类说明文件配置 ====================
     CLASSIFICATION_EXPLANATION_FILE = "./分类说明.xlsx"  # 分类说明文件路径
+    RULE_SNAPSHOT_FILE = "./.cache/rule_set_snapshot.pkl"  # 规则集快照路径（按分类说明文件内容哈希失效，设为空则不使用）
+    RULE_RELOAD_INTERVAL = 5  # 分类说明文件变化检查间隔（秒），用于规则热加载
 
     # ==================== 验证数据文件配置 ====================
     VALIDATION_FILE = "data/机电通用物料优选库-新松自动化装备BG.xlsx"  # 默认验证数据文件路径
     ACTUAL_PROCESS_FILE = "data/202511标准化物料.xlsx"  # 最终实际要处理的文件
 
     # ==================== API调用配置 ====================
-    API_RATE_LIMIT = 0.5  # API调用间隔（秒），防止请求过多
+    API_REQUESTS_PER_SECOND = 2  # 大模型请求速率上限（次/秒，0表示不限制），仅在实际发送请求时扣减
+    API_TOKENS_PER_MINUTE = 0  # 大模型Token用量上限（Token/分钟，0表示不限制）
+    LLM_BATCH_SIZE = 20  # 批量大模型分类时每次请求包含的物料数
+    LLM_JSON_MODE = True  # 要求大模型以JSON对象格式输出（response_format=json_object），减少解析失败重试
+    LLM_CATEGORY_IDS = True  # 提示词中为每个分类标注编号，模型只输出{"category_id": 编号}，减少输出Token和分类名称拼写错误
+    CATEGORY_REPAIR_MIN_SCORE = 0.9  # 大模型返回的分类名称不符合标准时，本地模糊修复所需的最低相似度（分段一致、互相包含记0.9；0表示不修复）
+    # 单条物料请求的系统提示词只列出得分最高的K个候选分类（0表示始终使用完整分类规则）。
+    # 精简提示词约为完整规则的1/9，但每条物料各不相同，无法命中服务端对固定完整提示词的前缀缓存，默认关闭
+    LLM_CANDIDATE_TOP_K = 0
+    LLM_CANDIDATE_MIN_SCORE = 1.25  # 候选分类最高得分低于该值时认为置信度不足，回退到完整分类规则提示词
+    ASYNC_MAX_CONCURRENCY = 100  # 异步分类时同时进行的任务上限；实际在途的大模型请求数另受自适应并发控制器约束
+    LLM_INITIAL_CONCURRENCY = 5  # 大模型请求初始并发数，之后按请求耗时和限流情况自动调整
+    LLM_MIN_CONCURRENCY = 1  # 自适应并发下限
+    LLM_MAX_CONCURRENCY = 32  # 自适应并发上限，也是批量处理的默认线程数
+    LLM_TARGET_LATENCY = 20  # 目标请求耗时（秒），平滑耗时超过该值时不再提高并发
+    LLM_LATENCY_WINDOW = 500  # 统计耗时分布使用的最近请求数
+    LLM_HEDGE_PERCENTILE = 0  # 请求超过最近耗时的该分位（如95）仍未返回时发送对冲请求，采用先返回的结果（0表示不对冲）
+    LLM_HEDGE_BUDGET = 0.05  # 对冲请求数占总请求数的上限比例
+    LLM_HEDGE_MIN_SAMPLES = 20  # 耗时样本少于该数时不对冲
+    LLM_HEDGE_MIN_DELAY = 2  # 对冲延迟下限（秒）
+    LLM_CACHE_FILE = "./.cache/llm_classification_cache.sqlite3"  # 大模型分类结果缓存（分类说明文件变化时自动失效，设为空则不使用）
+    LLM_CACHE_MAX_ENTRIES = 500000  # 缓存最多保留的结果条数，超出时淘汰最近最少使用的结果
+    NEIGHBOR_INDEX_FILE = "./.cache/neighbor_index.npz"  # 已标注物料近邻索引（python neighbor_index.py 生成，文件不存在或设为空则不使用）
+    MODEL_PREFIX_TRIE_FILE = "./.cache/model_prefix_trie.pkl"  # 型号前缀树（由历史分类结果自动构建，新增结果文件时增量导入；设为空则不保存）
+    RESULT_HISTORY_PATTERNS = ["./data/*.xlsx", "./data/*.csv"]  # 构建型号前缀树和品牌分类先验表的历史分类结果文件
+    MODEL_PREFIX_MIN_LENGTH = 4  # 参与型号前缀分类的最短前缀长度
+    MODEL_PREFIX_MIN_SUPPORT = 2  # 前缀下至少有多少条历史型号才采用其分类（0表示不使用型号前缀分类）
+    MODEL_PREFIX_MIN_PURITY = 0.9  # 多数分类在该前缀下的最低占比
+    BRAND_PRIOR_FILE = "./.cache/brand_prior.pkl"  # 品牌/供应商分类先验表（由历史分类结果自动构建，新增结果文件时增量导入；设为空则不保存）
+    BRAND_PRIOR_MIN_SUPPORT = 3  # 品牌（供应商）至少有多少条历史结果才直接采用其多数分类（0表示不使用品牌先验，包括关键词排序）
+    BRAND_PRIOR_MIN_SHARE = 0.9  # 多数分类在该品牌（供应商）历史结果中的最低占比，即结果的置信度下限
+    # 训练近邻索引使用的已标注物料文件（其中的"11月结果数据"标注来自大模型）
+    NEIGHBOR_TRAINING_FILES = ["./data/11月结果数据.xlsx"]
+    # 训练近邻索引、构建型号前缀树和品牌分类先验表时排除的文件：验证数据文件参与训练会使validate_classifier.py的准确率虚高
+    LEARNED_TIER_EXCLUDED_FILES = [VALIDATION_FILE]
+    NEIGHBOR_MIN_SIMILARITY = 0.7  # 与最相似已标注物料的余弦相似度达到该值时直接采用其分类（0表示不使用近邻分类）
+    CIRCUIT_FAILURE_THRESHOLD = 5  # 大模型接口连续失败多少次后熔断
+    CIRCUIT_RECOVERY_TIMEOUT = 30  # 熔断后放行探测请求前的冷却时间（秒）
 
 
     # 基础提示词模板 - 用于构建包含关键词和备注的完整提示词
@@ -55,4 +99,32 @@ class Config:
 输入：型号=UPS2000, 物料名称=UPS电源
 输出：{{"main_category": "HMI/工控机/UPS", "sub_category": "UPS电源"}}
 
+"""
+
+    # 分类编号模式的提示词模板（LLM_CATEGORY_IDS），分类标准每行开头的方括号内为分类编号
+    ID_PROMPT_TEMPLATE = """你是一个专业的物料分类员，请根据提供的物料信息将其分类到正确的类别。
+
+物料信息包含：型号、品牌、供应商、物料名称、材料等。请按照以下优先级顺序进行分类：
+
+1. **关键词匹配优先**：首先检查物料名称是否与分类标准中的**关键词**直接匹配
+2. **详细信息对比**：如果关键词匹配失败，仔细对比物料名称、型号、品牌等信息与**备注说明**中的详细描述
+
+分类规则：
+1. 请严格按照以下分类标准进行分类，不得自定义分类
+2. 每条分类标准开头方括号中的数字为分类编号
+3. 输出格式必须为严格的JSON格式，仅包含category_id一个字段，值为所选分类的编号（整数）
+4. 输出的JSON字符串中不得包含任何其他解释或注释
+5. 仅使用以下分类标准中的分类（包含关键词和备注说明，分类时请综合考虑）：
+
+"""
+
+    # 分类编号模式的提示词示例
+    ID_PROMPT_EXAMPLES = """
+示例：
+输入：型号=S7-300, 物料名称=PLC模块
+输出：{"category_id": 分类标准中“大类：PLC/IO模块/柜体，二级类：PLC”的编号}
+
+输入：型号=UPS2000, 物料名称=UPS电源
+输出：{"category_id": 分类标准中“二级类：UPS电源”的编号}
+
 """
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP传输配置模块
+为大模型API客户端创建带连接池、长连接和超时限制的HTTP客户端
+"""
+
+import openai
+from config import Config
+from logger import logger
+
+
+def request_timeout():
+    """
+    构建请求超时设置
+
+    返回值:
+        openai.Timeout: 连接超时为Config.HTTP_CONNECT_TIMEOUT，读写及等待连接池超时为Config.REQUEST_TIMEOUT
+    """
+    return openai.Timeout(Config.REQUEST_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+
+
+def connection_limits():
+    """
+    构建连接池限制
+
+    返回值:
+        Limits: 最大连接数、最大空闲长连接数和空闲长连接保持时间
+    """
+    limits_type = type(openai.DEFAULT_CONNECTION_LIMITS)
+    return limits_type(
+        max_connections=Config.HTTP_POOL_SIZE,
+        max_keepalive_connections=Config.HTTP_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def http2_enabled():
+    """
+    判断是否启用HTTP/2，配置启用但未安装h2依赖时回退到HTTP/1.1
+
+    返回值:
+        bool: 是否启用HTTP/2
+    """
+    if not Config.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("已配置HTTP2_ENABLED但未安装h2依赖（pip install httpx[http2]），使用HTTP/1.1")
+        return False
+    return True
+
+
+def create_http_client():
+    """
+    创建同步HTTP客户端，供所有分类器句柄共享
+
+    返回值:
+        openai.DefaultHttpxClient: HTTP客户端
+    """
+    return openai.DefaultHttpxClient(
+        limits=connection_limits(),
+        timeout=request_timeout(),
+        http2=http2_enabled(),
+    )
+
+
+def create_async_http_client():
+    """
+    创建异步HTTP客户端
+
+    返回值:
+        openai.DefaultAsyncHttpxClient: 异步HTTP客户端
+    """
+    return openai.DefaultAsyncHttpxClient(
+        limits=connection_limits(),
+        timeout=request_timeout(),
+        http2=http2_enabled(),
+    )
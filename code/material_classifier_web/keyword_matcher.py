@@ -5,19 +5,171 @@
 不依赖大模型，直接在程序中进行关键词匹配
 """
 
+import re
+from bisect import bisect_left
+
+# 关键词/品牌分隔符，支持中英文逗号和顿号
+SEPARATOR_PATTERN = re.compile(r'[、,，]')
+
+# 物料品牌匹配结果缓存的最大条目数
+BRAND_CACHE_SIZE = 10000
+
+# 多字段匹配的字段优先级（物料名称 > 型号 > 品牌 > 材料）：(字段标签, 候选键名)
+MATCH_FIELDS = (
+    ("物料名称", ("物料名称",)),
+    ("型号", ("图号/型号", "型号")),
+    ("品牌", ("分类/品牌", "品牌")),
+    ("材料", ("材料",)),
+)
+
+# 多字段拼接扫描时使用的分隔符，标准化后的关键词中不会出现，保证命中不会跨字段
+FIELD_SEPARATOR = "\x00"
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    所有关键词在构建时一次性编译，匹配时只需对文本做一次线性扫描，
+    即可找出其中出现的全部关键词
+    """
+
+    def __init__(self):
+        # 状态转移表、失败指针、每个状态命中的输出值
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        """
+        添加一个模式串
+
+        参数:
+            pattern: 模式串（已标准化的关键词）
+            value: 命中该模式串时输出的值
+        """
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(value)
+        self._built = False
+
+    def build(self):
+        """按广度优先顺序计算失败指针，并合并后缀状态的输出"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and ch not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(ch, 0)
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """
+        扫描文本，逐个产出命中结果
+
+        参数:
+            text: 待扫描文本
+
+        返回:
+            generator: (命中结束位置, 输出值)
+        """
+        if not self._built:
+            self.build()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for value in output[state]:
+                    yield index, value
+
+
 class KeywordMatcher:
     """本地关键词匹配类"""
 
     def __init__(self, classification_mapping):
         """
-        初始化关键词匹配器
+        初始化关键词匹配器，并将所有关键词预编译为匹配自动机
 
         参数:
             classification_mapping: 分类映射字典
-                格式: {(normalized_main, normalized_sub): (original_main, original_sub, keywords, notes)}
+                格式: {(normalized_main, normalized_sub): (original_main, original_sub, keywords, notes, common_brands)}
         """
         self.classification_mapping = classification_mapping
 
+        # 规则序号 -> (original_main, original_sub, common_brands)
+        self._rules = []
+        # 标准化关键词 -> (规则序号, 关键词序号)，序号用于还原规则表中的先后顺序
+        self._automaton = KeywordAutomaton()
+
+        for rule_index, (orig_main, orig_sub, keywords, explanation, common_brands) in enumerate(self.classification_mapping.values()):
+            self._rules.append((orig_main, orig_sub, common_brands))
+            for keyword_index, keyword in enumerate(self._split_terms(keywords)):
+                normalized_keyword = self._normalize_text(keyword)
+                if normalized_keyword:
+                    self._automaton.add(normalized_keyword, (rule_index, keyword_index))
+
+        self._automaton.build()
+
+        # 常用品牌在加载时解析一次：(main, sub) -> 标准化品牌集合，以及反向索引 品牌 -> {(main, sub)}
+        self._category_brands = {}
+        self._brand_index = {}
+        for orig_main, orig_sub, common_brands in self._rules:
+            brands = frozenset(
+                normalized_brand
+                for normalized_brand in (self._normalize_text(brand) for brand in self._split_terms(common_brands))
+                if normalized_brand
+            )
+            self._category_brands[(orig_main, orig_sub)] = brands
+            for normalized_brand in brands:
+                self._brand_index.setdefault(normalized_brand, set()).add((orig_main, orig_sub))
+
+        # 品牌自动机，用于一次扫描找出物料品牌中包含的全部常用品牌
+        self._brand_automaton = KeywordAutomaton()
+        for normalized_brand in self._brand_index:
+            self._brand_automaton.add(normalized_brand, normalized_brand)
+        self._brand_automaton.build()
+
+        # 物料品牌 -> 品牌命中的分类集合，同一品牌只计算一次
+        self._brand_category_cache = {}
+
+    @staticmethod
+    def _split_terms(text):
+        """
+        拆分以逗号或顿号分隔的关键词/品牌字符串
+
+        参数:
+            text: 原始字符串
+
+        返回:
+            list: 去除空白后的词条列表
+        """
+        if not text:
+            return []
+        return [term.strip() for term in SEPARATOR_PATTERN.split(text) if term.strip()]
+
     def _normalize_text(self, text):
         """
         标准化文本，用于关键词匹配
@@ -50,89 +202,75 @@ class KeywordMatcher:
         if not normalized_name:
             return []
 
-        # 遍历所有分类规则
-        matched_categories = []
+        # 单次线性扫描找出所有命中的关键词，同一关键词多次出现只记一次
+        hits = {value for _, value in self._automaton.iter_matches(normalized_name)}
 
-        for (norm_main, norm_sub), (orig_main, orig_sub, keywords, explanation, common_brands) in self.classification_mapping.items():
-            if not keywords:
-                continue
+        # 按规则表顺序返回所有匹配结果，而不仅仅是第一个
+        return [self._rules[rule_index] for rule_index, _ in sorted(hits)]
 
-            # 提取所有关键词，支持中英文逗号和顿号
-            import re
-            keyword_list = [kw.strip() for kw in re.split(r'[、,，]', keywords) if kw.strip()]
-            if not keyword_list:
-                continue
+    def match_fields(self, material_data):
+        """
+        将多个字段拼接后单次扫描，返回带来源字段标签的匹配结果
 
-            # 检查是否有任何关键词匹配
-            for keyword in keyword_list:
-                normalized_keyword = self._normalize_text(keyword)
-                if not normalized_keyword:
-                    continue
+        参数:
+            material_data: 物料数据字典，包含"物料名称", "图号/型号", "分类/品牌", "材料"等
+
+        返回:
+            list: [(字段标签, (original_main_category, original_sub_category, common_brands)), ...]
+                按字段优先级、规则表顺序排列，同一字段内按分类去重
+        """
+        texts = []
+        for _, keys in MATCH_FIELDS:
+            value = ""
+            for key in keys:
+                value = material_data.get(key, "")
+                if value:
+                    break
+            texts.append(self._normalize_text(value))
 
-                # 关键词匹配逻辑: 物料名称包含关键词
-                if normalized_keyword in normalized_name:
-                    matched_categories.append((orig_main, orig_sub, common_brands))
+        # 记录每个字段在拼接文本中的结束位置，用于将命中位置映射回字段
+        field_ends = []
+        offset = -1
+        for text in texts:
+            offset += len(text) + 1
+            field_ends.append(offset)
 
-        # 返回所有匹配结果，而不仅仅是第一个
-        return matched_categories if matched_categories else []
+        combined_text = FIELD_SEPARATOR.join(texts)
+        hits = {
+            (bisect_left(field_ends, index), value[0])
+            for index, value in self._automaton.iter_matches(combined_text)
+        }
+
+        return [(MATCH_FIELDS[field_index][0], self._rules[rule_index]) for field_index, rule_index in sorted(hits)]
 
     def match_by_multiple_fields(self, material_data):
         """
         基于多个字段进行关键词匹配
 
+        按物料名称 > 型号 > 品牌 > 材料的优先级，返回第一个有匹配的字段中的全部匹配
+
         参数:
             material_data: 物料数据字典，包含"物料名称", "图号/型号", "分类/品牌", "材料"等
 
         返回:
             list: [(original_main_category, original_sub_category, common_brands), ...] 或 []
         """
-        all_matches = []
-        checked_categories = set()  # 用于去重
-
-        # 优先使用物料名称
-        material_name = material_data.get("物料名称", "")
-        matches = self.match_keywords(material_name)
-        for match in matches:
-            if (match[0], match[1]) not in checked_categories:
-                all_matches.append(match)
-                checked_categories.add((match[0], match[1]))
-
-        # 物料名称匹配失败或不完全，尝试使用型号
-        if not all_matches:
-            model = material_data.get("图号/型号", "") or material_data.get("型号", "")
-            matches = self.match_keywords(model)
-            for match in matches:
-                if (match[0], match[1]) not in checked_categories:
-                    all_matches.append(match)
-                    checked_categories.add((match[0], match[1]))
-
-        # 尝试使用品牌
-        if not all_matches:
-            brand = material_data.get("分类/品牌", "") or material_data.get("品牌", "")
-            matches = self.match_keywords(brand)
-            for match in matches:
-                if (match[0], match[1]) not in checked_categories:
-                    all_matches.append(match)
-                    checked_categories.add((match[0], match[1]))
-
-        # 尝试使用材料
-        if not all_matches:
-            material = material_data.get("材料", "")
-            matches = self.match_keywords(material)
-            for match in matches:
-                if (match[0], match[1]) not in checked_categories:
-                    all_matches.append(match)
-                    checked_categories.add((match[0], match[1]))
-
-        # 返回所有匹配结果，去重
-        return all_matches
-
-    def match_by_keywords_and_brand(self, material_data):
+        tagged_matches = self.match_fields(material_data)
+        if not tagged_matches:
+            return []
+
+        # 单次扫描后按字段优先级取结果，无需重复扫描
+        first_field = tagged_matches[0][0]
+        return [match for field, match in tagged_matches if field == first_field]
+
+    def match_by_keywords_and_brand(self, material_data, brand_prior=None):
         """
         基于关键词和品牌进行匹配
 
         参数:
-            material_data: 物料数据字典，包含"物料名称", "图号/型号", "分类/品牌", "材料"等
+            material_data: 物料数据字典，包含"物料名称", "图号/型号", "分类/品牌", "材料", "供应商"等
+            brand_prior: 品牌/供应商分类先验表（BrandPrior）或返回该表的无参函数，常用品牌无法区分多个匹配时按历史频次排序；
+                传入函数时仅在需要排序时调用
 
         返回:
             tuple: (original_main_category, original_sub_category) 或 None
@@ -140,6 +278,28 @@ class KeywordMatcher:
         # 1. 先进行关键词匹配
         keyword_matches = self.match_by_multiple_fields(material_data)
 
+        # 2. 如果有多个匹配，结合物料品牌进行筛选
+        material_brand = material_data.get("分类/品牌", "") or material_data.get("品牌", "")
+        return self._resolve_matches(
+            keyword_matches,
+            self._normalize_text(material_brand),
+            brand_prior,
+            self._normalize_text(material_data.get("供应商", "")),
+        )
+
+    def _resolve_matches(self, keyword_matches, normalized_material_brand, brand_prior=None, normalized_supplier=""):
+        """
+        从关键词匹配结果中选出最终分类
+
+        参数:
+            keyword_matches: [(original_main_category, original_sub_category, common_brands), ...]
+            normalized_material_brand: 标准化后的物料品牌
+            brand_prior: 品牌/供应商分类先验表（BrandPrior）或返回该表的无参函数，为None时不使用
+            normalized_supplier: 标准化后的供应商
+
+        返回:
+            tuple: (original_main_category, original_sub_category) 或 None
+        """
         # 如果没有匹配，返回None
         if not keyword_matches:
             return None
@@ -148,41 +308,95 @@ class KeywordMatcher:
         if len(keyword_matches) == 1:
             return (keyword_matches[0][0], keyword_matches[0][1])
 
-        # 2. 如果有多个匹配，进行品牌匹配
-        # 提取物料的品牌信息
-        material_brand = material_data.get("分类/品牌", "") or material_data.get("品牌", "")
-        normalized_material_brand = self._normalize_text(material_brand)
+        # 多个匹配时进行品牌匹配，通过品牌索引查找与物料品牌匹配的分类，返回第一个品牌匹配
+        if normalized_material_brand:
+            brand_categories = self._brand_categories(normalized_material_brand)
+            for main_cat, sub_cat, _ in keyword_matches:
+                if (main_cat, sub_cat) in brand_categories:
+                    return (main_cat, sub_cat)
+
+        # 常用品牌无法区分时，按该品牌/供应商历史上最常见的分类排序
+        if callable(brand_prior):
+            brand_prior = brand_prior()
+        if brand_prior is not None:
+            ranked = brand_prior.rank(
+                [(main_cat, sub_cat) for main_cat, sub_cat, _ in keyword_matches],
+                normalized_material_brand,
+                normalized_supplier,
+            )
+            if ranked:
+                return ranked
+
+        # 没有品牌匹配，返回第一个关键词匹配
+        return (keyword_matches[0][0], keyword_matches[0][1])
+
+    def _brand_categories(self, normalized_material_brand):
+        """
+        查找常用品牌与物料品牌相匹配的所有分类
 
-        if not normalized_material_brand:
-            # 没有品牌信息，返回第一个匹配
-            return (keyword_matches[0][0], keyword_matches[0][1])
+        品牌匹配逻辑: 物料品牌包含常用品牌，或常用品牌包含物料品牌
 
-        # 寻找与物料品牌匹配的分类
-        brand_matches = []
-        for main_cat, sub_cat, common_brands in keyword_matches:
-            if not common_brands:
-                continue
-
-            # 提取所有常用品牌，支持中英文逗号和顿号
-            import re
-            brand_list = [brand.strip() for brand in re.split(r'[、,，]', common_brands) if brand.strip()]
-            if not brand_list:
-                continue
-
-            # 检查是否有任何品牌匹配
-            for brand in brand_list:
-                normalized_brand = self._normalize_text(brand)
-                if not normalized_brand:
-                    continue
-
-                # 品牌匹配逻辑: 物料品牌包含品牌关键词或反之
-                if normalized_brand in normalized_material_brand or normalized_material_brand in normalized_brand:
-                    brand_matches.append((main_cat, sub_cat))
-                    break
+        参数:
+            normalized_material_brand: 标准化后的物料品牌
 
-        if brand_matches:
-            # 返回第一个品牌匹配
-            return brand_matches[0]
-        else:
-            # 没有品牌匹配，返回第一个关键词匹配
-            return (keyword_matches[0][0], keyword_matches[0][1])
+        返回:
+            frozenset: {(original_main_category, original_sub_category), ...}
+        """
+        categories = self._brand_category_cache.get(normalized_material_brand)
+        if categories is not None:
+            return categories
+
+        matched = set()
+        # 物料品牌包含常用品牌：一次扫描找出所有被包含的品牌
+        for _, brand in self._brand_automaton.iter_matches(normalized_material_brand):
+            matched.update(self._brand_index[brand])
+        # 常用品牌包含物料品牌
+        for brand, brand_categories in self._brand_index.items():
+            if normalized_material_brand in brand:
+                matched.update(brand_categories)
+
+        categories = frozenset(matched)
+        if len(self._brand_category_cache) >= BRAND_CACHE_SIZE:
+            self._brand_category_cache.clear()
+        self._brand_category_cache[normalized_material_brand] = categories
+        return categories
+
+    def match_dataframe(self, df, brand_prior=None):
+        """
+        对整个物料DataFrame批量进行关键词+品牌匹配
+
+        逐行调用 match_by_keywords_and_brand，相同的（物料名称、型号、品牌、材料、供应商）组合只匹配一次
+
+        参数:
+            df: 物料DataFrame，包含"物料名称", "图号/型号"(或"型号"), "分类/品牌"(或"品牌"), "材料", "供应商"等列
+            brand_prior: 品牌/供应商分类先验表（BrandPrior）或返回该表的无参函数，为None时不使用
+
+        返回:
+            DataFrame: 与df同索引，包含"main_category", "sub_category"列（未匹配为空字符串）
+                以及布尔列"needs_llm"（关键词匹配失败，需要大模型分类）
+        """
+        import pandas as pd
+
+        keys = [key for _, field_keys in MATCH_FIELDS for key in field_keys] + ["供应商"]
+        columns = [
+            df[key].where(df[key].notna(), "").tolist() if key in df.columns else [""] * len(df)
+            for key in keys
+        ]
+
+        matched_cache = {}
+        main_categories = []
+        sub_categories = []
+        for values in zip(*columns):
+            if values not in matched_cache:
+                material_data = {key: value for key, value in zip(keys, values) if value != ""}
+                matched_cache[values] = self.match_by_keywords_and_brand(material_data, brand_prior) or ("", "")
+            main_cat, sub_cat = matched_cache[values]
+            main_categories.append(main_cat)
+            sub_categories.append(sub_cat)
+
+        result = pd.DataFrame(
+            {"main_category": main_categories, "sub_category": sub_categories},
+            index=df.index,
+        )
+        result["needs_llm"] = result["main_category"] == ""
+        return result
@@ -5,30 +5,74 @@
 """
 
 import json
-import re
+import os
+import threading
 import time
 from openai import OpenAI
 from config import Config
 from logger import logger
+from rule_set import RuleFileWatcher, file_digest, load_rule_set, parse_classification_file
+from api_metrics import TokenUsageStats
+from rate_limiter import RateLimiter
+from concurrency_controller import AdaptiveConcurrencyController
+from request_hedging import LatencyTracker, RequestHedger
+from classification_cache import ClassificationCache
+from neighbor_index import NeighborIndex
+from model_prefix_trie import ModelPrefixTrie
+from brand_prior import BrandPrior, normalize_party
+from single_flight import SingleFlight
+from cascade import CascadeStats, CascadeTier, ClassificationCascade
+from circuit_breaker import STATE_OPEN, CircuitBreaker, CircuitOpenError
+from http_transport import create_http_client
+from response_parser import CATEGORY_ID_FIELD, parse_classification_content, strip_code_fence
 
 
 class MaterialClassifier:
     """
     物料分类器类，实现物料分类功能
+
+    规则集、API客户端、限流器、熔断器等在类级别共享，每类只初始化一次；
+    实例只是轻量的分类器句柄，可以在每个线程中随意创建
     """
-    # 单例模式：保存已加载的分类规则
-    _instance = None
+    # 所有句柄共享的分类规则集（不可变，热加载时整体替换）
+    _rule_set = None
     _classification_mapping = None
-
-    def __new__(cls, classification_file=None):
-        # 单例模式实现，确保只创建一个实例
-        if cls._instance is None:
-            cls._instance = super(MaterialClassifier, cls).__new__(cls)
-        return cls._instance
+    # 规则热加载：保证同一时间只有一个重建任务，以及文件监视器
+    _reload_lock = threading.Lock()
+    _rule_watcher = None
+    # Token用量及提示词前缀缓存命中统计（进程内所有分类调用共享）
+    _usage_stats = TokenUsageStats()
+    # 分级分类各级的命中率、耗时和Token成本统计（进程内所有分类调用共享）
+    _cascade_stats = CascadeStats()
+    # 大模型请求限流器（进程内所有分类调用共享，首次请求时按配置创建）
+    _rate_limiter = None
+    _request_control_lock = threading.Lock()
+    # 大模型请求自适应并发控制器（进程内所有分类调用共享，首次请求时按配置创建）
+    _concurrency_controller = None
+    # 大模型请求耗时分布及对冲请求（进程内所有分类调用共享，首次请求时按配置创建）
+    _request_hedger = None
+    # 大模型分类结果持久化缓存（首次使用时按配置打开）
+    _llm_cache = None
+    # 已标注物料近邻索引（首次使用时按配置加载，文件不存在时不使用）
+    _neighbor_index = None
+    _neighbor_index_loaded = False
+    # 由历史分类结果构建的型号前缀树（首次使用时加载并导入新增的结果文件）
+    _model_prefix_trie = None
+    _model_prefix_trie_loaded = False
+    # 由历史分类结果统计的品牌/供应商分类先验表（首次使用时加载并导入新增的结果文件）
+    _brand_prior = None
+    _brand_prior_loaded = False
+    _result_history_lock = threading.Lock()
+    # 相同物料的并发大模型请求合并为一次
+    _single_flight = SingleFlight()
+    # 大模型接口熔断器（进程内所有分类调用共享，首次请求时按配置创建）
+    _circuit_breaker = None
+    # 共享的API客户端，按(api_key, api_url)复用，保持HTTP连接复用
+    _clients = {}
 
     def __init__(self, classification_file=None):
         """
-        初始化物料分类器
+        创建物料分类器句柄，首次创建时加载分类规则集
         """
         self.api_key = Config.DEEPSEEK_API_KEY
         self.api_url = Config.DEEPSEEK_API_URL
@@ -41,17 +85,8 @@ class MaterialClassifier:
             else "./物料分类.xlsx"
         )
 
-        # 加载分类标准（仅加载一次）
-        if MaterialClassifier._classification_mapping is None:
-            MaterialClassifier._classification_mapping = self.load_classification_standards()
-            logger.info(f"成功加载 {len(MaterialClassifier._classification_mapping)} 条分类标准")
-
-        self.classification_mapping = MaterialClassifier._classification_mapping
-
-        # 初始化本地关键词匹配器
-        from keyword_matcher import KeywordMatcher
-        self.keyword_matcher = KeywordMatcher(self.classification_mapping)
-        logger.info("本地关键词匹配器初始化完成")
+        # 加载分类规则集（仅加载一次，优先使用快照）
+        MaterialClassifier._ensure_rule_set()
 
         # 验证API密钥是否存在
         if not self.api_key:
@@ -60,124 +95,430 @@ class MaterialClassifier:
 
         # 初始化对话上下文
         self.conversation_context_id = None
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.api_url,
-        )
+        self.client = MaterialClassifier._get_client(self.api_key, self.api_url)
         # 跟踪对话上下文的使用次数
         self.context_usage_count = 0
         # 上下文的最大使用次数 (留一定余量，避免接近1000)
         self.MAX_CONTEXT_USAGE = 800
 
-        # Token 用量统计已移除
-
-        # API 连续失败计数
-        self.continuous_api_failures = 0
-        self.MAX_API_FAILURES = 5  # 连续失败超过5次则终止
+        # 分级分类流水线，可通过self.cascade.register增加分类级
+        self.cascade = self._build_cascade()
 
-    def load_classification_standards(self):
+    def _build_cascade(self):
         """
-        加载物料分类标准，包含关键词和备注说明
+        按从快到慢的顺序组装分级分类流水线，名称与分类结果中的classification_source一致
 
         返回值:
-            dict: 分类映射，格式为 {(normalized_main_category, normalized_sub_category): (original_main_category, original_sub_category, keywords, notes)}
+            ClassificationCascade: 分级分类流水线
         """
-        classification_mapping = {}
+        return ClassificationCascade(
+            [
+                CascadeTier("keyword_matcher", self._classify_by_keywords),
+                CascadeTier("llm_cache", self._classify_by_cache),
+                CascadeTier("model_prefix", self._classify_by_model_prefix),
+                CascadeTier("neighbor_index", self._classify_by_neighbors, self._classify_batch_by_neighbors),
+                CascadeTier("brand_prior", self._classify_by_brand_prior),
+                CascadeTier(
+                    "deepseek_api",
+                    self._classify_by_shared_llm,
+                    self._classify_batch_by_llm,
+                    cost_meter=TokenUsageStats.context_tokens,
+                ),
+            ],
+            MaterialClassifier._cascade_stats,
+        )
 
-        try:
-            # 尝试先从Excel文件读取分类规则
-            logger.info("尝试从Excel文件读取分类规则")
-
-            import pandas as pd
-
-            # 读取Excel文件
-            df = pd.read_excel(Config.CLASSIFICATION_EXPLANATION_FILE, engine='openpyxl')
-
-            # 将DataFrame转为list of dicts
-            rows = df.to_dict('records')
-
-            current_main_category = None
-            for row in rows:
-                # 使用位置索引获取数据（更可靠处理编码问题）
-                cols = list(row.keys())
-
-                # 根据之前的分析：
-                # cols[0] - 序号, cols[1] - 主分类, cols[2] - 子分类
-                # cols[3] - 关键词, cols[4] - 备注说明
-
-                main_cat = str(row[cols[1]]).strip() if cols[1] in row else ''
-                sub_cat = str(row[cols[2]]).strip() if cols[2] in row else ''
-                keywords = str(row[cols[3]]).strip() if cols[3] in row else ''
-                explanation = str(row[cols[4]]).strip() if cols[4] in row else ''
-                common_brands = str(row[cols[5]]).strip() if cols[5] in row else ''
-
-                # 过滤无效值
-                main_cat = main_cat if main_cat != 'nan' else ''
-                sub_cat = sub_cat if sub_cat != 'nan' else ''
-                keywords = keywords if keywords != 'nan' else ''
-                explanation = explanation if explanation != 'nan' else ''
-                common_brands = common_brands if common_brands != 'nan' else ''
-
-                # 更新当前主分类
-                if main_cat:
-                    current_main_category = main_cat
-
-                # 只处理有子分类的数据行
-                if current_main_category and sub_cat:
-                    # Normalize category names for robust matching
-                    normalized_main = current_main_category.strip().lower().replace(' ', '').replace('	', '')
-                    normalized_sub = sub_cat.strip().lower().replace(' ', '').replace('	', '')
-
-                    # 存储 normalized -> (original_main, original_sub, keywords, explanation, common_brands) mapping
-                    classification_mapping[(normalized_main, normalized_sub)] = (
-                        current_main_category,
-                        sub_cat,
-                        keywords,
-                        explanation,
-                        common_brands
+    @classmethod
+    def _ensure_rule_set(cls):
+        """首次使用时加载分类规则集，多个线程同时创建句柄时只加载一次"""
+        if cls._rule_set is not None:
+            return
+        with cls._reload_lock:
+            if cls._rule_set is None:
+                rule_set = load_rule_set()
+                cls._classification_mapping = rule_set.classification_mapping
+                cls._rule_set = rule_set
+                logger.info(f"成功加载 {len(cls._classification_mapping)} 条分类标准")
+
+    @classmethod
+    def _get_client(cls, api_key, api_url):
+        """
+        获取共享的API客户端，相同的密钥和地址只创建一次
+
+        参数:
+            api_key (str): API密钥
+            api_url (str): API地址
+
+        返回值:
+            OpenAI: API客户端（线程安全，多个句柄共用连接池，超时见Config.REQUEST_TIMEOUT）
+        """
+        key = (api_key, api_url)
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._request_control_lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    # 共享连接池并强制超时；重试由_call_deepseek_api统一负责，
+                    # 避免SDK内部重试掩盖限流和超时，使并发控制器和熔断器无法感知
+                    client = OpenAI(
+                        api_key=api_key,
+                        base_url=api_url,
+                        http_client=create_http_client(),
+                        max_retries=0,
                     )
+                    cls._clients[key] = client
+        return client
+
+    @property
+    def rule_set(self):
+        """当前生效的分类规则集，热加载时整体替换"""
+        return MaterialClassifier._rule_set
+
+    @property
+    def classification_mapping(self):
+        """当前生效的分类映射"""
+        return self.rule_set.classification_mapping
+
+    @property
+    def keyword_matcher(self):
+        """当前生效的本地关键词匹配器（随规则集预先构建）"""
+        return self.rule_set.keyword_matcher
+
+    @classmethod
+    def reload_rules(cls, force=False):
+        """
+        重新加载分类规则并原子替换当前规则集
+
+        新的分类映射、关键词匹配器和提示词全部构建完成后才替换，
+        正在进行的分类继续使用旧规则集，之后的分类使用新规则集；加载失败时保留旧规则集
+
+        参数:
+            force (bool): 文件内容未变化时是否也强制重建
+
+        返回值:
+            bool: 是否替换了规则集
+        """
+        with cls._reload_lock:
+            try:
+                current = cls._rule_set
+                if not force and current is not None:
+                    if file_digest(Config.CLASSIFICATION_EXPLANATION_FILE) == current.version:
+                        return False
+
+                new_rule_set = load_rule_set()
+            except Exception as e:
+                logger.error(f"重新加载分类规则失败，继续使用当前规则: {e}")
+                return False
 
-            if classification_mapping:
-                logger.info(f"成功从Excel加载 {len(classification_mapping)} 条有效分类规则")
-                return classification_mapping
-            else:
-                # 如果没有加载到任何分类规则，直接报错
-                raise ValueError("从Excel未加载到任何有效分类规则")
+            # 单次引用赋值完成替换，不存在部分更新的状态
+            cls._rule_set = new_rule_set
+            cls._classification_mapping = new_rule_set.classification_mapping
+            # 历史结果统计表按规则集规范化分类名称，下次使用时按新规则集重建
+            cls._model_prefix_trie_loaded = False
+            cls._brand_prior_loaded = False
 
+        logger.info(f"分类规则已重新加载: {len(new_rule_set.classification_mapping)} 条 (版本 {new_rule_set.version[:12]})")
+        return True
+
+    @classmethod
+    def reload_rules_async(cls, force=False):
+        """
+        在后台线程中重新加载分类规则
+
+        参数:
+            force (bool): 文件内容未变化时是否也强制重建
+
+        返回值:
+            threading.Thread: 执行重新加载的线程
+        """
+        thread = threading.Thread(target=cls.reload_rules, kwargs={"force": force}, name="RuleReloader", daemon=True)
+        thread.start()
+        return thread
+
+    @classmethod
+    def start_rule_watcher(cls, interval=None):
+        """
+        启动分类说明文件监视，文件变化时在后台自动重新加载规则
+
+        参数:
+            interval: 检查间隔（秒，默认为Config.RULE_RELOAD_INTERVAL）
+
+        返回值:
+            RuleFileWatcher: 文件监视器
+        """
+        if cls._rule_watcher is None:
+            cls._rule_watcher = RuleFileWatcher(Config.CLASSIFICATION_EXPLANATION_FILE, cls.reload_rules, interval)
+        cls._rule_watcher.start()
+        return cls._rule_watcher
+
+    @classmethod
+    def stop_rule_watcher(cls):
+        """停止分类说明文件监视"""
+        if cls._rule_watcher is not None:
+            cls._rule_watcher.stop()
+            cls._rule_watcher = None
+
+    def load_classification_standards(self):
+        """
+        加载物料分类标准，包含关键词和备注说明
+
+        返回值:
+            dict: 分类映射，格式为 {(normalized_main_category, normalized_sub_category): (original_main_category, original_sub_category, keywords, explanation, common_brands)}
+        """
+        try:
+            return parse_classification_file(Config.CLASSIFICATION_EXPLANATION_FILE)
         except Exception as e:
             # 加载失败直接报错，不使用降级方案
             logger.error(f"加载分类文件失败：{e}")
             raise
-    
+
     def build_comprehensive_prompt(self):
         """
-        构建包含完整分类规则（含关键词和备注）的提示词
+        获取包含完整分类规则（含关键词和备注）的提示词
+
+        提示词随规则集只渲染一次，同一规则集版本下每次返回完全相同的字符串，
+        便于命中服务端的提示词前缀缓存
+        """
+        return self.rule_set.system_prompt
+
+    @classmethod
+    def get_usage_stats(cls):
+        """
+        获取Token用量统计
+
+        返回值:
+            dict: 请求数、提示/补全Token数、前缀缓存命中/未命中Token数及命中率
+        """
+        return cls._usage_stats.snapshot()
+
+    @classmethod
+    def get_cascade_stats(cls):
+        """
+        获取分级分类各级的统计数据
+
+        返回值:
+            dict: {分类级名称: {"items", "hits", "errors", "hit_rate", "seconds", "avg_latency_ms", "cost"}}
+        """
+        return cls._cascade_stats.snapshot()
+
+    @classmethod
+    def get_rate_limiter(cls):
+        """
+        获取进程内共享的大模型请求限流器
+
+        返回值:
+            RateLimiter: 按Config.API_REQUESTS_PER_SECOND和Config.API_TOKENS_PER_MINUTE创建的限流器
+        """
+        if cls._rate_limiter is None:
+            with cls._request_control_lock:
+                if cls._rate_limiter is None:
+                    cls._rate_limiter = RateLimiter(Config.API_REQUESTS_PER_SECOND, Config.API_TOKENS_PER_MINUTE)
+        return cls._rate_limiter
+
+    @classmethod
+    def get_concurrency_controller(cls):
+        """
+        获取进程内共享的大模型请求并发控制器
+
+        返回值:
+            AdaptiveConcurrencyController: 按Config.LLM_*_CONCURRENCY和Config.LLM_TARGET_LATENCY创建的控制器
+        """
+        if cls._concurrency_controller is None:
+            with cls._request_control_lock:
+                if cls._concurrency_controller is None:
+                    cls._concurrency_controller = AdaptiveConcurrencyController(
+                        initial_limit=Config.LLM_INITIAL_CONCURRENCY,
+                        min_limit=Config.LLM_MIN_CONCURRENCY,
+                        max_limit=Config.LLM_MAX_CONCURRENCY,
+                        target_latency=Config.LLM_TARGET_LATENCY,
+                    )
+        return cls._concurrency_controller
+
+    @classmethod
+    def get_request_hedger(cls):
+        """
+        获取进程内共享的大模型请求对冲器（同时负责统计请求耗时分布）
+
+        返回值:
+            RequestHedger: 按Config.LLM_HEDGE_*和Config.LLM_LATENCY_WINDOW创建的对冲器
+        """
+        if cls._request_hedger is None:
+            with cls._request_control_lock:
+                if cls._request_hedger is None:
+                    cls._request_hedger = RequestHedger(
+                        LatencyTracker(Config.LLM_LATENCY_WINDOW),
+                        percentile=Config.LLM_HEDGE_PERCENTILE,
+                        budget=Config.LLM_HEDGE_BUDGET,
+                        min_samples=Config.LLM_HEDGE_MIN_SAMPLES,
+                        min_delay=Config.LLM_HEDGE_MIN_DELAY,
+                    )
+        return cls._request_hedger
+
+    @classmethod
+    def get_latency_stats(cls):
+        """
+        获取最近大模型请求的耗时分布和对冲统计
+
+        返回值:
+            dict: samples、p50/p90/p95/p99/max（秒）以及requests、hedges、hedge_wins
+        """
+        return cls.get_request_hedger().snapshot()
+
+    @classmethod
+    def get_circuit_breaker(cls):
+        """
+        获取进程内共享的大模型接口熔断器
+
+        返回值:
+            CircuitBreaker: 按Config.CIRCUIT_FAILURE_THRESHOLD和Config.CIRCUIT_RECOVERY_TIMEOUT创建的熔断器
+        """
+        if cls._circuit_breaker is None:
+            with cls._request_control_lock:
+                if cls._circuit_breaker is None:
+                    cls._circuit_breaker = CircuitBreaker(Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RECOVERY_TIMEOUT)
+        return cls._circuit_breaker
+
+    @classmethod
+    def get_llm_cache(cls):
+        """
+        获取大模型分类结果缓存
+
+        返回值:
+            ClassificationCache: 按Config.LLM_CACHE_FILE打开的缓存，未配置时返回None
+        """
+        if cls._llm_cache is None and Config.LLM_CACHE_FILE:
+            with cls._request_control_lock:
+                if cls._llm_cache is None:
+                    cls._llm_cache = ClassificationCache(Config.LLM_CACHE_FILE, Config.LLM_CACHE_MAX_ENTRIES)
+        return cls._llm_cache
+
+    @classmethod
+    def get_neighbor_index(cls):
+        """
+        获取已标注物料近邻索引
+
+        返回值:
+            NeighborIndex: 从Config.NEIGHBOR_INDEX_FILE加载的索引，未配置、文件不存在或加载失败时返回None
+        """
+        if not cls._neighbor_index_loaded:
+            with cls._request_control_lock:
+                if not cls._neighbor_index_loaded:
+                    cls._neighbor_index = cls._load_neighbor_index()
+                    cls._neighbor_index_loaded = True
+        return cls._neighbor_index
+
+    @staticmethod
+    def _load_neighbor_index():
+        """按配置加载近邻索引，失败时记录日志并返回None"""
+        index_file = Config.NEIGHBOR_INDEX_FILE
+        if not index_file or not Config.NEIGHBOR_MIN_SIMILARITY:
+            return None
+        if not os.path.exists(index_file):
+            logger.info(f"近邻索引文件不存在，跳过近邻分类（可运行 python neighbor_index.py 生成）: {index_file}")
+            return None
+        try:
+            index = NeighborIndex.load(index_file)
+        except Exception as e:
+            logger.warning(f"加载近邻索引失败，跳过近邻分类: {e}")
+            return None
+        logger.info(f"近邻索引加载完成: {len(index)} 条已标注物料")
+        return index
+
+    @classmethod
+    def get_model_prefix_trie(cls):
+        """
+        获取型号前缀树
+
+        返回值:
+            ModelPrefixTrie: 型号前缀树，未启用或构建失败时返回None
+        """
+        if not cls._model_prefix_trie_loaded:
+            with cls._result_history_lock:
+                # 其他线程可能已在等待锁期间完成加载
+                if not cls._model_prefix_trie_loaded:
+                    cls._reload_model_prefix_trie()
+        return cls._model_prefix_trie
+
+    @classmethod
+    def refresh_model_prefix_trie(cls):
         """
-        # 从config.py中获取基础prompt模板
-        base_prompt = Config.BASE_PROMPT_TEMPLATE
+        重新加载型号前缀树并增量导入新增的历史结果文件，完成后整体替换，不影响进行中的查询
 
-        # 构建分类规则部分
-        categories = {}
-        for (norm_main, norm_sub), (orig_main, orig_sub, keywords, explanation, common_brands) in self.classification_mapping.items():
-            if orig_main not in categories:
-                categories[orig_main] = []
-            categories[orig_main].append((orig_sub, keywords, explanation, common_brands))
+        返回值:
+            ModelPrefixTrie: 新的型号前缀树，未启用或构建失败时返回None
+        """
+        with cls._result_history_lock:
+            return cls._reload_model_prefix_trie()
+
+    @classmethod
+    def _reload_model_prefix_trie(cls):
+        """按配置加载型号前缀树并整体替换，调用方需持有_result_history_lock"""
+        trie = None
+        if Config.MODEL_PREFIX_MIN_SUPPORT:
+            trie = cls._load_result_history(ModelPrefixTrie, Config.MODEL_PREFIX_TRIE_FILE)
+        cls._model_prefix_trie = trie
+        cls._model_prefix_trie_loaded = True
+        return trie
+
+    @classmethod
+    def get_brand_prior(cls):
+        """
+        获取品牌/供应商分类先验表
 
-        for main_cat, sub_cats in categories.items():
-            for sub_cat, keywords, explanation, common_brands in sub_cats:
-                category_line = f"- 大类：{main_cat}，二级类：{sub_cat}"
-                if keywords:
-                    category_line += f"，关键词：{keywords}"
-                if explanation:
-                    category_line += f"，释义：{explanation}"
-                if common_brands:
-                    category_line += f"，常用品牌：{common_brands}"
-                base_prompt += category_line + "\n"
+        返回值:
+            BrandPrior: 品牌分类先验表，未启用或构建失败时返回None
+        """
+        if not cls._brand_prior_loaded:
+            with cls._result_history_lock:
+                # 其他线程可能已在等待锁期间完成加载
+                if not cls._brand_prior_loaded:
+                    cls._reload_brand_prior()
+        return cls._brand_prior
+
+    @classmethod
+    def refresh_brand_prior(cls):
+        """
+        重新加载品牌分类先验表并增量导入新增的历史结果文件，完成后整体替换，不影响进行中的查询
+
+        返回值:
+            BrandPrior: 新的品牌分类先验表，未启用或构建失败时返回None
+        """
+        with cls._result_history_lock:
+            return cls._reload_brand_prior()
+
+    @classmethod
+    def _reload_brand_prior(cls):
+        """按配置加载品牌分类先验表并整体替换，调用方需持有_result_history_lock"""
+        prior = None
+        if Config.BRAND_PRIOR_MIN_SUPPORT:
+            prior = cls._load_result_history(BrandPrior, Config.BRAND_PRIOR_FILE)
+        cls._brand_prior = prior
+        cls._brand_prior_loaded = True
+        return prior
+
+    @classmethod
+    def _load_result_history(cls, table_cls, table_file):
+        """按配置加载历史结果统计表并导入新增的结果文件（分类名称按当前规则集规范化），失败时记录日志并返回None"""
+        try:
+            cls._ensure_rule_set()
+            table = table_cls.load_from_results(
+                table_file, Config.RESULT_HISTORY_PATTERNS, cls._rule_set, Config.LEARNED_TIER_EXCLUDED_FILES
+            )
+        except Exception as e:
+            logger.warning(f"构建{table_cls.DESCRIPTION}失败，跳过相应的本地分类: {e}")
+            return None
+        logger.info(f"{table_cls.DESCRIPTION}加载完成: {len(table)} 条")
+        return table
 
-        # 添加示例部分 - 从config.py中获取
-        base_prompt += Config.PROMPT_EXAMPLES
+    @classmethod
+    def get_concurrency_stats(cls):
+        """
+        获取大模型请求并发控制状态
 
-        return base_prompt
+        返回值:
+            dict: 当前并发上限、在途请求数、平滑耗时（秒）和限流事件数
+        """
+        return cls.get_concurrency_controller().snapshot()
 
     def initialize_conversation_context(self):
         """
@@ -225,199 +566,579 @@ class MaterialClassifier:
         """
         return f"现在请对以下物料进行分类：\n物料信息：{material_info}\n分类结果："
 
-    def _call_deepseek_api(self, prompt):
+    def _request_completion(self, prompt, rule_set, system_prompt=None):
         """
-        调用DeepSeek API，统一一次输出
+        发送一次对话补全请求，返回模型输出的文本内容
 
         参数:
-            prompt (str): 请求的提示词
+            prompt (str): 用户提示词
+            rule_set (RuleSet): 提供系统提示词的规则集
+            system_prompt (str): 指定的系统提示词，默认为完整分类规则
 
         返回值:
-            dict: API返回的分类结果
+            str: 模型输出内容
 
         异常:
-            Exception: API调用异常
+            CircuitOpenError: 大模型接口已熔断
+            ValueError: API返回内容为空
         """
-        # 网络搜索功能已移除
+        messages = self._build_messages(prompt, rule_set, system_prompt)
+
+        # 熔断期间直接拒绝，不占用限流配额和并发名额
+        circuit_breaker = self.get_circuit_breaker()
+        circuit_breaker.before_request()
+
+        # 只有实际发送请求时才占用限流配额，关键词匹配成功的物料不受限流影响
+        rate_limiter = self.get_rate_limiter()
+        estimated_tokens = rate_limiter.estimate_tokens(messages)
+        rate_limiter.acquire(estimated_tokens)
+
+        # 慢请求超过分位耗时仍未返回时按配置发送对冲请求，未被采用的响应只计入Token用量
+        response = self.get_request_hedger().call(
+            lambda on_sent: self._send_completion(messages, estimated_tokens, on_sent),
+            lambda: self._send_hedge_completion(messages, estimated_tokens),
+            on_discard=lambda discarded: MaterialClassifier._usage_stats.record(getattr(discarded, "usage", None)),
+        )
+        return self._extract_content(response)
 
-        for attempt in range(Config.MAX_RETRIES):
-            try:
-                # 构建包含完整分类规则的prompt，统一一次发送
-                comprehensive_prompt = self.build_comprehensive_prompt()
-
-                # 参考用户提供的示例，使用统一的API调用格式
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": comprehensive_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.1,  # 降低随机性，提高稳定性
-                )
+    def _send_completion(self, messages, estimated_tokens, on_sent=None):
+        """
+        占用并发名额发送一次请求，记录耗时和结果
 
-                # 解析响应 - 参考用户提供的示例格式
-                content = response.choices[0].message.content
+        参数:
+            messages (list): 对话消息列表
+            estimated_tokens (int): 限流时预约的Token数
+            on_sent (callable): 取得并发名额、即将发出请求时调用（对冲延迟从此时开始计算）
 
-                # 确保内容不是空的
-                if not content:
-                    raise ValueError("API返回内容为空")
+        返回值:
+            API响应
+        """
+        circuit_breaker = self.get_circuit_breaker()
+
+        # 在途请求数由自适应并发控制器决定，请求结果用于调整并发上限
+        controller = self.get_concurrency_controller()
+        started_at = controller.acquire()
+        sent_at = time.monotonic()
+        if on_sent is not None:
+            on_sent()
+        try:
+            # 参考用户提供的示例，使用统一的API调用格式
+            response = self.client.chat.completions.create(messages=messages, **self._completion_options())
+        except Exception as e:
+            controller.release(started_at, e)
+            circuit_breaker.record_failure()
+            raise
+        controller.release(started_at)
+        circuit_breaker.record_success()
+        self.get_rate_limiter().settle(estimated_tokens, self._total_tokens(response))
+        self.get_request_hedger().latency.record(time.monotonic() - sent_at)
+        return response
 
-                # 确保内容是字符串类型
-                if isinstance(content, bytes):
-                    content = content.decode("utf-8", errors="ignore")
-                elif not isinstance(content, str):
-                    content = str(content)
+    def _send_hedge_completion(self, messages, estimated_tokens):
+        """
+        发送对冲请求，与原请求一样受熔断、限流和并发控制约束
 
-                # 处理不同的响应格式
+        参数:
+            messages (list): 对话消息列表
+            estimated_tokens (int): 预计消耗的Token数
 
-                try:
-                    # 首先尝试直接解析为JSON，适合API返回纯JSON的情况
-                    parsed_result = json.loads(content)
-                except json.JSONDecodeError:
-                    # 清理响应内容，处理可能的格式问题
-                    cleaned_content = content.strip()
-
-                    # 移除可能的markdown标记
-                    if cleaned_content.startswith("```") and cleaned_content.endswith(
-                        "```"
-                    ):
-                        # 移除markdown代码块标记
-                        cleaned_content = cleaned_content[3:-3].strip()
-
-                        # 如果有指定语言，移除语言标识
-                        if cleaned_content.startswith("json"):
-                            cleaned_content = cleaned_content[4:].strip()
-
-                    # 查找包含JSON的部分（处理带思考过程的响应）
-                    json_part = cleaned_content
-
-                    # 尝试找到所有可能的JSON对象
-                    json_matches = re.findall(r"\{.*?\}", cleaned_content, re.DOTALL)
-                    if json_matches:
-                        # 使用最后一个JSON对象（通常是实际结果）
-                        json_part = json_matches[-1]
-                    else:
-                        # 尝试找到JSON数组（如果有的话）
-                        json_matches = re.findall(
-                            r"\[.*?\]", cleaned_content, re.DOTALL
-                        )
-                        if json_matches:
-                            json_part = json_matches[-1]
-
-                    # 再次尝试解析JSON
-                    parsed_result = json.loads(json_part)
-
-                # 验证解析结果是否符合预期格式
-                if not isinstance(parsed_result, dict):
-                    raise ValueError(
-                        f"API返回的JSON不是预期的对象格式: {parsed_result}"
-                    )
+        返回值:
+            API响应
+        """
+        self.get_circuit_breaker().before_request()
+        self.get_rate_limiter().acquire(estimated_tokens)
+        return self._send_completion(messages, estimated_tokens)
 
-                if (
-                    "main_category" not in parsed_result
-                    or "sub_category" not in parsed_result
-                ):
-                    raise ValueError(
-                        f"API返回的JSON缺少必要字段: {list(parsed_result.keys())}"
-                    )
+    @staticmethod
+    def _total_tokens(response):
+        """返回响应中的总Token数，响应未包含用量信息时返回None"""
+        usage = getattr(response, "usage", None)
+        return getattr(usage, "total_tokens", None) if usage is not None else None
 
-                # Token 用量统计已移除
+    def _completion_options(self):
+        """
+        对话补全请求的公共参数
+
+        返回值:
+            dict: 模型、温度，以及启用Config.LLM_JSON_MODE时要求输出JSON对象的response_format
+        """
+        options = {
+            "model": self.model,
+            "temperature": 0.1,  # 降低随机性，提高稳定性
+        }
+        if Config.LLM_JSON_MODE:
+            options["response_format"] = {"type": "json_object"}
+        return options
+
+    def _build_messages(self, prompt, rule_set, system_prompt=None):
+        """
+        构建对话消息列表
+
+        参数:
+            prompt (str): 用户提示词
+            rule_set (RuleSet): 提供系统提示词的规则集
+            system_prompt (str): 指定的系统提示词（如候选分类精简提示词），默认为完整分类规则
+
+        返回值:
+            list: 对话消息列表
+        """
+        # 默认使用规则集中预先渲染的完整分类规则prompt，保证字节级一致以命中前缀缓存
+        return [
+            {"role": "system", "content": system_prompt or rule_set.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
 
-                # 重置连续失败计数
-                self.continuous_api_failures = 0
+    def _extract_content(self, response):
+        """
+        记录用量并从API响应中取出文本内容
+
+        参数:
+            response: 对话补全响应
+
+        返回值:
+            str: 模型输出内容
+
+        异常:
+            ValueError: API返回内容为空
+        """
+        # 记录Token用量及前缀缓存命中情况
+        MaterialClassifier._usage_stats.record(getattr(response, "usage", None))
+
+        # 解析响应 - 参考用户提供的示例格式
+        content = response.choices[0].message.content
+
+        # 确保内容不是空的
+        if not content:
+            raise ValueError("API返回内容为空")
+
+        # 确保内容是字符串类型
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", errors="ignore")
+        elif not isinstance(content, str):
+            content = str(content)
+
+        return content
+
+    def _parse_classification_content(self, content):
+        """
+        从模型输出内容中解析分类结果JSON
+
+        参数:
+            content (str): 模型输出内容
+
+        返回值:
+            dict: 包含main_category和sub_category的解析结果
+
+        异常:
+            ValueError: 内容中没有符合格式的JSON对象
+        """
+        return parse_classification_content(content)
+
+    def _call_deepseek_api(self, prompt, rule_set=None, system_prompt=None):
+        """
+        调用DeepSeek API，统一一次输出
+
+        参数:
+            prompt (str): 请求的提示词
+            rule_set (RuleSet): 本次分类使用的规则集（默认为当前规则集）
+            system_prompt (str): 指定的系统提示词，默认为完整分类规则
+
+        返回值:
+            dict: API返回的分类结果
+
+        异常:
+            Exception: API调用异常
+        """
+        # 网络搜索功能已移除
+
+        rule_set = rule_set or self.rule_set
+
+        for attempt in range(Config.MAX_RETRIES):
+            try:
+                content = self._request_completion(prompt, rule_set, system_prompt)
+
+                parsed_result = self._parse_classification_content(content)
 
                 # 添加分类来源信息
                 parsed_result["classification_source"] = "deepseek_api"
 
                 return parsed_result
 
+            except CircuitOpenError:
+                # 熔断期间不重试也不退避，直接推迟该物料
+                raise
+
             except Exception as e:
                 logger.error(
                     f"API调用失败 (尝试 {attempt+1}/{Config.MAX_RETRIES}): {str(e)}"
                 )
 
-                # 增加连续失败计数
-                self.continuous_api_failures += 1
-
-                # 如果连续失败次数达到阈值，抛出异常
-                if self.continuous_api_failures >= self.MAX_API_FAILURES:
-                    logger.error(f"API连续失败 {self.continuous_api_failures} 次，终止程序")
-                    raise
-
-                if attempt < Config.MAX_RETRIES - 1:
+                # 本次失败导致熔断时不再退避重试
+                if attempt < Config.MAX_RETRIES - 1 and self.get_circuit_breaker().state != STATE_OPEN:
                     time.sleep(2**attempt)  # 指数退避
                 else:
                     raise
 
-    def classify_material(self, material_data):
+    def _format_material(self, material_data):
         """
-        对单个物料进行分类
+        格式化物料信息
 
         参数:
             material_data (dict): 物料数据，包含"物料名称", "图号/型号", "材料", "分类/品牌"等键
 
         返回值:
-            dict: 分类结果，包含"main_category"和"sub_category"键
+            tuple: (formatted_data, material_info)
+                formatted_data - 统一键名后的物料数据
+                material_info - "键=值"格式的物料信息字符串
+        """
+        # 调整物料信息键名以匹配物料数据的实际结构
+        formatted_data = {
+            "型号": material_data.get("图号/型号", material_data.get("型号", "")),
+            "品牌": material_data.get("分类/品牌", material_data.get("品牌", "")),
+            "供应商": material_data.get("供应商", ""),
+            "物料名称": material_data.get("物料名称", ""),
+            "材料": material_data.get("材料", ""),
+        }
+
+        # 移除空值
+        filtered_data = {k: v for k, v in formatted_data.items() if v}
+
+        # 格式化为"键=值"格式
+        material_info = ", ".join([f"{k}={v}" for k, v in filtered_data.items()])
+        return formatted_data, material_info
+
+    def _classify_by_keywords(self, formatted_data, material_info, rule_set):
+        """
+        使用本地关键词+品牌匹配进行分类
 
-        异常:
-            Exception: 分类失败异常
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果，匹配失败时返回None
+        """
+        logger.info("尝试本地关键词+品牌匹配...")
+        # 品牌先验表仅在多个关键词匹配无法按常用品牌区分时才加载，关键词唯一命中不触发构建
+        local_match = rule_set.keyword_matcher.match_by_keywords_and_brand(formatted_data, self.get_brand_prior)
+
+        if not local_match:
+            return None
+
+        main_cat, sub_cat = local_match
+        result = {"main_category": main_cat, "sub_category": sub_cat, "classification_source": "keyword_matcher"}
+
+        # 验证匹配结果是否合法
+        self.validate_classification_result(result, rule_set)
+
+        logger.info(f"本地关键词匹配成功: {material_info} -> {result}")
+        return result
+
+    def _classify_by_cache(self, formatted_data, material_info, rule_set):
+        """
+        查询大模型分类结果缓存
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 缓存的分类结果，未命中时返回None
         """
+        cache = self.get_llm_cache()
+        if cache is None:
+            return None
+
         try:
-            # 格式化物料信息
-            # 调整物料信息键名以匹配物料数据的实际结构
-            formatted_data = {
-                "型号": material_data.get("图号/型号", material_data.get("型号", "")),
-                "品牌": material_data.get("分类/品牌", material_data.get("品牌", "")),
-                "供应商": material_data.get("供应商", ""),
-                "物料名称": material_data.get("物料名称", ""),
-                "材料": material_data.get("材料", ""),
-            }
-
-            # 移除空值
-            filtered_data = {k: v for k, v in formatted_data.items() if v}
-
-            # 格式化为"键=值"格式
-            material_info = ", ".join([f"{k}={v}" for k, v in filtered_data.items()])
-            logger.info(f"开始分类物料: {material_info}")
+            cached = cache.get(formatted_data, rule_set.version, self.model)
+        except Exception as e:
+            logger.warning(f"读取分类结果缓存失败: {e}")
+            return None
 
-            # 步骤1: 尝试本地关键词匹配（优先） - 新规则：关键词+品牌匹配
-            logger.info("尝试本地关键词+品牌匹配...")
-            local_match = self.keyword_matcher.match_by_keywords_and_brand(formatted_data)
+        if not cached:
+            return None
 
-            if local_match:
-                main_cat, sub_cat = local_match
-                result = {"main_category": main_cat, "sub_category": sub_cat, "classification_source": "keyword_matcher"}
+        result = {
+            "main_category": cached["main_category"],
+            "sub_category": cached["sub_category"],
+            "classification_source": "llm_cache",
+        }
+        logger.info(f"分类结果缓存命中: {material_info} -> {result}")
+        return result
 
-                # 验证匹配结果是否合法
-                self.validate_classification_result(result)
+    def _classify_by_neighbors(self, formatted_data, material_info, rule_set):
+        """
+        在已标注物料近邻索引中查找最相似的物料，相似度足够高时直接采用其分类
 
-                logger.info(f"本地关键词匹配成功: {material_info} -> {result}")
-                return result
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
 
-            logger.info("本地关键词匹配失败，将使用大模型进行分类...")
+        返回值:
+            dict: 分类结果，未命中时返回None
+        """
+        index = self.get_neighbor_index()
+        if index is None:
+            return None
+        return self._neighbor_result(index.query(formatted_data, Config.NEIGHBOR_MIN_SIMILARITY), material_info, rule_set)
 
-            # 步骤2: 生成提示词
-            prompt = self._generate_prompt(material_info)
+    def _classify_batch_by_neighbors(self, items, rule_set, **options):
+        """
+        批量查询近邻索引，一次计算全部物料的相似度
+
+        参数:
+            items (list): [(formatted_data, material_info), ...]
+            rule_set (RuleSet): 本次分类使用的规则集
+            **options: 未使用
 
-            # 步骤3: 调用API进行分类
-            result = self._call_deepseek_api(prompt)
+        返回值:
+            list: 与items一一对应的分类结果，未命中为None
+        """
+        index = self.get_neighbor_index()
+        if index is None:
+            return [None] * len(items)
 
-            # 步骤4: 验证分类结果
-            self.validate_classification_result(result)
+        hits = index.query_batch([formatted_data for formatted_data, _ in items], Config.NEIGHBOR_MIN_SIMILARITY)
+        results = [self._neighbor_result(hit, material_info, rule_set) for (_, material_info), hit in zip(items, hits)]
+        logger.info(f"近邻分类命中 {sum(1 for result in results if result)}/{len(items)} 条")
+        return results
 
-            logger.info(f"大模型分类成功: {material_info} -> {result}")
+    def _neighbor_result(self, hit, material_info, rule_set):
+        """
+        将近邻查询结果转为分类结果
+
+        参数:
+            hit (tuple): ((大类, 二级类), 相似度) 或 None
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果，未命中时返回None
+        """
+        if hit is None:
+            return None
+        label, similarity = hit
+        return self._local_result(label, "neighbor_index", f"近邻分类命中(相似度 {similarity})", material_info, rule_set)
+
+    def _classify_by_model_prefix(self, formatted_data, material_info, rule_set):
+        """
+        按型号前缀在历史分类结果中查找分类
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果，未命中时返回None
+        """
+        if not formatted_data.get("型号"):
+            return None
+        trie = self.get_model_prefix_trie()
+        if trie is None:
+            return None
+
+        hit = trie.lookup(
+            formatted_data["型号"],
+            Config.MODEL_PREFIX_MIN_LENGTH,
+            Config.MODEL_PREFIX_MIN_SUPPORT,
+            Config.MODEL_PREFIX_MIN_PURITY,
+        )
+        if hit is None:
+            return None
+        label, prefix, support, purity = hit
+        return self._local_result(
+            label, "model_prefix", f"型号前缀命中({prefix}, 支持数 {support}, 纯度 {purity})", material_info, rule_set
+        )
+
+    def _classify_by_brand_prior(self, formatted_data, material_info, rule_set):
+        """
+        品牌或供应商的历史分类足够集中时直接采用其多数分类，结果中的confidence为该分类的历史占比
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果，未命中时返回None
+        """
+        brand = normalize_party(formatted_data.get("品牌"))
+        supplier = normalize_party(formatted_data.get("供应商"))
+        if not brand and not supplier:
+            return None
+        prior = self.get_brand_prior()
+        if prior is None:
+            return None
+
+        hit = prior.predict(brand, supplier, Config.BRAND_PRIOR_MIN_SUPPORT, Config.BRAND_PRIOR_MIN_SHARE)
+        if hit is None:
+            return None
+        label, confidence, field = hit
+        result = self._local_result(
+            label, "brand_prior", f"{field}先验命中(置信度 {confidence})", material_info, rule_set
+        )
+        if result:
+            result["confidence"] = confidence
+        return result
+
+    def _local_result(self, label, source, description, material_info, rule_set):
+        """
+        将本地推断得到的分类转为分类结果，分类已不在当前分类标准中时视为未命中
+
+        参数:
+            label (tuple): (大类, 二级类)
+            source (str): 分类来源
+            description (str): 命中说明（用于日志）
+            material_info (str): 物料信息字符串（用于日志）
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果，未命中时返回None
+        """
+        main_category, sub_category = label
+        result = {"main_category": main_category, "sub_category": sub_category, "classification_source": source}
+        try:
+            self.validate_classification_result(result, rule_set)
+        except ValueError:
+            return None
+
+        logger.info(f"{description}: {material_info} -> {result}")
+        return result
+
+    def _cache_result(self, formatted_data, rule_set, result):
+        """
+        将验证通过的大模型分类结果写入缓存，写入失败不影响分类
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            rule_set (RuleSet): 本次分类使用的规则集
+            result (dict): 分类结果
+        """
+        cache = self.get_llm_cache()
+        if cache is None:
+            return
+
+        try:
+            cache.put(
+                formatted_data,
+                rule_set.version,
+                self.model,
+                {"main_category": result["main_category"], "sub_category": result["sub_category"]},
+            )
+        except Exception as e:
+            logger.warning(f"写入分类结果缓存失败: {e}")
+
+    def _select_system_prompt(self, formatted_data, rule_set):
+        """
+        为物料选择系统提示词：候选分类置信度足够时使用只包含候选分类的精简提示词，否则使用完整提示词
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            str: 系统提示词
+        """
+        if not Config.LLM_CANDIDATE_TOP_K:
+            return rule_set.system_prompt
+
+        material_text = " ".join(str(value) for value in formatted_data.values() if value)
+        candidate_keys = rule_set.candidate_retriever.retrieve(
+            material_text, Config.LLM_CANDIDATE_TOP_K, Config.LLM_CANDIDATE_MIN_SCORE
+        )
+        if not candidate_keys:
+            logger.info("候选分类置信度不足，使用完整分类规则提示词")
+            return rule_set.system_prompt
+
+        logger.info(f"使用 {len(candidate_keys)} 个候选分类的精简提示词")
+        return rule_set.candidate_prompt(candidate_keys)
+
+    def _classify_by_llm(self, formatted_data, material_info, rule_set):
+        """
+        调用大模型分类，验证通过后写入缓存
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果
+        """
+        prompt = self._generate_prompt(material_info)
+        result = self._call_deepseek_api(prompt, rule_set, self._select_system_prompt(formatted_data, rule_set))
+
+        self.validate_classification_result(result, rule_set)
+        self._cache_result(formatted_data, rule_set, result)
+
+        logger.info(f"大模型分类成功: {material_info} -> {result}")
+        return result
+
+    def _classify_by_shared_llm(self, formatted_data, material_info, rule_set):
+        """
+        调用大模型分类，其他线程正在分类相同物料时等待并共享其结果
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            material_info (str): 物料信息字符串
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            dict: 分类结果
+        """
+        logger.info("本地关键词匹配失败，将使用大模型进行分类...")
+        flight_key = ClassificationCache.make_key(formatted_data, rule_set.version, self.model)
+        result, shared = MaterialClassifier._single_flight.do(
+            flight_key, lambda: self._classify_by_llm(formatted_data, material_info, rule_set)
+        )
+        if shared:
+            logger.info(f"合并相同物料的大模型请求: {material_info} -> {result}")
+        return dict(result)
+
+    def classify_material(self, material_data):
+        """
+        对单个物料进行分类
+
+        参数:
+            material_data (dict): 物料数据，包含"物料名称", "图号/型号", "材料", "分类/品牌"等键
+
+        返回值:
+            dict: 分类结果，包含"main_category"和"sub_category"键
+
+        异常:
+            Exception: 分类失败异常
+        """
+        # 整个分类过程固定使用同一个规则集，规则热加载不影响进行中的分类
+        rule_set = self.rule_set
+
+        try:
+            formatted_data, material_info = self._format_material(material_data)
+            logger.info(f"开始分类物料: {material_info}")
+
+            # 依次尝试关键词、缓存、型号前缀、近邻、品牌先验，最后调用大模型（见_build_cascade）
+            result = self.cascade.classify(formatted_data, material_info, rule_set)
+            if not result:
+                raise ValueError("所有分类方式均未得到分类结果")
             return result
 
         except Exception as e:
             logger.error(f"物料分类失败: {material_info} -> {str(e)}")
             raise
 
-    def validate_classification_result(self, result):
+    def validate_classification_result(self, result, rule_set=None):
         """
         验证分类结果是否符合分类标准
 
+        分类编号模式下结果只包含id，按编号直接取出分类名称；否则按规范化后的分类名称查找，
+        找不到时尝试在本地修复为最接近的标准分类（修复前的名称记录在repaired_from中）
+
         参数:
             result (dict): 分类结果
+            rule_set (RuleSet): 用于验证的规则集（默认为当前规则集）
 
         返回值:
             bool: True if valid, False otherwise
@@ -425,7 +1146,16 @@ class MaterialClassifier:
         异常:
             ValueError: 如果分类结果不符合标准
         """
+        rule_set = rule_set or self.rule_set
+        classification_mapping = rule_set.classification_mapping
+
         try:
+            if CATEGORY_ID_FIELD in result:
+                category_id = result.pop(CATEGORY_ID_FIELD)
+                result["main_category"], result["sub_category"] = rule_set.category_by_id(category_id)
+                logger.info(f"分类结果验证通过：{result}")
+                return True
+
             main_category = result.get("main_category")
             sub_category = result.get("sub_category")
 
@@ -442,14 +1172,18 @@ class MaterialClassifier:
                 str(sub_category).strip().lower().replace(" ", "").replace("\t", "")
             )
 
-            # 检查是否在分类标准中
-            if (normalized_main, normalized_sub) not in self.classification_mapping:
+            # 检查是否在分类标准中，不符合时尝试本地修复
+            category_key = (normalized_main, normalized_sub)
+            if category_key not in classification_mapping:
+                category_key = self._repair_category(main_category, sub_category, result, rule_set)
+
+            if category_key not in classification_mapping:
                 # Get the closest matches for debugging
                 main_categories = set(
-                    main for main, sub in self.classification_mapping.keys()
+                    main for main, sub in classification_mapping.keys()
                 )
                 sub_categories = set(
-                    sub for main, sub in self.classification_mapping.keys()
+                    sub for main, sub in classification_mapping.keys()
                 )
 
                 logger.error(
@@ -466,9 +1200,7 @@ class MaterialClassifier:
                 )
 
             # Get the original category names from the mapping and update the result
-            original_main, original_sub, _, _, _ = self.classification_mapping[
-                (normalized_main, normalized_sub)
-            ]
+            original_main, original_sub, _, _, _ = classification_mapping[category_key]
             result["main_category"] = original_main
             result["sub_category"] = original_sub
 
@@ -480,18 +1212,51 @@ class MaterialClassifier:
             logger.error(f"分类结果验证失败: {e}")
             raise
 
-    def classify_batch(self, materials_list):
+    def _repair_category(self, main_category, sub_category, result, rule_set):
+        """
+        将不符合标准的分类名称修复为最接近的标准分类
+
+        参数:
+            main_category: 模型返回的大类
+            sub_category: 模型返回的二级类
+            result (dict): 分类结果，修复成功时写入repaired_from
+            rule_set (RuleSet): 本次分类使用的规则集
+
+        返回值:
+            tuple: 修复后的分类映射键；无法修复时返回None
+        """
+        if not Config.CATEGORY_REPAIR_MIN_SCORE:
+            return None
+
+        repaired = rule_set.category_repairer.repair(main_category, sub_category, Config.CATEGORY_REPAIR_MIN_SCORE)
+        if repaired is None:
+            return None
+
+        category_key, method, score = repaired
+        result["repaired_from"] = f"{main_category}/{sub_category}"
+        logger.warning(
+            f"分类结果已本地修复({method}, 相似度 {score})：大类={main_category}, 二级类={sub_category} "
+            f"-> {category_key}"
+        )
+        return category_key
+
+    def classify_batch(self, materials_list, llm_batch_size=None):
         """
         批量分类物料
 
         参数:
             materials_list (list): 物料数据列表，每个元素是包含"型号", "品牌", "供应商"等键的字典
+            llm_batch_size (int): 指定时先对全部物料进行本地关键词匹配，
+                未匹配的物料每llm_batch_size条合并为一次大模型请求（见classify_llm_batch）
 
         返回值:
             list: 分类结果列表，每个元素是包含原始物料数据和分类结果的字典
         """
+        if llm_batch_size:
+            return self._classify_batch_with_llm_batches(materials_list, llm_batch_size)
+
         results = []
-        for i, material in enumerate(materials_list):
+        for material in materials_list:
             try:
                 classification_result = self.classify_material(material)
                 results.append(
@@ -502,12 +1267,219 @@ class MaterialClassifier:
                     }
                 )
             except Exception as e:
-                results.append(
-                    {"original_data": material, "error": str(e), "status": "failed"}
-                )
-            if i < len(materials_list) - 1:  # 最后一条不延迟
-                time.sleep(Config.API_RATE_LIMIT)  # 防止API请求过于频繁
+                results.append(self._error_result(material, e))
 
         return results
 
+    @staticmethod
+    def _error_result(material, error):
+        """
+        构建分类失败的结果，熔断期间未能分类的物料标记为deferred，可在接口恢复后重新处理
+
+        参数:
+            material (dict): 物料数据
+            error (Exception): 分类异常
+
+        返回值:
+            dict: 包含原始物料数据、错误信息和状态（failed / deferred）的字典
+        """
+        status = "deferred" if isinstance(error, CircuitOpenError) else "failed"
+        return {"original_data": material, "error": str(error), "status": status}
+
+    def _classify_batch_with_llm_batches(self, materials_list, llm_batch_size):
+        """
+        全部物料整体经过分级分类流水线：每级一次处理所有待分类物料，
+        最后仍未命中的物料合并为批量大模型请求
+
+        参数:
+            materials_list (list): 物料数据列表
+            llm_batch_size (int): 每次大模型请求包含的物料数
+
+        返回值:
+            list: 分类结果列表，格式同classify_batch
+        """
+        rule_set = self.rule_set
+        results = [None] * len(materials_list)
+        indexes, items = [], []
+
+        for index, material in enumerate(materials_list):
+            try:
+                items.append(self._format_material(material))
+                indexes.append(index)
+            except Exception as e:
+                results[index] = self._error_result(material, e)
+
+        outcomes = self.cascade.classify_batch(items, rule_set, llm_batch_size=llm_batch_size)
+        for index, outcome in zip(indexes, outcomes):
+            results[index] = self._batch_result(materials_list[index], outcome)
+        return results
+
+    def _batch_result(self, material, outcome):
+        """
+        将流水线的单条输出转为批量分类结果
+
+        参数:
+            material (dict): 原始物料数据
+            outcome: 分类结果、异常对象或None（各级均未命中）
+
+        返回值:
+            dict: 格式同classify_batch
+        """
+        if isinstance(outcome, Exception):
+            return self._error_result(material, outcome)
+        if not outcome:
+            return self._error_result(material, ValueError("所有分类方式均未得到分类结果"))
+        return {"original_data": material, "classification": outcome, "status": "success"}
+
+    def _generate_batch_prompt(self, material_infos, use_category_ids=False):
+        """
+        生成多物料批量分类请求的提示词
+
+        参数:
+            material_infos (list): [(item_id, material_info), ...]
+            use_category_ids (bool): 是否要求模型输出分类编号（category_id）代替分类名称
+
+        返回值:
+            str: 生成的提示词
+        """
+        items = "\n".join(f"{item_id}. {material_info}" for item_id, material_info in material_infos)
+        fields = (
+            "仅包含id（物料序号）和category_id（分类编号，与单条分类输出的category_id含义相同）两个字段，"
+            if use_category_ids
+            else "仅包含id（物料序号）、main_category和sub_category三个字段，"
+        )
+        return (
+            f"现在请对以下{len(material_infos)}条物料逐一进行分类，每行开头为物料序号：\n{items}\n"
+            '请输出严格的JSON对象，格式为{"results": [...]}，results数组中每条物料对应一个元素，'
+            f"{fields}不得包含任何其他解释或注释。\n分类结果："
+        )
+
+    def _parse_batch_response(self, content):
+        """
+        解析批量分类的响应内容
+
+        参数:
+            content (str): 模型输出内容
+
+        返回值:
+            dict: {item_id: {"main_category": ..., "sub_category": ...}}
+
+        异常:
+            ValueError: 响应中没有可解析的JSON数组
+        """
+        # 移除可能的markdown标记
+        cleaned_content = strip_code_fence(content)
+
+        try:
+            parsed_result = json.loads(cleaned_content)
+        except json.JSONDecodeError:
+            # 处理带思考过程的响应：取第一个"["到最后一个"]"之间的内容
+            start = cleaned_content.find("[")
+            end = cleaned_content.rfind("]")
+            if start == -1 or end <= start:
+                raise ValueError("API返回内容中未找到JSON数组")
+            parsed_result = json.loads(cleaned_content[start:end + 1])
+
+        # 兼容 {"results": [...]} 形式的包装对象
+        if isinstance(parsed_result, dict):
+            parsed_result = parsed_result.get("results", parsed_result.get("items"))
+
+        if not isinstance(parsed_result, list):
+            raise ValueError("API返回的JSON不是预期的数组格式")
+
+        items = {}
+        for item in parsed_result:
+            if not isinstance(item, dict):
+                continue
+            try:
+                item_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            items[item_id] = item
+
+        return items
 
+    def classify_llm_batch(self, materials, batch_size=None, rule_set=None):
+        """
+        使用大模型批量分类物料，每batch_size条物料合并为一次请求
+
+        模型返回以物料序号为键的JSON数组，逐条经validate_classification_result验证；
+        批量请求失败、结果缺失或验证失败的物料单独再调用一次大模型
+
+        参数:
+            materials (list): 物料数据列表（通常为本地关键词匹配失败的物料）
+            batch_size (int): 每次请求包含的物料数（默认为Config.LLM_BATCH_SIZE）
+            rule_set (RuleSet): 本次分类使用的规则集（默认为当前规则集）
+
+        返回值:
+            list: 与materials一一对应的分类结果列表，格式同classify_batch
+        """
+        rule_set = rule_set or self.rule_set
+        items = [self._format_material(material) for material in materials]
+        outcomes = self._classify_batch_by_llm(items, rule_set, batch_size)
+        return [self._batch_result(material, outcome) for material, outcome in zip(materials, outcomes)]
+
+    def _classify_batch_by_llm(self, items, rule_set, llm_batch_size=None):
+        """
+        批量大模型分类（分级分类流水线的最后一级），验证通过的结果写入缓存
+
+        参数:
+            items (list): [(formatted_data, material_info), ...]
+            rule_set (RuleSet): 本次分类使用的规则集
+            llm_batch_size (int): 每次请求包含的物料数（默认为Config.LLM_BATCH_SIZE）
+
+        返回值:
+            list: 与items一一对应的分类结果或异常对象
+        """
+        batch_size = llm_batch_size or Config.LLM_BATCH_SIZE
+        outcomes = [None] * len(items)
+        logger.info(f"本地关键词匹配失败 {len(items)} 条，将批量使用大模型进行分类...")
+
+        for start in range(0, len(items), batch_size):
+            indexes = range(start, min(start + batch_size, len(items)))
+            material_infos = [(item_id, items[index][1]) for item_id, index in enumerate(indexes, 1)]
+
+            try:
+                content = self._request_completion(
+                    self._generate_batch_prompt(material_infos, rule_set.use_category_ids), rule_set
+                )
+                batch_items = self._parse_batch_response(content)
+            except Exception as e:
+                logger.error(f"批量分类请求失败，{len(material_infos)} 条物料将逐条重试: {e}")
+                batch_items = {}
+
+            failed = []
+            for (item_id, material_info), index in zip(material_infos, indexes):
+                item = batch_items.get(item_id)
+                if item is None:
+                    failed.append((index, material_info))
+                    continue
+
+                if CATEGORY_ID_FIELD in item:
+                    classification = {CATEGORY_ID_FIELD: item[CATEGORY_ID_FIELD]}
+                else:
+                    classification = {"main_category": item.get("main_category"), "sub_category": item.get("sub_category")}
+                classification["classification_source"] = "deepseek_api_batch"
+                try:
+                    self.validate_classification_result(classification, rule_set)
+                except ValueError:
+                    failed.append((index, material_info))
+                    continue
+
+                self._cache_result(items[index][0], rule_set, classification)
+                outcomes[index] = classification
+
+            logger.info(f"批量分类完成 {len(material_infos) - len(failed)}/{len(material_infos)} 条，{len(failed)} 条逐条重试")
+
+            # 仅对失败的物料逐条重试
+            for index, material_info in failed:
+                try:
+                    classification = self._call_deepseek_api(self._generate_prompt(material_info), rule_set)
+                    self.validate_classification_result(classification, rule_set)
+                    self._cache_result(items[index][0], rule_set, classification)
+                    outcomes[index] = classification
+                except Exception as e:
+                    logger.error(f"物料分类失败: {material_info} -> {str(e)}")
+                    outcomes[index] = e
+
+        return outcomes
@@ -6,11 +6,11 @@
 """
 
 import json
-import time
 import pandas as pd
 from config import Config
 from logger import logger
 from material_classifier import MaterialClassifier
+from circuit_breaker import CircuitOpenError
 
 class MaterialManager:
     """物料管理类，整合分类功能"""
@@ -85,16 +85,17 @@ class MaterialManager:
             return {
                 "original_data": material_data,
                 "error": str(e),
-                "status": "failed"
+                # 熔断期间未处理的物料标记为deferred，接口恢复后可重新处理
+                "status": "deferred" if isinstance(e, CircuitOpenError) else "failed"
             }
 
-    def process_batch(self, materials_list, max_workers=5, max_samples=None):
+    def process_batch(self, materials_list, max_workers=None, max_samples=None):
         """
         批量处理物料：分类，支持多线程
 
         参数:
             materials_list (list): 原始物料数据列表，每个元素包含"物料名称", "图号/型号", "材料", "分类/品牌"等键
-            max_workers (int): 最大线程数
+            max_workers (int): 最大线程数（默认为Config.LLM_MAX_CONCURRENCY，实际的大模型并发由分类器自适应控制）
             max_samples (int): 最大处理样本数(None表示全部)
 
         返回值:
@@ -122,16 +123,14 @@ class MaterialManager:
                     progress = (processed_count / total_materials) * 100
                     logger.info(f"批量处理进度: {processed_count}/{total_materials} ({progress:.1f}%)")
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or Config.LLM_MAX_CONCURRENCY) as executor:
             # 提交所有任务
             future_to_material = {executor.submit(thread_process, material): material for material in processed_materials}
 
-            # 处理完成的任务（可选，这里主要是为了错误处理和延迟）
+            # 处理完成的任务（主要是为了错误处理，API限流由分类器统一负责）
             for future in concurrent.futures.as_completed(future_to_material):
                 try:
                     future.result()
-                    # 限制API调用频率
-                    time.sleep(Config.API_RATE_LIMIT)
                 except Exception as e:
                     material = future_to_material[future]
                     logger.error(f"线程任务处理失败: {material.get('物料名称', '未知物料')} -> {e}")
@@ -151,6 +150,44 @@ class MaterialManager:
 
         return results
 
+    def process_batch_async(self, materials_list, max_concurrency=None, max_samples=None):
+        """
+        批量处理物料：分类，使用异步客户端在单线程内并发请求大模型
+
+        参数:
+            materials_list (list): 原始物料数据列表，每个元素包含"物料名称", "图号/型号", "材料", "分类/品牌"等键
+            max_concurrency (int): 同时进行的大模型请求上限（默认为Config.ASYNC_MAX_CONCURRENCY）
+            max_samples (int): 最大处理样本数(None表示全部)
+
+        返回值:
+            list: 处理结果列表，格式同process_batch
+        """
+        from async_classifier import classify_batch_async
+
+        # 限制样本数量
+        processed_materials = materials_list[:max_samples] if max_samples else materials_list
+
+        classify_infos = [self._extract_material_info(material) for material in processed_materials]
+        classified = classify_batch_async(classify_infos, max_concurrency)
+
+        results = []
+        for material_data, item in zip(processed_materials, classified):
+            if item["status"] == "success":
+                results.append({
+                    "original_data": material_data,
+                    "classification_result": item["classification"],
+                    "status": "success"
+                })
+            else:
+                results.append({
+                    "original_data": material_data,
+                    "error": item["error"],
+                    "status": item["status"]
+                })
+
+        logger.info(f"异步批量处理完成: {len(results)} 条物料")
+        return results
+
     def read_materials_from_csv(self, csv_file_path):
         """
         从CSV文件读取原始物料数据
@@ -499,10 +536,33 @@ def main():
         results = material_manager.process_batch(materials_to_process)
 
         # 写入处理结果
-        logger.info(f"分类完成，共处理 {len(results)} 条物料 (成功: {sum(1 for r in results if r['status'] == 'success')}, 失败: {sum(1 for r in results if r['status'] == 'failed')})")
+        logger.info(f"分类完成，共处理 {len(results)} 条物料 (成功: {sum(1 for r in results if r['status'] == 'success')}, 失败: {sum(1 for r in results if r['status'] == 'failed')}, 熔断推迟: {sum(1 for r in results if r['status'] == 'deferred')})")
         logger.info(f"开始写入结果到: {output_file_path}")
         material_manager.write_results_to_csv(results, output_file_path)
 
+        usage = MaterialClassifier.get_usage_stats()
+        logger.info(
+            f"大模型调用统计: 请求 {usage['requests']} 次, 提示Token {usage['prompt_tokens']} "
+            f"(缓存命中 {usage['prompt_cache_hit_tokens']}, 未命中 {usage['prompt_cache_miss_tokens']}, "
+            f"命中率 {usage['prompt_cache_hit_rate']:.1%}), 补全Token {usage['completion_tokens']}"
+        )
+        for tier, stats in MaterialClassifier.get_cascade_stats().items():
+            logger.info(
+                f"分级分类 {tier}: 处理 {stats['items']} 条, 命中 {stats['hits']} 条 (命中率 {stats['hit_rate']:.1%}), "
+                f"失败 {stats['errors']} 条, 平均耗时 {stats['avg_latency_ms']:.1f} 毫秒, Token {stats['cost']}"
+            )
+        latency = MaterialClassifier.get_latency_stats()
+        if latency["samples"]:
+            logger.info(
+                f"大模型请求耗时: p50 {latency['p50']:.2f} 秒, p95 {latency['p95']:.2f} 秒, "
+                f"p99 {latency['p99']:.2f} 秒, 最长 {latency['max']:.2f} 秒 (最近 {latency['samples']} 次); "
+                f"对冲请求 {latency['hedges']} 次, 其中先返回 {latency['hedge_wins']} 次"
+            )
+        concurrency = MaterialClassifier.get_concurrency_stats()
+        logger.info(
+            f"大模型并发控制: 当前并发上限 {concurrency['limit']}, "
+            f"平滑耗时 {concurrency['latency'] or 0:.2f} 秒, 限流事件 {concurrency['throttle_events']} 次"
+        )
         logger.info("物料分类处理全部完成！")
         logger.info(f"结果文件: {output_file_path}")
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+型号前缀树模块
+由历史分类结果中的 型号 -> (大类, 二级类) 构建前缀树，每个节点记录经过该前缀的各分类的支持数。
+查询时沿型号逐字符下行，取满足最短前缀、最小支持数和纯度要求的最深前缀的多数分类
+"""
+
+import unicodedata
+from result_history import ResultHistory
+
+
+def normalize_model(model):
+    """
+    标准化型号：全角转半角、转大写并去除空白字符
+
+    参数:
+        model: 型号
+
+    返回值:
+        str: 标准化后的型号
+    """
+    if not model or (isinstance(model, float) and model != model):
+        return ""
+    return "".join(unicodedata.normalize("NFKC", str(model)).upper().split())
+
+
+class ModelPrefixTrie(ResultHistory):
+    """
+    带支持数的型号前缀树
+
+    与KeywordAutomaton相同，节点以序号表示，子节点表保存在列表中；
+    每个节点额外记录经过该节点的型号总数、各分类的支持数和当前支持数最多的分类，
+    查询时无需遍历分类，耗时只与型号长度成正比
+    """
+
+    FORMAT_VERSION = 3
+    DESCRIPTION = "型号前缀树"
+
+    def _clear(self):
+        """清空前缀树"""
+        super()._clear()
+        self._children = [{}]
+        self._totals = [0]
+        self._counts = [{}]
+        self._best = [None]
+        self._labels = []
+        self._label_ids = {}
+
+    def __len__(self):
+        """已导入的型号数"""
+        return self._totals[0]
+
+    def add_record(self, formatted_data, label):
+        """
+        导入一条历史分类结果（按型号）
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            label (tuple): (大类, 二级类)
+        """
+        self.add(formatted_data.get("型号"), label)
+
+    def add(self, model, label):
+        """
+        导入一条历史分类结果
+
+        参数:
+            model: 型号
+            label (tuple): (大类, 二级类)
+        """
+        model = normalize_model(model)
+        if not model:
+            return
+
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self._labels)
+            self._labels.append(label)
+
+        node = 0
+        self._totals[0] += 1
+        for ch in model:
+            next_node = self._children[node].get(ch)
+            if next_node is None:
+                next_node = len(self._children)
+                self._children[node][ch] = next_node
+                self._children.append({})
+                self._totals.append(0)
+                self._counts.append({})
+                self._best.append(None)
+            node = next_node
+
+            counts = self._counts[node]
+            counts[label_id] = counts.get(label_id, 0) + 1
+            self._totals[node] += 1
+            best = self._best[node]
+            if best is None or counts[label_id] > counts[best]:
+                self._best[node] = label_id
+
+    def lookup(self, model, min_length, min_support, min_purity):
+        """
+        按型号前缀查找分类
+
+        参数:
+            model: 型号
+            min_length (int): 参与判断的最短前缀长度
+            min_support (int): 前缀下的最少历史型号数
+            min_purity (float): 多数分类在该前缀下的最低占比（0~1）
+
+        返回值:
+            tuple: ((大类, 二级类), 前缀, 支持数, 纯度)；没有满足条件的前缀时返回None
+        """
+        model = normalize_model(model)
+        node = 0
+        hit = None
+        for depth, ch in enumerate(model, 1):
+            node = self._children[node].get(ch)
+            if node is None:
+                break
+            total = self._totals[node]
+            if depth < min_length or total < min_support:
+                continue
+            support = self._counts[node][self._best[node]]
+            if support >= min_purity * total:
+                hit = (node, depth, support, total)
+
+        if hit is None:
+            return None
+        node, depth, support, total = hit
+        return self._labels[self._best[node]], model[:depth], support, round(support / total, 3)
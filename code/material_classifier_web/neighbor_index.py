@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已标注物料近邻索引模块
+用已有的人工/历史分类结果离线训练字符n-gram TF-IDF索引，关键词匹配失败的物料先在本地查找
+最相似的已标注物料，相似度足够高时直接采用其分类，不再调用大模型
+
+运行 python neighbor_index.py 按Config.NEIGHBOR_TRAINING_FILES重新训练并保存索引
+"""
+
+import math
+import os
+import re
+import unicodedata
+import numpy as np
+from config import Config
+from logger import logger
+
+# 索引文件格式版本，结构变化时递增，使旧索引自动失效
+INDEX_FORMAT_VERSION = 1
+
+# 一次批量查询中得分矩阵（查询数 x 已标注物料数）的最大元素数，控制内存占用
+MAX_SCORE_CELLS = 2_000_000
+
+# 批量查询时倒排列表最长的若干特征（单字等常见特征，占倒排元素的绝大部分）改用稠密矩阵乘法，
+# 其余特征仍展开倒排列表累加；稠密矩阵占用 已标注物料数 x 该值 x 8 字节
+DENSE_FEATURE_COUNT = 256
+
+# 由本地推断（而非人工或大模型）得到的分类来源，不作为训练标注，避免自我强化
+DERIVED_SOURCES = ("neighbor_index", "model_prefix", "brand_prior")
+
+# 各字段的特征前缀和n-gram长度；品牌作为整体特征
+_FIELD_NGRAMS = (
+    ("物料名称", "n:", (1, 2, 3)),
+    ("型号", "m:", (1, 2, 3)),
+    ("材料", "t:", (2,)),
+)
+
+
+def _normalize_text(text):
+    """标准化文本：全角转半角、转小写并去除空白字符"""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return ""
+    return "".join(unicodedata.normalize("NFKC", str(text)).lower().split())
+
+
+def material_features(formatted_data):
+    """
+    提取物料的字符n-gram特征
+
+    参数:
+        formatted_data (dict): 格式化后的物料数据，包含"物料名称", "型号", "品牌", "材料"等键
+
+    返回值:
+        dict: {特征: 出现次数}，特征带字段前缀，不同字段的相同字符串互不混淆
+    """
+    features = {}
+    for field, prefix, sizes in _FIELD_NGRAMS:
+        text = _normalize_text(formatted_data.get(field))
+        for size in sizes:
+            for i in range(len(text) - size + 1):
+                feature = prefix + text[i:i + size]
+                features[feature] = features.get(feature, 0) + 1
+
+    brand = _normalize_text(formatted_data.get("品牌"))
+    if brand:
+        features["b:" + brand] = 1
+    return features
+
+
+class NeighborIndex:
+    """
+    已标注物料的TF-IDF倒排索引，查询时以稀疏向量点积（余弦相似度）批量计算最近邻
+
+    构建完成后不再修改，可在多个线程之间共享
+    """
+
+    def __init__(self, vocabulary, idf, posting_ptr, posting_rows, posting_weights, row_labels, labels):
+        """
+        初始化索引（通常通过build或load创建）
+
+        参数:
+            vocabulary (dict): {特征: 特征序号}
+            idf (numpy.ndarray): 各特征的IDF
+            posting_ptr (numpy.ndarray): 特征i的倒排列表为posting_rows[posting_ptr[i]:posting_ptr[i+1]]
+            posting_rows (numpy.ndarray): 倒排列表中的已标注物料序号
+            posting_weights (numpy.ndarray): 对应的归一化TF-IDF权重
+            row_labels (numpy.ndarray): 各已标注物料的分类序号
+            labels (list): 分类序号 -> (大类, 二级类)
+        """
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.posting_ptr = posting_ptr
+        self.posting_rows = posting_rows
+        self.posting_weights = posting_weights
+        self.row_labels = row_labels
+        self.labels = labels
+        # 查询中出现训练集未见过的特征时按最大IDF计入向量长度，降低其相似度
+        self.unseen_idf = math.log(len(row_labels) + 1) + 1
+        # 批量查询使用的稠密特征矩阵，首次批量查询时构建
+        self._dense = None
+
+    def __len__(self):
+        return len(self.row_labels)
+
+    @classmethod
+    def build(cls, materials, labels):
+        """
+        从已标注物料构建索引
+
+        参数:
+            materials (list): 格式化后的物料数据列表
+            labels (list): 与materials一一对应的(大类, 二级类)
+
+        返回值:
+            NeighborIndex: 构建好的索引
+        """
+        vocabulary = {}
+        label_ids = {}
+        rows, cols, counts, row_labels = [], [], [], []
+
+        for material, label in zip(materials, labels):
+            features = material_features(material)
+            if not features:
+                continue
+            row = len(row_labels)
+            row_labels.append(label_ids.setdefault(tuple(label), len(label_ids)))
+            for feature, count in features.items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+                counts.append(count)
+
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int64)
+        row_count = len(row_labels)
+
+        # 平滑IDF与对数TF，每条物料的向量归一化为单位长度
+        document_frequency = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + row_count) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.asarray(counts, dtype=np.float64))) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=row_count))
+        weights /= norms[rows]
+
+        order = np.argsort(cols, kind="stable")
+        posting_ptr = np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64)
+
+        return cls(
+            vocabulary,
+            idf,
+            posting_ptr,
+            rows[order],
+            weights[order].astype(np.float32),
+            np.asarray(row_labels, dtype=np.int32),
+            list(label_ids),
+        )
+
+    def _vectorize(self, formatted_data):
+        """
+        将物料转为查询向量
+
+        返回值:
+            tuple: (特征序号数组, 归一化权重数组)，只包含训练集中出现过的特征
+        """
+        feature_ids, weights = [], []
+        norm = 0.0
+        for feature, count in material_features(formatted_data).items():
+            feature_id = self.vocabulary.get(feature)
+            weight = (1 + math.log(count)) * (self.unseen_idf if feature_id is None else self.idf[feature_id])
+            norm += weight * weight
+            if feature_id is not None:
+                feature_ids.append(feature_id)
+                weights.append(weight)
+
+        if not feature_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.asarray(feature_ids, dtype=np.int64), np.asarray(weights) / math.sqrt(norm)
+
+    def _sparse_scores(self, query_rows, feature_ids, query_weights, query_count):
+        """
+        展开查询特征的倒排列表，累加得到查询与全部已标注物料的相似度
+
+        参数:
+            query_rows (numpy.ndarray): 各查询特征所属的查询序号
+            feature_ids (numpy.ndarray): 查询特征序号
+            query_weights (numpy.ndarray): 查询特征权重
+            query_count (int): 查询数
+
+        返回值:
+            numpy.ndarray: 相似度矩阵（查询数 x 已标注物料数）
+        """
+        row_count = len(self.row_labels)
+        posting_starts = self.posting_ptr[feature_ids]
+        posting_counts = self.posting_ptr[feature_ids + 1] - posting_starts
+        positions = np.arange(posting_counts.sum()) + np.repeat(
+            posting_starts - np.cumsum(posting_counts) + posting_counts, posting_counts
+        )
+        cells = np.repeat(query_rows, posting_counts) * row_count + self.posting_rows[positions]
+        contributions = self.posting_weights[positions] * np.repeat(query_weights, posting_counts)
+        scores = np.bincount(cells, weights=contributions, minlength=query_count * row_count)
+        return scores.reshape(query_count, row_count)
+
+    def _dense_features(self):
+        """
+        构建批量查询使用的稠密特征矩阵
+
+        返回值:
+            tuple: (特征序号 -> 稠密矩阵列号的数组（非稠密特征为-1）, 稠密矩阵（已标注物料数 x 稠密特征数）)
+        """
+        if self._dense is None:
+            document_frequency = np.diff(self.posting_ptr)
+            dense_ids = np.argsort(-document_frequency, kind="stable")[:DENSE_FEATURE_COUNT]
+            columns = np.full(len(document_frequency), -1, dtype=np.int64)
+            columns[dense_ids] = np.arange(len(dense_ids))
+            matrix = np.zeros((len(self.row_labels), len(dense_ids)))
+            for column, feature_id in enumerate(dense_ids):
+                start, end = self.posting_ptr[feature_id], self.posting_ptr[feature_id + 1]
+                matrix[self.posting_rows[start:end], column] = self.posting_weights[start:end]
+            # 单次引用赋值，多个线程同时构建时结果相同
+            self._dense = (columns, matrix)
+        return self._dense
+
+    def _best_match(self, scores, min_similarity):
+        """取相似度最高的已标注物料，达到阈值时返回((大类, 二级类), 相似度)，否则返回None"""
+        best_row = int(scores.argmax())
+        if scores[best_row] < min_similarity:
+            return None
+        return self.labels[self.row_labels[best_row]], round(float(scores[best_row]), 4)
+
+    def query_batch(self, materials, min_similarity):
+        """
+        批量查找最相似的已标注物料
+
+        常见特征的得分以稠密矩阵乘法一次算出整块查询，其余特征展开倒排列表累加；
+        特征完全相同的物料只计算一次
+
+        参数:
+            materials (list): 格式化后的物料数据列表
+            min_similarity (float): 采用近邻分类的最低余弦相似度
+
+        返回值:
+            list: 与materials一一对应，命中时为((大类, 二级类), 相似度)，否则为None
+        """
+        results = [None] * len(materials)
+        row_count = len(self.row_labels)
+        if not row_count:
+            return results
+
+        # 按特征去重，重复物料共用同一查询
+        unique_vectors = {}
+        query_of = []
+        for material in materials:
+            feature_ids, weights = self._vectorize(material)
+            key = (feature_ids.tobytes(), weights.tobytes())
+            query_of.append(unique_vectors.setdefault(key, (len(unique_vectors), feature_ids, weights))[0])
+        vectors = [(feature_ids, weights) for _, feature_ids, weights in unique_vectors.values()]
+
+        columns, matrix = self._dense_features()
+        chunk_size = max(1, MAX_SCORE_CELLS // row_count)
+        unique_results = [None] * len(vectors)
+
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            query_rows = np.repeat(np.arange(len(chunk)), [len(feature_ids) for feature_ids, _ in chunk])
+            if not len(query_rows):
+                continue
+            feature_ids = np.concatenate([feature_ids for feature_ids, _ in chunk])
+            query_weights = np.concatenate([weights for _, weights in chunk])
+            feature_columns = columns[feature_ids]
+            dense = feature_columns >= 0
+
+            dense_queries = np.zeros((len(chunk), matrix.shape[1]))
+            dense_queries[query_rows[dense], feature_columns[dense]] = query_weights[dense]
+            scores = dense_queries @ matrix.T
+            sparse = ~dense
+            if sparse.any():
+                scores += self._sparse_scores(query_rows[sparse], feature_ids[sparse], query_weights[sparse], len(chunk))
+
+            for offset in range(len(chunk)):
+                unique_results[start + offset] = self._best_match(scores[offset], min_similarity)
+
+        return [unique_results[query] for query in query_of]
+
+    def query(self, formatted_data, min_similarity):
+        """
+        查找单个物料最相似的已标注物料
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            min_similarity (float): 采用近邻分类的最低余弦相似度
+
+        返回值:
+            tuple: ((大类, 二级类), 相似度)，未命中时返回None
+        """
+        feature_ids, weights = self._vectorize(formatted_data)
+        if not len(self.row_labels) or not len(feature_ids):
+            return None
+        scores = self._sparse_scores(np.zeros(len(feature_ids), dtype=np.int64), feature_ids, weights, 1)
+        return self._best_match(scores[0], min_similarity)
+
+    def save(self, index_file):
+        """
+        保存索引，先写临时文件再原子替换
+
+        参数:
+            index_file: 索引文件路径
+        """
+        index_dir = os.path.dirname(index_file)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+
+        temp_file = f"{index_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    format_version=np.array(INDEX_FORMAT_VERSION),
+                    vocabulary=np.array(list(self.vocabulary), dtype=str),
+                    idf=self.idf,
+                    posting_ptr=self.posting_ptr,
+                    posting_rows=self.posting_rows,
+                    posting_weights=self.posting_weights,
+                    row_labels=self.row_labels,
+                    label_main=np.array([main for main, _ in self.labels], dtype=str),
+                    label_sub=np.array([sub for _, sub in self.labels], dtype=str),
+                )
+            os.replace(temp_file, index_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+    @classmethod
+    def load(cls, index_file):
+        """
+        读取索引文件
+
+        参数:
+            index_file: 索引文件路径
+
+        返回值:
+            NeighborIndex: 索引
+
+        异常:
+            ValueError: 索引文件格式版本不一致
+        """
+        with np.load(index_file, allow_pickle=False) as data:
+            if int(data["format_version"]) != INDEX_FORMAT_VERSION:
+                raise ValueError(f"近邻索引格式版本不一致，请重新训练: {index_file}")
+            return cls(
+                {feature: i for i, feature in enumerate(data["vocabulary"].tolist())},
+                data["idf"],
+                data["posting_ptr"],
+                data["posting_rows"],
+                data["posting_weights"],
+                data["row_labels"],
+                list(zip(data["label_main"].tolist(), data["label_sub"].tolist())),
+            )
+
+
+def load_labeled_materials(file_path):
+    """
+    读取已标注物料文件（物料优选库或分类结果文件，Excel或CSV）
+
+    需要列：物料名称、图号/型号、分类/品牌、功能大类、二级分类；材料取"材料/描述"或"材料"列，
+    供应商取"供应商"或"对应品牌或供应商"列；
+    有"分类状态"列时只使用分类成功的行，有"分类来源"列时跳过本地推断得到的结果
+
+    参数:
+        file_path: Excel或CSV文件路径
+
+    返回值:
+        list: [(formatted_data, 大类, 二级类), ...]，大类已去除"23 "形式的序号前缀
+    """
+    import pandas as pd
+
+    if str(file_path).lower().endswith(".csv"):
+        df = pd.read_csv(file_path, encoding="utf-8-sig", dtype=str).fillna("")
+    else:
+        df = pd.read_excel(file_path, engine="openpyxl").fillna("")
+    if "分类状态" in df.columns:
+        df = df[df["分类状态"] == "success"]
+    if "分类来源" in df.columns:
+        df = df[~df["分类来源"].isin(DERIVED_SOURCES)]
+
+    labeled = []
+    for row in df.to_dict("records"):
+        main_category = re.sub(r"^\d+\s+", "", str(row.get("功能大类", "")).strip())
+        sub_category = str(row.get("二级分类", "")).strip()
+        if not main_category or not sub_category:
+            continue
+        formatted_data = {
+            "型号": row.get("图号/型号", ""),
+            "品牌": row.get("分类/品牌", ""),
+            "供应商": row.get("供应商", row.get("对应品牌或供应商", "")),
+            "物料名称": row.get("物料名称", ""),
+            "材料": row.get("材料/描述", row.get("材料", "")),
+        }
+        labeled.append((formatted_data, main_category, sub_category))
+    return labeled
+
+
+def exclude_files(file_paths, excluded_files):
+    """
+    去掉不参与训练的文件（如验证数据文件，参与训练会使验证准确率虚高）
+
+    参数:
+        file_paths (list): 文件路径
+        excluded_files (list): 要去掉的文件路径，按规范化后的绝对路径比较
+
+    返回值:
+        list: 去掉后的文件路径，保持原顺序
+    """
+    excluded = {os.path.realpath(path) for path in excluded_files if path}
+    kept = []
+    for path in file_paths:
+        if os.path.realpath(path) in excluded:
+            logger.info(f"跳过不参与训练的文件: {path}")
+            continue
+        kept.append(path)
+    return kept
+
+
+def train_neighbor_index(training_files, rule_set):
+    """
+    从已标注物料文件训练近邻索引，只保留当前分类标准中存在的分类
+
+    参数:
+        training_files (list): 已标注物料Excel文件路径
+        rule_set (RuleSet): 用于校验分类名称的规则集
+
+    返回值:
+        NeighborIndex: 训练好的索引
+    """
+    materials, labels = [], []
+    for file_path in training_files:
+        labeled = load_labeled_materials(file_path)
+        skipped = 0
+        for formatted_data, main_category, sub_category in labeled:
+            # 仅接受与标准分类名称规范化后一致（或二级类唯一）的标注，不做模糊修复
+            repaired = rule_set.category_repairer.repair(main_category, sub_category, 1.0)
+            if repaired is None:
+                skipped += 1
+                continue
+            materials.append(formatted_data)
+            labels.append(rule_set.classification_mapping[repaired[0]][:2])
+        logger.info(f"读取已标注物料 {len(labeled) - skipped} 条: {file_path}（跳过 {skipped} 条不在分类标准中的标注）")
+
+    index = NeighborIndex.build(materials, labels)
+    logger.info(f"近邻索引训练完成: {len(index)} 条物料, {len(index.vocabulary)} 个特征, {len(index.labels)} 个分类")
+    return index
+
+
+def main():
+    """按配置训练近邻索引并保存到Config.NEIGHBOR_INDEX_FILE"""
+    from rule_set import load_rule_set
+
+    training_files = exclude_files(Config.NEIGHBOR_TRAINING_FILES, Config.LEARNED_TIER_EXCLUDED_FILES)
+    index = train_neighbor_index(training_files, load_rule_set())
+    index.save(Config.NEIGHBOR_INDEX_FILE)
+    logger.info(f"近邻索引已保存: {Config.NEIGHBOR_INDEX_FILE}")
+
+
+if __name__ == "__main__":
+    main()
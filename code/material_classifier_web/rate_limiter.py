@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API限流模块
+基于令牌桶，同时限制每秒请求数和每分钟Token数，仅在实际发送大模型请求时扣减
+"""
+
+import math
+import threading
+import time
+
+# 估算提示词Token数时每个字符对应的Token数（DeepSeek中文约0.6，英文约0.3，按偏大的一侧估算）
+TOKENS_PER_CHAR = 0.6
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    采用预约方式扣减：令牌不足时余额可以为负，调用方按返回的等待时间自行等待，
+    因此同步线程和异步协程都可以共用同一个令牌桶
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """
+        初始化令牌桶
+
+        参数:
+            rate (float): 每秒补充的令牌数
+            capacity (float): 桶容量，即允许的最大突发量
+            clock: 单调时钟函数，便于测试替换
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """
+        预约令牌
+
+        参数:
+            amount (float): 需要的令牌数
+
+        返回值:
+            float: 调用方在发送请求前需要等待的秒数（0表示无需等待）
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, amount):
+        """
+        归还（amount为负时补扣）令牌，用于按实际用量修正预约时的估算值
+
+        参数:
+            amount (float): 归还的令牌数
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """
+    大模型请求限流器，组合每秒请求数和每分钟Token数两个令牌桶
+
+    对应的限额为0或None时不做该项限制
+    """
+
+    def __init__(self, requests_per_second=None, tokens_per_minute=None, clock=time.monotonic):
+        """
+        初始化限流器
+
+        参数:
+            requests_per_second (float): 每秒请求数上限
+            tokens_per_minute (int): 每分钟Token数上限
+            clock: 单调时钟函数，便于测试替换
+        """
+        self.request_bucket = None
+        self.token_bucket = None
+
+        if requests_per_second:
+            self.request_bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second), clock)
+        if tokens_per_minute:
+            self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute, clock)
+
+    @staticmethod
+    def estimate_tokens(messages):
+        """
+        估算一次请求的提示词Token数
+
+        参数:
+            messages (list): 对话消息列表
+
+        返回值:
+            int: 估算的Token数
+        """
+        chars = sum(len(message.get("content") or "") for message in messages)
+        return math.ceil(chars * TOKENS_PER_CHAR)
+
+    def reserve(self, estimated_tokens=0):
+        """
+        为一次请求预约配额
+
+        参数:
+            estimated_tokens (int): 预计消耗的Token数
+
+        返回值:
+            float: 发送请求前需要等待的秒数
+        """
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket and estimated_tokens:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        return wait
+
+    def acquire(self, estimated_tokens=0):
+        """
+        为一次请求预约配额，并阻塞当前线程直到可以发送
+
+        参数:
+            estimated_tokens (int): 预计消耗的Token数
+
+        返回值:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """
+        请求完成后按实际Token用量修正预约的配额
+
+        参数:
+            estimated_tokens (int): 预约时的估算Token数
+            actual_tokens (int): 响应中返回的实际Token数（未知时为None，不做修正）
+        """
+        if self.token_bucket and actual_tokens is not None:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型请求对冲模块
+统计最近请求的耗时分布；请求超过指定分位耗时仍未返回时再发送一个相同的请求，
+采用先返回的结果，对冲请求数不超过总请求数的固定比例，以降低少数慢请求造成的长尾耗时
+"""
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from logger import logger
+
+# 耗时分布快照中给出的分位
+SNAPSHOT_PERCENTILES = (50, 90, 95, 99)
+
+
+class LatencyTracker:
+    """线程安全的最近请求耗时统计（滑动窗口）"""
+
+    def __init__(self, window_size):
+        """
+        初始化耗时统计
+
+        参数:
+            window_size (int): 保留的最近耗时样本数
+        """
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=max(1, window_size))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def record(self, seconds):
+        """
+        记录一次成功请求的耗时
+
+        参数:
+            seconds (float): 耗时（秒）
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """
+        计算最近耗时的分位数（最近秩法）
+
+        参数:
+            percent (float): 分位（0~100）
+
+        返回值:
+            float: 分位耗时（秒），没有样本时返回None
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples), max(1, math.ceil(percent / 100 * len(samples))))
+        return samples[rank - 1]
+
+    def snapshot(self):
+        """
+        获取耗时分布
+
+        返回值:
+            dict: 样本数、p50/p90/p95/p99和最大耗时（秒），没有样本时各分位为None
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        stats = {"samples": len(samples), "max": samples[-1] if samples else None}
+        for percent in SNAPSHOT_PERCENTILES:
+            rank = max(1, math.ceil(percent / 100 * len(samples)))
+            stats[f"p{percent}"] = samples[rank - 1] if samples else None
+        return stats
+
+
+def _start_thread(fn):
+    """在新的守护线程中执行fn，返回对应的Future（不占用线程池，慢请求不会阻塞后续请求）"""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+class RequestHedger:
+    """
+    请求对冲器
+
+    对冲未启用或耗时样本不足时直接在当前线程中发送请求；否则请求在后台线程中发送，
+    超过对冲延迟仍未返回且对冲预算未用完时发送对冲请求，返回先成功的结果
+    """
+
+    def __init__(self, latency, percentile, budget, min_samples, min_delay):
+        """
+        初始化对冲器
+
+        参数:
+            latency (LatencyTracker): 耗时统计，请求成功后由调用方记录
+            percentile (float): 对冲延迟取最近耗时的该分位（0表示不对冲）
+            budget (float): 对冲请求数占总请求数的上限比例
+            min_samples (int): 耗时样本少于该数时不对冲
+            min_delay (float): 对冲延迟下限（秒）
+        """
+        self.latency = latency
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def hedge_delay(self):
+        """
+        当前的对冲延迟
+
+        返回值:
+            float: 请求发出后等待多久再发送对冲请求（秒），不对冲时返回None
+        """
+        if not self.percentile or not self.budget or len(self.latency) < max(1, self.min_samples):
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _take_budget(self):
+        """对冲预算未用完时占用一次，返回是否可以发送对冲请求"""
+        with self._lock:
+            if self._hedges + 1 > self.budget * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def call(self, request, hedge_request, on_discard=None):
+        """
+        发送请求，必要时发送对冲请求
+
+        对冲延迟从原请求实际发出时开始计算（与耗时样本口径一致），
+        在本地排队等待并发名额的时间不计入，避免因自身排队而发送对冲请求
+
+        参数:
+            request (callable): 发送原请求的函数，参数为实际发出请求时调用的无参回调，返回响应
+            hedge_request (callable): 发送对冲请求的函数，返回响应
+            on_discard (callable): 未被采用的成功响应的回调（在其请求线程中调用），用于统计用量
+
+        返回值:
+            先成功返回的响应
+
+        异常:
+            Exception: 所有已发出的请求均失败时抛出原请求的异常
+        """
+        with self._lock:
+            self._requests += 1
+        delay = self.hedge_delay()
+        if delay is None:
+            return request(lambda: None)
+
+        sent = threading.Event()
+        futures = [_start_thread(lambda: request(sent.set))]
+        # 原请求在发出前失败时同样结束等待
+        futures[0].add_done_callback(lambda _: sent.set())
+        sent.wait()
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._take_budget():
+            logger.info(f"大模型请求超过 {delay:.2f} 秒未返回，发送对冲请求")
+            futures.append(_start_thread(hedge_request))
+
+        errors = [None] * len(futures)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # 同时完成时优先采用原请求
+            for index, future in enumerate(futures):
+                if future not in done:
+                    continue
+                if future.exception() is not None:
+                    errors[index] = future.exception()
+                    continue
+                if index > 0:
+                    with self._lock:
+                        self._hedge_wins += 1
+                self._discard_others(futures, future, on_discard)
+                return future.result()
+
+        raise errors[0]
+
+    @staticmethod
+    def _discard_others(futures, winner, on_discard):
+        """其余请求成功返回时将响应交给on_discard"""
+        if on_discard is None:
+            return
+
+        def discard(future):
+            if future.exception() is None:
+                on_discard(future.result())
+
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(discard)
+
+    def snapshot(self):
+        """
+        获取耗时分布和对冲统计
+
+        返回值:
+            dict: 耗时分布（见LatencyTracker.snapshot）以及请求数、对冲请求数、对冲请求先返回的次数
+        """
+        stats = self.latency.snapshot()
+        with self._lock:
+            stats.update({"requests": self._requests, "hedges": self._hedges, "hedge_wins": self._hedge_wins})
+        return stats
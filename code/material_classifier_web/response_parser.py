@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型响应解析模块
+单次扫描模型输出，找出其中完整的JSON对象，取最后一个包含分类字段的对象作为分类结果
+"""
+
+import json
+
+REQUIRED_FIELDS = ("main_category", "sub_category")
+
+# 分类编号模式下模型只输出该字段（批量请求中"id"为物料序号，两者不能同名）
+CATEGORY_ID_FIELD = "category_id"
+
+
+def is_classification_object(candidate):
+    """判断对象是否包含分类编号或完整的分类名称字段"""
+    return CATEGORY_ID_FIELD in candidate or all(field in candidate for field in REQUIRED_FIELDS)
+
+
+def strip_code_fence(content):
+    """
+    去除包裹整个内容的markdown代码块标记
+
+    参数:
+        content (str): 模型输出内容
+
+    返回值:
+        str: 去除代码块标记后的内容
+    """
+    cleaned_content = content.strip()
+    if cleaned_content.startswith("```") and cleaned_content.endswith("```"):
+        cleaned_content = cleaned_content[3:-3].strip()
+        # 如果有指定语言，移除语言标识
+        if cleaned_content.startswith("json"):
+            cleaned_content = cleaned_content[4:].strip()
+    return cleaned_content
+
+
+def iter_json_object_spans(text):
+    """
+    扫描文本，依次返回最外层花括号配对完整的片段位置
+
+    扫描时跟踪字符串和转义状态，字符串中的花括号不参与配对；
+    说明文字中未闭合的"{"不会遮住其后的完整对象：扫描到末尾仍未闭合时，从该"{"的下一个字符重新扫描
+
+    参数:
+        text (str): 待扫描文本
+
+    返回值:
+        generator: (start, end) 片段位置，text[start:end]为候选JSON对象
+    """
+    position = 0
+    while position is not None:
+        position = yield from _scan_json_object_spans(text, position)
+
+
+def _scan_json_object_spans(text, position):
+    """
+    从position开始单次扫描，返回配对完整的片段位置
+
+    返回值:
+        int: 扫描结束时仍未闭合的"{"的下一个位置；全部闭合时返回None
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+
+    for index in range(position, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            # 对象外的引号属于说明文字，不影响配对
+            if depth:
+                in_string = True
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, index + 1
+
+    return start + 1 if depth else None
+
+
+def parse_classification_content(content):
+    """
+    从模型输出内容中解析分类结果
+
+    内容本身是JSON时直接解析；否则（带思考过程或说明文字）取最后一个包含
+    分类编号id或main_category和sub_category字段的完整JSON对象
+
+    参数:
+        content (str): 模型输出内容
+
+    返回值:
+        dict: 包含分类编号id或main_category和sub_category的解析结果
+
+    异常:
+        ValueError: 内容中没有符合格式的JSON对象
+    """
+    cleaned_content = strip_code_fence(content)
+
+    try:
+        parsed_result = json.loads(cleaned_content)
+    except json.JSONDecodeError:
+        parsed_result = _last_classification_object(cleaned_content)
+
+    # 验证解析结果是否符合预期格式
+    if not isinstance(parsed_result, dict):
+        raise ValueError(f"API返回的JSON不是预期的对象格式: {parsed_result}")
+
+    if not is_classification_object(parsed_result):
+        raise ValueError(f"API返回的JSON缺少必要字段: {list(parsed_result.keys())}")
+
+    return parsed_result
+
+
+def _last_classification_object(text):
+    """
+    返回文本中最后一个包含分类字段的JSON对象；都不包含时返回最后一个可解析的对象
+
+    异常:
+        ValueError: 文本中没有可解析的JSON对象
+    """
+    last_object = None
+    for start, end in reversed(list(iter_json_object_spans(text))):
+        try:
+            candidate = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(candidate, dict):
+            continue
+        if is_classification_object(candidate):
+            return candidate
+        if last_object is None:
+            last_object = candidate
+
+    if last_object is None:
+        raise ValueError("API返回内容中未找到JSON对象")
+    return last_object
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史分类结果统计表模块
+由历史分类结果文件增量构建的统计表（型号前缀树、品牌/供应商分类先验等）的公共基类：
+记录已导入的文件及其内容哈希，只导入新增文件，已导入文件被修改或删除时重新构建，并负责持久化；
+导入时分类名称按规则集规范化为标准名称，不在分类标准中的结果跳过，规则集版本变化时重新构建
+"""
+
+import glob
+import os
+import pickle
+from abc import ABC, abstractmethod
+from logger import logger
+from neighbor_index import exclude_files, load_labeled_materials
+from rule_set import file_digest
+
+
+class ResultHistory(ABC):
+    """
+    历史分类结果统计表基类
+
+    子类实现_clear（清空统计数据，需调用父类方法）和add_record（导入一条分类结果），
+    并设置FORMAT_VERSION和DESCRIPTION；未实现这两个方法的子类无法实例化
+    """
+
+    # 文件格式版本，结构变化时递增，使旧文件自动失效
+    FORMAT_VERSION = 1
+    # 统计表名称（用于日志）
+    DESCRIPTION = "历史结果统计表"
+
+    def __init__(self):
+        self._clear()
+
+    @abstractmethod
+    def _clear(self):
+        """清空统计表"""
+        # 已导入的历史结果文件 {文件路径: 内容哈希}
+        self.sources = {}
+        # 导入时使用的规则集版本
+        self.rule_version = None
+
+    @abstractmethod
+    def add_record(self, formatted_data, label):
+        """
+        导入一条历史分类结果
+
+        参数:
+            formatted_data (dict): 格式化后的物料数据
+            label (tuple): (大类, 二级类)
+        """
+
+    def update_from_files(self, file_paths, rule_set):
+        """
+        导入新增的历史结果文件
+
+        只导入尚未导入过的文件；已导入的文件被修改或删除、或规则集版本变化时清空后全部重新导入
+
+        参数:
+            file_paths (list): 历史结果文件路径（Excel或CSV）
+            rule_set (RuleSet): 用于规范化分类名称的规则集
+
+        返回值:
+            bool: 统计表是否有变化
+        """
+        digests = {path: file_digest(path) for path in file_paths}
+        if any(digests.get(path) != digest for path, digest in self.sources.items()):
+            logger.info(f"已导入的历史结果文件被修改或删除，重建{self.DESCRIPTION}")
+            self._clear()
+        elif self.sources and self.rule_version != rule_set.version:
+            logger.info(f"分类说明文件已变化，重建{self.DESCRIPTION}")
+            self._clear()
+        self.rule_version = rule_set.version
+
+        new_files = [path for path in file_paths if path not in self.sources]
+        for path in new_files:
+            labeled = load_labeled_materials(path)
+            skipped = 0
+            for formatted_data, main_category, sub_category in labeled:
+                # 仅接受与标准分类名称规范化后一致（或二级类唯一）的结果，不做模糊修复
+                repaired = rule_set.category_repairer.repair(main_category, sub_category, 1.0)
+                if repaired is None:
+                    skipped += 1
+                    continue
+                self.add_record(formatted_data, rule_set.classification_mapping[repaired[0]][:2])
+            self.sources[path] = digests[path]
+            logger.info(
+                f"{self.DESCRIPTION}导入历史结果 {len(labeled) - skipped} 条: {path}（跳过 {skipped} 条不在分类标准中的结果）"
+            )
+        return bool(new_files)
+
+    def save(self, table_file):
+        """
+        保存统计表，先写临时文件再原子替换，写入失败不影响正常运行
+
+        参数:
+            table_file: 统计表文件路径
+        """
+        temp_file = f"{table_file}.{os.getpid()}.tmp"
+        try:
+            table_dir = os.path.dirname(table_file)
+            if table_dir:
+                os.makedirs(table_dir, exist_ok=True)
+            with open(temp_file, "wb") as f:
+                pickle.dump({"format_version": self.FORMAT_VERSION, "table": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, table_file)
+        except Exception as e:
+            logger.warning(f"保存{self.DESCRIPTION}失败: {e}")
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+    @classmethod
+    def load(cls, table_file):
+        """
+        读取统计表文件，文件缺失、损坏或格式版本不一致时返回空统计表
+
+        参数:
+            table_file: 统计表文件路径
+
+        返回值:
+            ResultHistory: 统计表
+        """
+        if table_file and os.path.exists(table_file):
+            try:
+                with open(table_file, "rb") as f:
+                    saved = pickle.load(f)
+                if (
+                    isinstance(saved, dict)
+                    and saved.get("format_version") == cls.FORMAT_VERSION
+                    and isinstance(saved.get("table"), cls)
+                ):
+                    return saved["table"]
+                logger.info(f"{cls.DESCRIPTION}文件已过期，将重新导入历史结果")
+            except Exception as e:
+                logger.warning(f"读取{cls.DESCRIPTION}失败，将重新导入历史结果: {e}")
+        return cls()
+
+    @classmethod
+    def load_from_results(cls, table_file, source_patterns, rule_set, excluded_files=()):
+        """
+        加载统计表并导入新增的历史结果文件，有变化时保存
+
+        参数:
+            table_file: 统计表文件路径（为空时不保存）
+            source_patterns (list): 历史结果文件的glob模式
+            rule_set (RuleSet): 用于规范化分类名称的规则集
+            excluded_files (list): 不导入的文件（如验证数据文件），已导入时重建统计表
+
+        返回值:
+            ResultHistory: 统计表
+        """
+        table = cls.load(table_file)
+        file_paths = sorted({path for pattern in source_patterns for path in glob.glob(pattern)})
+        file_paths = exclude_files(file_paths, excluded_files)
+        if table.update_from_files(file_paths, rule_set) and table_file:
+            table.save(table_file)
+        return table
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分类规则集模块
+将分类说明文件解析为分类映射、关键词匹配器和系统提示词，
+并按文件内容哈希缓存为二进制快照，避免每次启动都重新解析Excel
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from config import Config
+from logger import logger
+from keyword_matcher import KeywordMatcher
+from candidate_retriever import CandidateRetriever
+from category_repair import CategoryRepairer
+
+# 快照格式版本，规则集结构变化时递增，使旧快照自动失效
+SNAPSHOT_FORMAT_VERSION = 4
+
+
+class RuleSet:
+    """
+    分类规则集，包含分类映射、预编译的关键词匹配器、候选分类检索器、分类名称修复器和渲染好的系统提示词
+
+    每个分类按其在分类说明文件中的顺序编号（从1开始），启用Config.LLM_CATEGORY_IDS时
+    提示词中列出编号，模型只需返回{"category_id": 编号}
+
+    构建完成后不再修改，可在多个线程和分类器之间共享
+    """
+
+    def __init__(self, classification_mapping, version=""):
+        """
+        初始化规则集
+
+        参数:
+            classification_mapping: 分类映射字典
+                格式: {(normalized_main, normalized_sub): (original_main, original_sub, keywords, explanation, common_brands)}
+            version: 规则集版本（分类说明文件的内容哈希）
+        """
+        self.classification_mapping = classification_mapping
+        self.version = version
+        self.keyword_matcher = KeywordMatcher(classification_mapping)
+        self.candidate_retriever = CandidateRetriever(classification_mapping)
+        self.category_repairer = CategoryRepairer(classification_mapping)
+        self.use_category_ids = bool(Config.LLM_CATEGORY_IDS)
+        # 编号 -> (original_main, original_sub)，下标0占位，使编号可直接作为下标
+        self.categories = [None] + [(value[0], value[1]) for value in classification_mapping.values()]
+        self.category_ids = {key: category_id for category_id, key in enumerate(classification_mapping, 1)}
+        self.system_prompt = build_system_prompt(classification_mapping, self._prompt_category_ids())
+
+    def _prompt_category_ids(self):
+        """提示词中使用的分类编号，未启用编号模式时为None"""
+        return self.category_ids if self.use_category_ids else None
+
+    def category_by_id(self, category_id):
+        """
+        按编号查找分类
+
+        参数:
+            category_id: 分类编号（模型输出的整数或全部由数字组成的字符串）
+
+        返回值:
+            tuple: (original_main, original_sub)
+
+        异常:
+            ValueError: 编号不是整数（如1.5、"1.0"、True）或编号不存在
+        """
+        if isinstance(category_id, int) and not isinstance(category_id, bool):
+            index = category_id
+        elif isinstance(category_id, str) and category_id.strip().isascii() and category_id.strip().isdigit():
+            index = int(category_id)
+        else:
+            raise ValueError(f"分类编号无效：{category_id}")
+        if not 0 < index < len(self.categories):
+            raise ValueError(f"分类编号不存在：{category_id}")
+        return self.categories[index]
+
+    def candidate_prompt(self, candidate_keys):
+        """
+        构建只包含候选分类的精简系统提示词
+
+        参数:
+            candidate_keys: 候选分类在分类映射中的键
+
+        返回值:
+            str: 系统提示词，候选分类按分类说明文件中的顺序排列
+        """
+        candidate_keys = set(candidate_keys)
+        return build_system_prompt(
+            {key: value for key, value in self.classification_mapping.items() if key in candidate_keys},
+            self._prompt_category_ids(),
+        )
+
+
+def file_digest(file_path):
+    """
+    计算文件内容的SHA-256哈希
+
+    参数:
+        file_path: 文件路径
+
+    返回值:
+        str: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _template_digest():
+    """计算提示词模板的哈希，模板变化时快照中的提示词也需要重建"""
+    text = "\n".join((
+        Config.BASE_PROMPT_TEMPLATE,
+        Config.PROMPT_EXAMPLES,
+        Config.ID_PROMPT_TEMPLATE,
+        Config.ID_PROMPT_EXAMPLES,
+        str(bool(Config.LLM_CATEGORY_IDS)),
+    ))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_classification_file(file_path):
+    """
+    解析分类说明Excel文件，包含关键词、释义和常用品牌
+
+    参数:
+        file_path: 分类说明文件路径
+
+    返回值:
+        dict: 分类映射，格式为 {(normalized_main_category, normalized_sub_category): (original_main_category, original_sub_category, keywords, explanation, common_brands)}
+
+    异常:
+        ValueError: 未加载到任何有效分类规则
+    """
+    classification_mapping = {}
+
+    logger.info("尝试从Excel文件读取分类规则")
+
+    import pandas as pd
+
+    # 读取Excel文件
+    df = pd.read_excel(file_path, engine='openpyxl')
+
+    # 将DataFrame转为list of dicts
+    rows = df.to_dict('records')
+
+    current_main_category = None
+    for row in rows:
+        # 使用位置索引获取数据（更可靠处理编码问题）
+        cols = list(row.keys())
+
+        # cols[0] - 序号, cols[1] - 主分类, cols[2] - 子分类
+        # cols[3] - 关键词, cols[4] - 备注说明, cols[5] - 常用品牌
+
+        main_cat = str(row[cols[1]]).strip() if cols[1] in row else ''
+        sub_cat = str(row[cols[2]]).strip() if cols[2] in row else ''
+        keywords = str(row[cols[3]]).strip() if cols[3] in row else ''
+        explanation = str(row[cols[4]]).strip() if cols[4] in row else ''
+        common_brands = str(row[cols[5]]).strip() if cols[5] in row else ''
+
+        # 过滤无效值
+        main_cat = main_cat if main_cat != 'nan' else ''
+        sub_cat = sub_cat if sub_cat != 'nan' else ''
+        keywords = keywords if keywords != 'nan' else ''
+        explanation = explanation if explanation != 'nan' else ''
+        common_brands = common_brands if common_brands != 'nan' else ''
+
+        # 更新当前主分类
+        if main_cat:
+            current_main_category = main_cat
+
+        # 只处理有子分类的数据行
+        if current_main_category and sub_cat:
+            # Normalize category names for robust matching
+            normalized_main = current_main_category.strip().lower().replace(' ', '').replace('\t', '')
+            normalized_sub = sub_cat.strip().lower().replace(' ', '').replace('\t', '')
+
+            # 存储 normalized -> (original_main, original_sub, keywords, explanation, common_brands) mapping
+            classification_mapping[(normalized_main, normalized_sub)] = (
+                current_main_category,
+                sub_cat,
+                keywords,
+                explanation,
+                common_brands
+            )
+
+    if not classification_mapping:
+        # 如果没有加载到任何分类规则，直接报错
+        raise ValueError("从Excel未加载到任何有效分类规则")
+
+    logger.info(f"成功从Excel加载 {len(classification_mapping)} 条有效分类规则")
+    return classification_mapping
+
+
+def build_system_prompt(classification_mapping, category_ids=None):
+    """
+    构建包含完整分类规则（含关键词、释义和常用品牌）的系统提示词
+
+    参数:
+        classification_mapping: 分类映射字典
+        category_ids: 分类编号字典 {(normalized_main, normalized_sub): 编号}；
+            指定时每条分类前标注编号，并要求模型只输出编号
+
+    返回值:
+        str: 系统提示词
+    """
+    # 按大类分组，保持分类说明文件中的顺序
+    categories = {}
+    for key, (orig_main, orig_sub, keywords, explanation, common_brands) in classification_mapping.items():
+        categories.setdefault(orig_main, []).append((key, orig_sub, keywords, explanation, common_brands))
+
+    lines = []
+    for main_cat, sub_cats in categories.items():
+        for key, sub_cat, keywords, explanation, common_brands in sub_cats:
+            category_line = f"- 大类：{main_cat}，二级类：{sub_cat}"
+            if category_ids:
+                category_line = f"- [{category_ids[key]}] 大类：{main_cat}，二级类：{sub_cat}"
+            if keywords:
+                category_line += f"，关键词：{keywords}"
+            if explanation:
+                category_line += f"，释义：{explanation}"
+            if common_brands:
+                category_line += f"，常用品牌：{common_brands}"
+            lines.append(category_line + "\n")
+
+    # 基础模板 + 分类规则 + 示例，均从config.py中获取
+    if category_ids:
+        return Config.ID_PROMPT_TEMPLATE + "".join(lines) + Config.ID_PROMPT_EXAMPLES
+    return Config.BASE_PROMPT_TEMPLATE + "".join(lines) + Config.PROMPT_EXAMPLES
+
+
+def _load_snapshot(snapshot_file, source_digest):
+    """
+    读取规则集快照，快照缺失、损坏或与当前文件不一致时返回None
+
+    参数:
+        snapshot_file: 快照文件路径
+        source_digest: 当前分类说明文件的内容哈希
+
+    返回值:
+        RuleSet: 快照中的规则集 或 None
+    """
+    if not snapshot_file or not os.path.exists(snapshot_file):
+        return None
+
+    try:
+        with open(snapshot_file, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"读取规则集快照失败，将重新解析分类说明文件: {e}")
+        return None
+
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION
+        or snapshot.get("source_digest") != source_digest
+        or snapshot.get("template_digest") != _template_digest()
+    ):
+        logger.info("规则集快照已过期，将重新解析分类说明文件")
+        return None
+
+    return snapshot.get("rule_set")
+
+
+def _save_snapshot(snapshot_file, rule_set):
+    """
+    写入规则集快照，先写临时文件再原子替换，写入失败不影响正常运行
+
+    参数:
+        snapshot_file: 快照文件路径
+        rule_set: 规则集
+    """
+    snapshot = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source_digest": rule_set.version,
+        "template_digest": _template_digest(),
+        "rule_set": rule_set,
+    }
+    temp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+    try:
+        snapshot_dir = os.path.dirname(snapshot_file)
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        with open(temp_file, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, snapshot_file)
+        logger.info(f"规则集快照已保存: {snapshot_file}")
+    except Exception as e:
+        logger.warning(f"保存规则集快照失败: {e}")
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def load_rule_set(classification_file=None, snapshot_file=None):
+    """
+    加载分类规则集，优先使用与分类说明文件内容哈希一致的快照
+
+    参数:
+        classification_file: 分类说明文件路径（默认为Config.CLASSIFICATION_EXPLANATION_FILE）
+        snapshot_file: 快照文件路径（默认为Config.RULE_SNAPSHOT_FILE，为空时不使用快照）
+
+    返回值:
+        RuleSet: 分类规则集
+    """
+    classification_file = classification_file or Config.CLASSIFICATION_EXPLANATION_FILE
+    if snapshot_file is None:
+        snapshot_file = Config.RULE_SNAPSHOT_FILE
+
+    try:
+        source_digest = file_digest(classification_file)
+
+        rule_set = _load_snapshot(snapshot_file, source_digest)
+        if rule_set is not None:
+            logger.info(f"从快照加载 {len(rule_set.classification_mapping)} 条分类标准 (版本 {source_digest[:12]})")
+            return rule_set
+
+        rule_set = RuleSet(parse_classification_file(classification_file), version=source_digest)
+    except Exception as e:
+        # 加载失败直接报错，不使用降级方案
+        logger.error(f"加载分类文件失败：{e}")
+        raise
+
+    if snapshot_file:
+        _save_snapshot(snapshot_file, rule_set)
+    return rule_set
+
+
+class RuleFileWatcher:
+    """
+    分类说明文件监视器
+
+    在后台线程中定期检查文件的修改时间和大小，发生变化时调用回调函数
+    """
+
+    def __init__(self, file_path, on_change, interval=None):
+        """
+        初始化文件监视器
+
+        参数:
+            file_path: 被监视的文件路径
+            on_change: 文件变化时调用的回调函数（无参数）
+            interval: 检查间隔（秒，默认为Config.RULE_RELOAD_INTERVAL）
+        """
+        self.file_path = file_path
+        self.on_change = on_change
+        self.interval = interval if interval is not None else Config.RULE_RELOAD_INTERVAL
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_stat = self._stat()
+
+    def _stat(self):
+        """返回文件的(修改时间, 大小)，文件暂时不可访问时返回None"""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self):
+        """
+        检查一次文件是否变化，变化时调用回调函数
+
+        返回值:
+            bool: 文件是否发生变化
+        """
+        current = self._stat()
+        if current is None or current == self._last_stat:
+            return False
+
+        self._last_stat = current
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"处理分类说明文件变化失败: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """启动后台监视线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="RuleFileWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"开始监视分类说明文件: {self.file_path} (间隔 {self.interval} 秒)")
+
+    def stop(self):
+        """停止后台监视线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
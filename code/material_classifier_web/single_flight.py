@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并模块
+相同键的并发调用只执行一次，其余调用等待并共享同一个结果
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    线程安全的请求合并器
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        执行fn并返回结果；若相同key的调用正在进行，则等待其完成并返回同一结果
+
+        参数:
+            key: 调用键
+            fn: 无参数的可调用对象
+
+        返回值:
+            tuple: (result, shared)
+                result - fn的返回值
+                shared - 结果是否来自其他线程发起的调用
+
+        异常:
+            Exception: fn抛出的异常（等待中的调用同样收到该异常）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """当前进行中的调用数"""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    单个事件循环内的异步请求合并器
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """
+        执行协程函数fn并返回结果；若相同key的调用正在进行，则等待其完成并返回同一结果
+
+        参数:
+            key: 调用键
+            fn: 无参数的协程函数
+
+        返回值:
+            tuple: (result, shared)
+                result - fn的返回值
+                shared - 结果是否来自其他任务发起的调用
+
+        异常:
+            Exception: fn抛出的异常（等待中的调用同样收到该异常）
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # 等待方被取消时不影响正在进行的调用
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待方时不再报告"异常未被获取"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def in_flight(self):
+        """当前进行中的调用数"""
+        return len(self._calls)
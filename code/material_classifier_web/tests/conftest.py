@@ -0,0 +1,37 @@
+import os
+import sys
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import Config
+from material_classifier import MaterialClassifier
+
+
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(monkeypatch, tmp_path):
+    # every test gets an empty classification cache instead of the project's .cache directory
+    monkeypatch.setattr(Config, "LLM_CACHE_FILE", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setattr(MaterialClassifier, "_llm_cache", None)
+    # rule set snapshots are written to the test's own directory, never the project tree
+    monkeypatch.setattr(Config, "RULE_SNAPSHOT_FILE", str(tmp_path / "rule_set_snapshot.pkl"))
+    # never pick up a neighbour index trained on the real labeled data
+    monkeypatch.setattr(Config, "NEIGHBOR_INDEX_FILE", "")
+    monkeypatch.setattr(MaterialClassifier, "_neighbor_index", None)
+    monkeypatch.setattr(MaterialClassifier, "_neighbor_index_loaded", False)
+    # the model-number prefix and brand prior tiers must not import the project's data files
+    monkeypatch.setattr(Config, "MODEL_PREFIX_TRIE_FILE", "")
+    monkeypatch.setattr(Config, "RESULT_HISTORY_PATTERNS", [])
+    monkeypatch.setattr(MaterialClassifier, "_model_prefix_trie", None)
+    monkeypatch.setattr(MaterialClassifier, "_model_prefix_trie_loaded", False)
+    monkeypatch.setattr(Config, "BRAND_PRIOR_FILE", "")
+    monkeypatch.setattr(MaterialClassifier, "_brand_prior", None)
+    monkeypatch.setattr(MaterialClassifier, "_brand_prior_loaded", False)
+    # latency samples from one test must not trigger hedging in the next
+    monkeypatch.setattr(MaterialClassifier, "_request_hedger", None)
+    # failures recorded by one test must not open the shared circuit breaker for the next
+    monkeypatch.setattr(MaterialClassifier, "_circuit_breaker", None)
+    yield
+    if MaterialClassifier._llm_cache is not None:
+        MaterialClassifier._llm_cache.close()
@@ -0,0 +1,39 @@
+import os
+import sys
+from types import SimpleNamespace
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api_metrics import TokenUsageStats
+
+
+def test_record_deepseek_cache_fields():
+    stats = TokenUsageStats()
+    stats.record(SimpleNamespace(prompt_tokens=1000, completion_tokens=20,
+                                 prompt_cache_hit_tokens=960, prompt_cache_miss_tokens=40))
+    stats.record(SimpleNamespace(prompt_tokens=1000, completion_tokens=20,
+                                 prompt_cache_hit_tokens=0, prompt_cache_miss_tokens=1000))
+
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 2
+    assert snapshot["prompt_tokens"] == 2000
+    assert snapshot["completion_tokens"] == 40
+    assert snapshot["prompt_cache_hit_tokens"] == 960
+    assert snapshot["prompt_cache_miss_tokens"] == 1040
+    assert snapshot["prompt_cache_hit_rate"] == 0.48
+
+
+def test_record_openai_cached_tokens_and_missing_usage():
+    stats = TokenUsageStats()
+    stats.record(None)
+    stats.record(SimpleNamespace(prompt_tokens=500, completion_tokens=5,
+                                 prompt_tokens_details=SimpleNamespace(cached_tokens=384)))
+
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 1
+    assert snapshot["prompt_cache_hit_tokens"] == 384
+    assert snapshot["prompt_cache_miss_tokens"] == 116
+
+    stats.reset()
+    assert stats.snapshot()["prompt_cache_hit_rate"] == 0.0
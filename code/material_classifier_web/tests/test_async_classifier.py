@@ -0,0 +1,162 @@
+import os
+import sys
+import asyncio
+import threading
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from async_classifier import AsyncMaterialClassifier
+from cascade import CascadeTier
+from concurrency_controller import AdaptiveConcurrencyController
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "MAX_RETRIES", 2)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    yield
+
+
+def make_async_client(fn):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fn)))
+
+
+def make_completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def test_semaphore_limits_requests_in_flight():
+    state = {"in_flight": 0, "max_in_flight": 0, "calls": 0}
+
+    async def fake_create(**kwargs):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}')
+
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency=3)
+        classifier.client = make_async_client(fake_create)
+        materials = [{"物料名称": f"XQ-{i:03d}"} for i in range(10)] + [{"物料名称": "可编程控制器"}]
+        return await classifier.classify_batch(materials)
+
+    results = asyncio.run(run())
+
+    assert state["calls"] == 10
+    assert state["max_in_flight"] == 3
+    assert all(r["status"] == "success" for r in results)
+    assert results[-1]["classification"]["classification_source"] == "keyword_matcher"
+    assert results[0]["classification"]["classification_source"] == "deepseek_api"
+
+
+def test_retry_then_failure_reported_per_material(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr("async_classifier.asyncio.sleep", fake_sleep)
+
+    async def fake_create(**kwargs):
+        if "XQ-BAD" in kwargs["messages"][1]["content"]:
+            raise Exception("API Error")
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}')
+
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency=5)
+        classifier.client = make_async_client(fake_create)
+        return await classifier.classify_batch([{"物料名称": "XQ-BAD"}, {"物料名称": "XQ-OK"}])
+
+    results = asyncio.run(run())
+
+    assert [r["status"] for r in results] == ["failed", "success"]
+    assert "API Error" in results[0]["error"]
+    assert sleeps == [1]
+
+
+def test_local_tiers_do_not_block_the_event_loop():
+    released = threading.Event()
+
+    def blocking_tier(formatted_data, material_info, rule_set):
+        # only returns a hit if the loop kept running and released it
+        if released.wait(5):
+            return {"main_category": "PLC/IO模块/柜体", "sub_category": "PLC", "classification_source": "slow_local"}
+        return None
+
+    async def release_soon():
+        await asyncio.sleep(0.01)
+        released.set()
+
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency=1)
+        classifier.local_cascade.register(CascadeTier("slow_local", blocking_tier), before="keyword_matcher")
+        result, _ = await asyncio.gather(classifier.classify_material({"物料名称": "XQ-001"}), release_soon())
+        return result
+
+    assert asyncio.run(run())["classification_source"] == "slow_local"
+
+
+def test_duplicate_materials_share_one_request():
+    calls = []
+
+    async def fake_create(**kwargs):
+        calls.append(kwargs["messages"][1]["content"])
+        await asyncio.sleep(0.01)
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}')
+
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency=10)
+        classifier.client = make_async_client(fake_create)
+        materials = [{"物料名称": "XQ-001"}] * 5 + [{"物料名称": "XQ-002"}]
+        return await classifier.classify_batch(materials)
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert all(r["status"] == "success" for r in results)
+    # 各物料拿到各自的结果副本
+    assert results[0]["classification"] is not results[1]["classification"]
+
+
+class ThrottledError(Exception):
+    status_code = 429
+
+
+def test_adaptive_controller_caps_and_backs_off(monkeypatch):
+    controller = AdaptiveConcurrencyController(initial_limit=2, min_limit=1, max_limit=4, target_latency=5)
+    monkeypatch.setattr(MaterialClassifier, "_concurrency_controller", controller)
+    state = {"in_flight": 0, "max_in_flight": 0, "throttled": False}
+
+    async def fake_create(**kwargs):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        if not state["throttled"]:
+            state["throttled"] = True
+            raise ThrottledError("rate limit exceeded")
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}')
+
+    async def run():
+        classifier = AsyncMaterialClassifier(max_concurrency=10)
+        classifier.client = make_async_client(fake_create)
+        return await classifier.classify_batch([{"物料名称": f"XQ-{i:03d}"} for i in range(6)])
+
+    results = asyncio.run(run())
+
+    # 信号量允许10个请求，实际在途请求数受控制器上限约束，限流后上限降低
+    assert state["max_in_flight"] == 2
+    assert controller.snapshot()["throttle_events"] == 1
+    assert controller.snapshot()["in_flight"] == 0
+    assert all(r["status"] == "success" for r in results)
@@ -0,0 +1,235 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from brand_prior import BrandPrior, normalize_party
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from rule_set import RuleSet, load_rule_set
+from config import Config
+
+# "输入模块" is a keyword of both categories and both list the same common brands
+INSIDE = ("PLC/IO模块/柜体", "柜内模块")
+OUTSIDE = ("PLC/IO模块/柜体", "柜外模块")
+CYLINDER = ("气动", "气缸")
+
+
+def build_prior():
+    prior = BrandPrior()
+    for _ in range(3):
+        prior.add_record({"品牌": "Acme IO", "供应商": ""}, OUTSIDE)
+    prior.add_record({"品牌": "acmeio", "供应商": "华东机电"}, INSIDE)
+    for _ in range(4):
+        prior.add_record({"品牌": "", "供应商": "华东机电"}, CYLINDER)
+    return prior
+
+
+def test_normalize_party():
+    assert normalize_party(" Acme IO ") == "acmeio"
+    assert normalize_party(None) == ""
+    assert normalize_party(float("nan")) == ""
+
+
+def test_rank_prefers_most_frequent_candidate():
+    prior = build_prior()
+
+    assert prior.rank([INSIDE, OUTSIDE], "acmeio") == OUTSIDE
+    # brand and supplier counts are added up
+    assert prior.rank([INSIDE, CYLINDER], "acmeio", "华东机电") == CYLINDER
+    assert prior.rank([INSIDE, OUTSIDE], "unknown", "") is None
+    assert len(prior) == 2
+
+
+def test_predict_requires_support_and_share():
+    prior = build_prior()
+
+    assert prior.predict("acmeio", "", min_support=3, min_share=0.7) == (OUTSIDE, 0.75, "品牌")
+    assert prior.predict("acmeio", "", min_support=3, min_share=0.9) is None
+    assert prior.predict("acmeio", "", min_support=5, min_share=0.5) is None
+    # the supplier wins when its majority is more concentrated
+    assert prior.predict("acmeio", "华东机电", min_support=3, min_share=0.7) == (CYLINDER, 0.8, "供应商")
+    assert prior.predict("", "", min_support=1, min_share=0.5) is None
+
+
+def test_keyword_matcher_ranks_ambiguous_matches_by_prior():
+    matcher = load_rule_set().keyword_matcher
+    prior = build_prior()
+    material = {"物料名称": "输入模块", "分类/品牌": "Acme IO"}
+
+    assert matcher.match_by_keywords_and_brand(material) == INSIDE
+    assert matcher.match_by_keywords_and_brand(material, prior) == OUTSIDE
+    # a common brand of the category still decides first
+    assert matcher.match_by_keywords_and_brand({"物料名称": "输入模块", "分类/品牌": "西门子"}, prior) == INSIDE
+
+    # a loader is only called when the prior is actually needed
+    loads = []
+
+    def load_prior():
+        loads.append(1)
+        return prior
+
+    assert matcher.match_by_keywords_and_brand({"物料名称": "可编程控制器"}, load_prior) == ("PLC/IO模块/柜体", "PLC")
+    assert loads == []
+    assert matcher.match_by_keywords_and_brand(material, load_prior) == OUTSIDE
+    assert loads == [1]
+
+    df = pd.DataFrame([material, {"物料名称": "输入模块", "分类/品牌": "other"}])
+    result = matcher.match_dataframe(df, prior)
+    assert list(zip(result["main_category"], result["sub_category"])) == [OUTSIDE, INSIDE]
+
+
+def write_results(path, rows):
+    pd.DataFrame(rows, columns=["物料名称", "图号/型号", "分类/品牌", "供应商", "功能大类", "二级分类", "分类状态", "分类来源"]).to_excel(path, index=False)
+
+
+def test_load_from_results_reads_brand_and_supplier(tmp_path):
+    write_results(tmp_path / "a.xlsx", [
+        ["气缸", "CDQ2B20", "SMC", "华东机电", "气动", "气缸", "success", "deepseek_api"],
+        ["气缸", "CDQ2B32", "SMC", "华东机电", "气动", "气缸", "success", "brand_prior"],
+    ])
+
+    prior = BrandPrior.load_from_results(str(tmp_path / "prior.pkl"), [str(tmp_path / "*.xlsx")], load_rule_set())
+
+    # results inferred by the prior itself are not learned
+    assert prior.count("品牌", "smc", CYLINDER) == 1
+    assert prior.count("供应商", "华东机电", CYLINDER) == 1
+    assert os.path.exists(tmp_path / "prior.pkl")
+
+
+def test_load_from_results_canonicalizes_labels(tmp_path):
+    write_results(tmp_path / "a.xlsx", [
+        ["控制器", "X1", "ACME", "", "plc/io 模块/柜体", "PLC", "success", "deepseek_api"],
+        ["轴承", "6204", "ACME", "", "机械运动部件", "轴承", "success", "deepseek_api"],
+    ])
+    rule_set = load_rule_set()
+
+    prior = BrandPrior.load_from_results("", [str(tmp_path / "*.xlsx")], rule_set)
+
+    # labels are stored under the rule set's names, labels outside the rule set are skipped
+    assert prior.count("品牌", "acme", ("PLC/IO模块/柜体", "PLC")) == 1
+    assert prior.rank([("PLC/IO模块/柜体", "PLC"), ("机械运动部件", "轴承类")], "acme") == ("PLC/IO模块/柜体", "PLC")
+    assert prior.predict("acme", "", min_support=1, min_share=1.0)[0] == ("PLC/IO模块/柜体", "PLC")
+    assert prior.rule_version == rule_set.version
+
+    # a new rule version re-imports every file
+    assert prior.update_from_files(sorted(prior.sources), rule_set) is False
+    assert prior.update_from_files(sorted(prior.sources), RuleSet(rule_set.classification_mapping, version="next")) is True
+    assert prior.count("品牌", "acme", ("PLC/IO模块/柜体", "PLC")) == 1
+
+
+def test_validation_file_is_not_learned(monkeypatch, tmp_path):
+    # by default the validator's file never feeds the learned tiers
+    assert Config.VALIDATION_FILE in Config.LEARNED_TIER_EXCLUDED_FILES
+
+    row = ["气缸", "CDQ2B20", "SMC", "华东机电", "气动", "气缸", "success", "deepseek_api"]
+    write_results(tmp_path / "history.xlsx", [row])
+    write_results(tmp_path / "validation.xlsx", [row])
+    monkeypatch.setattr(Config, "RESULT_HISTORY_PATTERNS", [str(tmp_path / "*.xlsx")])
+    monkeypatch.setattr(Config, "LEARNED_TIER_EXCLUDED_FILES", [str(tmp_path / "validation.xlsx")])
+    monkeypatch.setattr(Config, "BRAND_PRIOR_MIN_SUPPORT", 3)
+    monkeypatch.setattr(Config, "MODEL_PREFIX_MIN_SUPPORT", 2)
+
+    for table in (MaterialClassifier.get_brand_prior(), MaterialClassifier.get_model_prefix_trie()):
+        assert list(table.sources) == [str(tmp_path / "history.xlsx")]
+
+    # a table saved before the file was excluded is rebuilt without it
+    prior_file = str(tmp_path / "prior.pkl")
+    rule_set = load_rule_set()
+    assert len(BrandPrior.load_from_results(prior_file, [str(tmp_path / "*.xlsx")], rule_set).sources) == 2
+    prior = BrandPrior.load_from_results(prior_file, [str(tmp_path / "*.xlsx")], rule_set, [str(tmp_path / "validation.xlsx")])
+    assert list(prior.sources) == [str(tmp_path / "history.xlsx")]
+    assert prior.count("品牌", "smc", CYLINDER) == 1
+
+
+@pytest.fixture
+def classifier(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "BRAND_PRIOR_MIN_SUPPORT", 3)
+    monkeypatch.setattr(Config, "BRAND_PRIOR_MIN_SHARE", 0.9)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+
+    write_results(tmp_path / "results.xlsx", [
+        ["控制器", f"XQ-{i}", "ACME", "", "PLC/IO模块/柜体", "PLC", "success", "deepseek_api"] for i in range(3)
+    ])
+    monkeypatch.setattr(Config, "RESULT_HISTORY_PATTERNS", [str(tmp_path / "*.xlsx")])
+
+    clf = MaterialClassifier()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf, calls
+
+
+def test_brand_prior_tier_answers_with_confidence(classifier):
+    clf, calls = classifier
+
+    result = clf.classify_material({"物料名称": "未知模块", "图号/型号": "ZZ-1", "分类/品牌": "Acme"})
+
+    assert result == {
+        "main_category": "PLC/IO模块/柜体",
+        "sub_category": "PLC",
+        "classification_source": "brand_prior",
+        "confidence": 1.0,
+    }
+    assert calls == []
+
+    batch = clf.classify_batch([
+        {"物料名称": "未知模块", "图号/型号": "ZZ-2", "分类/品牌": "ACME"},
+        {"物料名称": "未知模块", "图号/型号": "ZZ-3", "分类/品牌": "其他"},
+    ], llm_batch_size=1)
+    assert batch[0]["classification"]["classification_source"] == "brand_prior"
+    assert batch[1]["classification"]["classification_source"] == "deepseek_api"
+
+
+def test_brand_prior_tier_can_be_disabled(classifier, monkeypatch):
+    clf, calls = classifier
+    monkeypatch.setattr(Config, "BRAND_PRIOR_MIN_SUPPORT", 0)
+
+    assert MaterialClassifier.refresh_brand_prior() is None
+    assert clf.classify_material({"物料名称": "未知模块", "分类/品牌": "Acme"})["classification_source"] == "deepseek_api"
+    assert len(calls) == 1
+
+
+def test_keyword_hit_does_not_build_history_tables(classifier):
+    clf, calls = classifier
+
+    result = clf.classify_material({"物料名称": "可编程控制器", "分类/品牌": "ACME"})
+
+    assert result["classification_source"] == "keyword_matcher"
+    assert MaterialClassifier._brand_prior_loaded is False
+    assert MaterialClassifier._model_prefix_trie_loaded is False
+
+
+def test_concurrent_first_use_builds_once(monkeypatch):
+    monkeypatch.setattr(Config, "BRAND_PRIOR_MIN_SUPPORT", 3)
+    loads = []
+
+    def slow_load(table_cls, table_file):
+        loads.append(table_cls)
+        time.sleep(0.05)
+        return build_prior()
+
+    monkeypatch.setattr(MaterialClassifier, "_load_result_history", slow_load)
+    priors = []
+    threads = [threading.Thread(target=lambda: priors.append(MaterialClassifier.get_brand_prior())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == [BrandPrior]
+    assert len(priors) == 8 and all(prior is priors[0] for prior in priors)
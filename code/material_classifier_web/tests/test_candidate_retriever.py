@@ -0,0 +1,100 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from candidate_retriever import CandidateRetriever
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from rule_set import RuleSet
+from config import Config
+
+DEFAULT_TOP_K = Config.LLM_CANDIDATE_TOP_K
+
+MAPPING = {
+    ("传感器类", "温度传感器"): ("传感器类", "温度传感器", "热电偶;热电阻", "测量温度的传感器", "欧姆龙"),
+    ("传感器类", "压力传感器"): ("传感器类", "压力传感器", "压力变送器", "测量气体或液体压力", "西门子"),
+    ("气动类", "气缸"): ("气动类", "气缸", "气缸;导杆气缸", "气动执行元件", "SMC;亚德客"),
+    ("气动类", "电磁阀"): ("气动类", "电磁阀", "电磁阀;换向阀", "控制气路通断", "SMC;费斯托"),
+    ("电气类", "断路器"): ("电气类", "断路器", "空开;断路器", "线路过载保护", "施耐德;正泰"),
+}
+
+
+def test_retrieve_ranks_relevant_rule_first():
+    retriever = CandidateRetriever(MAPPING)
+
+    assert retriever.retrieve("亚德客 导杆气缸 TCL16X50", top_k=3, min_score=0.1)[0] == ("气动类", "气缸")
+    assert retriever.retrieve("压力变送器 0-1MPa", top_k=3, min_score=0.1)[0] == ("传感器类", "压力传感器")
+    assert len(retriever.retrieve("SMC 电磁阀 气缸", top_k=2, min_score=0.1)) == 2
+
+
+def test_retrieve_returns_none_when_confidence_is_low():
+    retriever = CandidateRetriever(MAPPING)
+
+    assert retriever.retrieve("XQ-001", top_k=3, min_score=0.1) is None
+    assert retriever.retrieve("", top_k=3, min_score=0.1) is None
+    assert retriever.retrieve("导杆气缸", top_k=3, min_score=100) is None
+
+
+def test_candidate_prompt_lists_only_candidates_in_file_order():
+    rule_set = RuleSet(MAPPING)
+
+    prompt = rule_set.candidate_prompt([("电气类", "断路器"), ("传感器类", "温度传感器")])
+
+    assert "断路器" in prompt and "温度传感器" in prompt
+    assert "电磁阀" not in prompt and "压力传感器" not in prompt
+    assert prompt.index("温度传感器") < prompt.index("断路器")
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "LLM_CANDIDATE_TOP_K", 2)
+    monkeypatch.setattr(Config, "LLM_CANDIDATE_MIN_SCORE", 0.1)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+
+    clf = MaterialClassifier()
+    system_prompts = []
+
+    def fake_create(messages=None, **kwargs):
+        system_prompts.append(messages[0]["content"])
+        content = '{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf, system_prompts
+
+
+def test_text_rich_material_gets_compact_prompt(classifier):
+    clf, system_prompts = classifier
+
+    result = clf.classify_material({"物料名称": "控制器模块", "规格型号": "CPU 1214C", "品牌": "西门子"})
+
+    assert result["classification_source"] == "deepseek_api"
+    assert len(system_prompts) == 1
+    assert len(system_prompts[0]) < len(clf.rule_set.system_prompt)
+
+
+def test_low_confidence_material_gets_full_prompt(classifier, monkeypatch):
+    clf, system_prompts = classifier
+    monkeypatch.setattr(Config, "LLM_CANDIDATE_MIN_SCORE", 1000)
+
+    clf.classify_material({"物料名称": "XQ-001"})
+
+    assert system_prompts == [clf.rule_set.system_prompt]
+
+
+def test_shortlist_disabled_keeps_the_cacheable_prompt(classifier, monkeypatch):
+    clf, system_prompts = classifier
+    # off by default: a per-material system prompt would defeat the provider's prefix cache
+    assert DEFAULT_TOP_K == 0
+    monkeypatch.setattr(Config, "LLM_CANDIDATE_TOP_K", 0)
+
+    clf.classify_material({"物料名称": "控制器模块", "规格型号": "CPU 1214C", "品牌": "西门子"})
+
+    assert system_prompts == [clf.rule_set.system_prompt]
@@ -0,0 +1,150 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cascade import CascadeStats, CascadeTier, ClassificationCascade
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+def lookup_tier(name, table, calls):
+    def classify(formatted_data, material_info, rule_set):
+        calls.append((name, material_info))
+        if material_info == "boom":
+            raise RuntimeError("tier failed")
+        label = table.get(material_info)
+        return {"main_category": label, "sub_category": name} if label else None
+
+    return CascadeTier(name, classify)
+
+
+def build_cascade(calls):
+    return ClassificationCascade([
+        lookup_tier("fast", {"a": "A"}, calls),
+        lookup_tier("slow", {"a": "X", "b": "B"}, calls),
+    ])
+
+
+def test_classify_stops_at_first_hit_and_records_stats():
+    calls = []
+    cascade = build_cascade(calls)
+
+    assert cascade.classify({}, "a", None)["sub_category"] == "fast"
+    assert cascade.classify({}, "b", None)["sub_category"] == "slow"
+    assert cascade.classify({}, "c", None) is None
+    assert calls == [("fast", "a"), ("fast", "b"), ("slow", "b"), ("fast", "c"), ("slow", "c")]
+
+    stats = cascade.stats.snapshot()
+    assert list(stats) == ["fast", "slow"]
+    assert (stats["fast"]["items"], stats["fast"]["hits"]) == (3, 1)
+    assert (stats["slow"]["items"], stats["slow"]["hits"], stats["slow"]["hit_rate"]) == (2, 1, 0.5)
+
+
+def test_classify_raises_tier_errors():
+    cascade = build_cascade([])
+
+    with pytest.raises(RuntimeError):
+        cascade.classify({}, "boom", None)
+    assert cascade.stats.snapshot()["fast"]["errors"] == 1
+    assert "slow" not in cascade.stats.snapshot()
+
+
+def test_classify_batch_moves_pending_items_together():
+    calls = []
+    batches = []
+
+    def classify_batch(items, rule_set, **options):
+        batches.append(([info for _, info in items], options))
+        return [{"main_category": "L", "sub_category": "last"} for _ in items]
+
+    cascade = build_cascade(calls)
+    cascade.register(CascadeTier("last", None, classify_batch))
+
+    outcomes = cascade.classify_batch([({}, info) for info in ("a", "boom", "b", "c", "d")], None, size=2)
+
+    assert [outcome["sub_category"] for outcome in outcomes if isinstance(outcome, dict)] == ["fast", "slow", "last", "last"]
+    assert isinstance(outcomes[1], RuntimeError)
+    # failed items leave the cascade, only misses reach the next tier
+    assert [name for name, info in calls if info == "boom"] == ["fast"]
+    assert batches == [(["c", "d"], {"size": 2})]
+    assert cascade.stats.snapshot()["last"]["items"] == 2
+
+
+def test_register_and_without():
+    cascade = build_cascade([])
+    cascade.register(CascadeTier("first", None), before="fast")
+    assert cascade.names == ("first", "fast", "slow")
+
+    with pytest.raises(ValueError):
+        cascade.register(CascadeTier("fast", None))
+    with pytest.raises(ValueError):
+        cascade.register(CascadeTier("other", None), before="missing")
+
+    local = cascade.without("slow")
+    assert local.names == ("first", "fast")
+    assert local.stats is cascade.stats
+
+
+def test_cost_is_metered_per_tier():
+    spent = [0]
+
+    def expensive(formatted_data, material_info, rule_set):
+        spent[0] += 120
+        return {"main_category": "A", "sub_category": "B"}
+
+    cascade = ClassificationCascade([CascadeTier("llm", expensive, cost_meter=lambda: spent[0])], CascadeStats())
+    cascade.classify({}, "a", None)
+    cascade.classify_batch([({}, "b"), ({}, "c")], None)
+
+    assert cascade.stats.snapshot()["llm"]["cost"] == 360
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    monkeypatch.setattr(MaterialClassifier, "_cascade_stats", CascadeStats())
+
+    clf = MaterialClassifier()
+
+    def fake_create(**kwargs):
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        usage = SimpleNamespace(prompt_tokens=90, completion_tokens=10)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf
+
+
+def test_classifier_runs_registered_tiers(classifier):
+    assert classifier.cascade.names == (
+        "keyword_matcher", "llm_cache", "model_prefix", "neighbor_index", "brand_prior", "deepseek_api",
+    )
+
+    assert classifier.classify_material({"物料名称": "XQ-001"})["classification_source"] == "deepseek_api"
+    # the second request is answered from the cache tier
+    assert classifier.classify_material({"物料名称": "XQ-001"})["classification_source"] == "llm_cache"
+
+    stats = MaterialClassifier.get_cascade_stats()
+    assert (stats["keyword_matcher"]["items"], stats["keyword_matcher"]["hits"]) == (2, 0)
+    assert (stats["llm_cache"]["items"], stats["llm_cache"]["hits"]) == (2, 1)
+    assert (stats["deepseek_api"]["items"], stats["deepseek_api"]["hits"], stats["deepseek_api"]["cost"]) == (1, 1, 100)
+
+
+def test_classifier_accepts_custom_tiers(classifier):
+    def fixed(formatted_data, material_info, rule_set):
+        return {"main_category": "气动", "sub_category": "气缸", "classification_source": "fixed"}
+
+    classifier.cascade.register(CascadeTier("fixed", fixed), before="deepseek_api")
+
+    assert classifier.classify_material({"物料名称": "XQ-002"})["classification_source"] == "fixed"
+    results = classifier.classify_batch([{"物料名称": "XQ-003"}, {"物料名称": "XQ-004"}], llm_batch_size=10)
+    assert [r["classification"]["classification_source"] for r in results] == ["fixed", "fixed"]
+    assert "deepseek_api" not in MaterialClassifier.get_cascade_stats()
@@ -0,0 +1,103 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from rule_set import RuleSet
+from config import Config
+
+MAPPING = {
+    ("传感器类", "温度传感器"): ("传感器类", "温度传感器", "热电偶", "", ""),
+    ("气动类", "气缸"): ("气动类", "气缸", "气缸", "", "SMC"),
+    ("气动类", "电磁阀"): ("气动类", "电磁阀", "电磁阀", "", ""),
+}
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "LLM_CATEGORY_IDS", True)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    yield
+
+
+def test_categories_are_numbered_in_file_order():
+    rule_set = RuleSet(MAPPING)
+
+    assert rule_set.category_by_id(1) == ("传感器类", "温度传感器")
+    assert rule_set.category_by_id("3") == ("气动类", "电磁阀")
+    assert "- [2] 大类：气动类，二级类：气缸" in rule_set.system_prompt
+    # candidate prompts keep the global numbering
+    assert "- [3] 大类：气动类，二级类：电磁阀" in rule_set.candidate_prompt([("气动类", "电磁阀")])
+
+
+@pytest.mark.parametrize("category_id", [0, 4, -1, "abc", None, True, 1.5, 1.0, "1.0", "-1", "１"])
+def test_unknown_category_id_is_rejected(category_id):
+    with pytest.raises(ValueError):
+        RuleSet(MAPPING).category_by_id(category_id)
+
+
+def test_names_mode_keeps_plain_prompt(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_CATEGORY_IDS", False)
+    rule_set = RuleSet(MAPPING)
+
+    assert "[1]" not in rule_set.system_prompt
+    assert "- 大类：传感器类，二级类：温度传感器" in rule_set.system_prompt
+
+
+def test_validate_resolves_category_id():
+    clf = MaterialClassifier()
+    rule_set = RuleSet(MAPPING)
+    result = {"category_id": 2, "classification_source": "deepseek_api"}
+
+    assert clf.validate_classification_result(result, rule_set) is True
+    assert result == {"classification_source": "deepseek_api", "main_category": "气动类", "sub_category": "气缸"}
+
+    with pytest.raises(ValueError):
+        clf.validate_classification_result({"category_id": 99}, rule_set)
+
+
+def make_client(contents):
+    calls = []
+
+    def fake_create(messages=None, **kwargs):
+        calls.append(messages)
+        content = contents[len(calls) - 1]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))), calls
+
+
+def test_classify_material_with_category_id_response(monkeypatch):
+    clf = MaterialClassifier()
+    rule_set = clf.rule_set
+    category_id = rule_set.category_ids[("plc/io模块/柜体", "plc")]
+    client, calls = make_client([f'{{"category_id": {category_id}}}'])
+    monkeypatch.setattr(clf, "client", client)
+
+    result = clf._classify_by_llm({"物料名称": "XQ-001"}, "物料名称=XQ-001", rule_set)
+
+    assert (result["main_category"], result["sub_category"]) == ("PLC/IO模块/柜体", "PLC")
+    assert f"[{category_id}]" in calls[0][0]["content"]
+
+
+def test_batch_accepts_category_ids(monkeypatch):
+    clf = MaterialClassifier()
+    rule_set = RuleSet(MAPPING)
+    client, calls = make_client(['{"results": [{"id": 1, "category_id": 3}, {"id": 2, "category_id": 1}]}'])
+    monkeypatch.setattr(clf, "client", client)
+
+    results = clf.classify_llm_batch([{"物料名称": "甲"}, {"物料名称": "乙"}], batch_size=2, rule_set=rule_set)
+
+    assert [r["classification"]["sub_category"] for r in results] == ["电磁阀", "温度传感器"]
+    assert "id（物料序号）和category_id（分类编号" in calls[0][1]["content"]
+    # the system prompt uses the same field name for the category number, never the item id field
+    assert '{"category_id": ' in calls[0][0]["content"]
+    assert '{"id": ' not in calls[0][0]["content"]
@@ -0,0 +1,94 @@
+import os
+import sys
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from category_repair import CategoryRepairer, canonical_name
+from material_classifier import MaterialClassifier
+from rule_set import RuleSet, load_rule_set
+from config import Config
+
+MAPPING = {
+    ("plc/io模块/柜体", "plc"): ("PLC/IO模块/柜体", "PLC", "", "", ""),
+    ("气动", "气源系统/气源处理"): ("气动", "气源系统/气源处理", "", "", ""),
+    ("气动", "阀、阀岛"): ("气动", "阀、阀岛", "", "", ""),
+    ("气动", "气缸"): ("气动", "气缸", "", "", ""),
+    ("软件/测试", "ups电源"): ("软件/测试", "UPS电源", "", "", ""),
+    ("低压电器", "电源"): ("低压电器", "电源", "", "", ""),
+    ("传感器", "非接触式传感器"): ("传感器", "非接触式传感器", "", "", ""),
+    ("传感器", "接触式位移传感器"): ("传感器", "接触式位移传感器", "", "", ""),
+}
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "CATEGORY_REPAIR_MIN_SCORE", 0.9)
+    yield
+
+
+def test_canonical_name_ignores_width_case_and_separators():
+    assert canonical_name("ＰＬＣ／IO模块／柜体") == canonical_name("plc/io 模块/柜体") == "plcio模块柜体"
+    assert canonical_name("阀，阀岛") == canonical_name("阀、阀岛")
+    assert canonical_name(None) == ""
+
+
+@pytest.mark.parametrize(
+    "main, sub, expected, method",
+    [
+        ("ＰＬＣ／IO模块／柜体", "ＰＬＣ", ("plc/io模块/柜体", "plc"), "normalized"),
+        ("气动", "阀,阀岛", ("气动", "阀、阀岛"), "normalized"),
+        ("HMI/工控机/UPS", "UPS电源", ("软件/测试", "ups电源"), "sub_category"),
+        ("气动", "气源处理", ("气动", "气源系统/气源处理"), "fuzzy"),
+        ("气动", "气缸类", ("气动", "气缸"), "fuzzy"),
+    ],
+)
+def test_repair_near_misses(main, sub, expected, method):
+    key, repair_method, score = CategoryRepairer(MAPPING).repair(main, sub, 0.9)
+
+    assert key == expected
+    assert repair_method == method
+    assert 0.9 <= score <= 1.0
+
+
+@pytest.mark.parametrize(
+    "main, sub",
+    [
+        ("气动", "液压阀组"),   # unrelated category
+        ("未知大类", "模块"),     # too far from any category
+        ("气动", ""),
+    ],
+)
+def test_repair_rejects_low_confidence_answers(main, sub):
+    assert CategoryRepairer(MAPPING).repair(main, sub, 0.9) is None
+
+
+@pytest.mark.parametrize("sub", ["非接触式位移传感器", "非接触位移传感器"])
+def test_repair_never_drops_a_negation(sub):
+    # character ratio to 接触式位移传感器 is 0.94 / 0.875, but the meaning is inverted
+    for mapping in (MAPPING, load_rule_set().classification_mapping):
+        repaired = CategoryRepairer(mapping).repair("传感器", sub, 0.8)
+        assert repaired is None or repaired[0] != ("传感器", "接触式位移传感器")
+
+
+def test_validate_records_repair():
+    clf = MaterialClassifier()
+    rule_set = RuleSet(MAPPING)
+    result = {"main_category": "HMI/工控机/UPS", "sub_category": "UPS电源"}
+
+    assert clf.validate_classification_result(result, rule_set) is True
+    assert result["main_category"] == "软件/测试"
+    assert result["sub_category"] == "UPS电源"
+    assert result["repaired_from"] == "HMI/工控机/UPS/UPS电源"
+
+
+def test_validate_without_repair_still_rejects(monkeypatch):
+    monkeypatch.setattr(Config, "CATEGORY_REPAIR_MIN_SCORE", 0)
+    clf = MaterialClassifier()
+
+    with pytest.raises(ValueError):
+        clf.validate_classification_result({"main_category": "HMI/工控机/UPS", "sub_category": "UPS电源"}, RuleSet(MAPPING))
@@ -0,0 +1,100 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30, clock=FakeClock())
+
+    for _ in range(2):
+        breaker.before_request()
+        breaker.record_failure()
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_half_open_admits_one_probe_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30, clock=clock)
+    breaker.before_request()
+    breaker.record_failure()
+
+    clock.now = 30
+    breaker.before_request()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30, clock=clock)
+    breaker.before_request()
+    breaker.record_failure()
+
+    clock.now = 30
+    breaker.before_request()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now = 59
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_open_circuit_defers_batch_without_retry_sleeps(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "MAX_RETRIES", 3)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    monkeypatch.setattr(MaterialClassifier, "_circuit_breaker", CircuitBreaker(2, 60))
+
+    clf = MaterialClassifier()
+    calls = []
+    sleeps = []
+
+    def outage(**kwargs):
+        calls.append(kwargs)
+        raise ConnectionError("provider down")
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=outage))))
+    monkeypatch.setattr("material_classifier.time.sleep", sleeps.append)
+
+    results = clf.classify_batch([{"物料名称": f"XQ-{i:03d}"} for i in range(5)] + [{"物料名称": "可编程控制器"}])
+
+    # two failed requests open the circuit; everything after fails fast
+    assert len(calls) == 2
+    assert sleeps == [1]
+    assert [r["status"] for r in results] == ["failed", "deferred", "deferred", "deferred", "deferred", "success"]
@@ -0,0 +1,117 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import classification_cache
+from classification_cache import ClassificationCache
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+PLC = {"main_category": "PLC/IO模块/柜体", "sub_category": "PLC"}
+
+
+def material(name, model=""):
+    return {"型号": model, "品牌": "", "供应商": "", "物料名称": name, "材料": ""}
+
+
+def test_results_persist_across_instances(tmp_path):
+    db_file = str(tmp_path / "cache" / "llm.sqlite3")
+    cache = ClassificationCache(db_file, max_entries=0)
+    cache.put(material("XQ-001", "A1"), "v1", "deepseek-chat", PLC)
+    cache.close()
+
+    reopened = ClassificationCache(db_file, max_entries=0)
+    assert reopened.get(material("  xq-001 ", "a1"), "v1", "deepseek-chat") == PLC
+    assert reopened.get(material("XQ-001", "A1"), "v1", "other-model") is None
+    assert reopened.get(material("XQ-002", "A1"), "v1", "deepseek-chat") is None
+
+
+def test_new_rule_version_invalidates_old_results(tmp_path):
+    cache = ClassificationCache(str(tmp_path / "llm.sqlite3"), max_entries=0)
+    cache.put(material("XQ-001"), "v1", "deepseek-chat", PLC)
+
+    assert cache.get(material("XQ-001"), "v2", "deepseek-chat") is None
+
+
+def test_rule_versions_do_not_wipe_each_other(tmp_path, monkeypatch):
+    monkeypatch.setattr(classification_cache, "EVICTION_CHECK_INTERVAL", 1)
+    db_file = str(tmp_path / "llm.sqlite3")
+    # e.g. two processes (or a hot reload) using different rule versions on the same file
+    old, new = ClassificationCache(db_file, max_entries=3), ClassificationCache(db_file, max_entries=3)
+
+    old.put(material("A"), "v1", "m", PLC)
+    new.put(material("A"), "v2", "m", PLC)
+    old.put(material("B"), "v1", "m", PLC)
+
+    assert old.get(material("A"), "v1", "m") == PLC
+    assert new.get(material("A"), "v2", "m") == PLC
+    assert len(new) == 3
+
+    # stale versions age out through the size bound
+    for name in ("C", "D", "E"):
+        new.put(material(name), "v2", "m", PLC)
+    assert len(new) == 3
+    assert old.get(material("A"), "v1", "m") is None
+    old.close()
+    new.close()
+
+
+def test_least_recently_used_results_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(classification_cache, "EVICTION_CHECK_INTERVAL", 1)
+    monkeypatch.setattr(classification_cache.time, "time", iter(range(1, 100)).__next__)
+    cache = ClassificationCache(str(tmp_path / "llm.sqlite3"), max_entries=2)
+
+    cache.put(material("A"), "v1", "m", PLC)
+    cache.put(material("B"), "v1", "m", PLC)
+    assert cache.get(material("A"), "v1", "m") == PLC
+    cache.put(material("C"), "v1", "m", PLC)
+
+    assert len(cache) == 2
+    assert cache.get(material("B"), "v1", "m") is None
+    assert cache.get(material("A"), "v1", "m") == PLC
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    clf = MaterialClassifier()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}'))],
+            usage=None,
+        )
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf, calls
+
+
+def test_classify_material_reuses_cached_llm_result(classifier):
+    clf, calls = classifier
+
+    first = clf.classify_material({"物料名称": "XQ-001", "图号/型号": "A1"})
+    second = clf.classify_material({"物料名称": "xq-001 ", "图号/型号": "A1"})
+
+    assert len(calls) == 1
+    assert first["classification_source"] == "deepseek_api"
+    assert second == {**PLC, "classification_source": "llm_cache"}
+
+
+def test_llm_batch_path_uses_cache(classifier):
+    clf, calls = classifier
+    clf.classify_material({"物料名称": "XQ-001"})
+
+    results = clf.classify_batch([{"物料名称": "XQ-001"}, {"物料名称": "可编程控制器"}], llm_batch_size=20)
+
+    assert len(calls) == 1
+    assert [r["classification"]["classification_source"] for r in results] == ["llm_cache", "keyword_matcher"]
@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from concurrency_controller import AdaptiveConcurrencyController, is_overload_error
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def make_controller(clock, **kwargs):
+    params = dict(initial_limit=2, min_limit=1, max_limit=4, target_latency=5, clock=clock)
+    params.update(kwargs)
+    return AdaptiveConcurrencyController(**params)
+
+
+def test_limit_grows_additively_while_healthy():
+    clock = FakeClock()
+    controller = make_controller(clock)
+
+    # +1/limit per success: roughly one more slot per window of successful requests
+    for _ in range(2):
+        controller.release(controller.acquire())
+    assert controller.limit == 2
+    controller.release(controller.acquire())
+    assert controller.limit == 3
+
+    for _ in range(20):
+        controller.release(controller.acquire())
+    assert controller.limit == 4
+
+
+def test_try_acquire_returns_none_when_saturated():
+    clock = FakeClock()
+    controller = make_controller(clock)
+
+    started = [controller.try_acquire() for _ in range(2)]
+    assert None not in started
+    assert controller.try_acquire() is None
+
+    controller.release(started[0])
+    assert controller.try_acquire() is not None
+
+
+def test_slow_responses_hold_the_limit():
+    clock = FakeClock()
+    controller = make_controller(clock)
+
+    for _ in range(10):
+        started = controller.acquire()
+        clock.now += 30
+        controller.release(started)
+
+    assert controller.limit == 2
+    assert controller.snapshot()["latency"] == pytest.approx(30)
+
+
+def test_throttle_backs_off_once_per_in_flight_window():
+    clock = FakeClock()
+    controller = make_controller(clock, initial_limit=4)
+
+    started = [controller.acquire() for _ in range(4)]
+    clock.now += 1
+    for s in started:
+        controller.release(s, StatusError(429))
+
+    snapshot = controller.snapshot()
+    assert snapshot["limit"] == 2
+    assert snapshot["throttle_events"] == 4
+    assert snapshot["in_flight"] == 0
+
+    # a request started after the back-off may reduce the limit again
+    controller.release(controller.acquire(), StatusError(503))
+    assert controller.limit == 1
+
+
+def test_acquire_blocks_at_the_limit():
+    controller = make_controller(FakeClock(), initial_limit=1, max_limit=1)
+    first = controller.acquire()
+    acquired = threading.Event()
+
+    worker = threading.Thread(target=lambda: (controller.acquire(), acquired.set()))
+    worker.start()
+    assert not acquired.wait(0.2)
+
+    controller.release(first)
+    assert acquired.wait(5)
+    worker.join(5)
+
+
+def test_overload_error_classification():
+    assert is_overload_error(StatusError(429))
+    assert is_overload_error(StatusError(502))
+    assert is_overload_error(TimeoutError())
+    assert not is_overload_error(StatusError(400))
+    assert not is_overload_error(ValueError("API返回内容为空"))
+
+
+def test_request_completion_reports_throttling(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    controller = make_controller(FakeClock(), initial_limit=4)
+    monkeypatch.setattr(MaterialClassifier, "_concurrency_controller", controller)
+
+    clf = MaterialClassifier()
+
+    def throttled(**kwargs):
+        raise StatusError(429)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=throttled))))
+
+    with pytest.raises(StatusError):
+        clf._request_completion("物料名称: XQ-001", clf.rule_set)
+
+    assert MaterialClassifier.get_concurrency_stats() == {
+        "limit": 2, "in_flight": 0, "latency": None, "throttle_events": 1,
+    }
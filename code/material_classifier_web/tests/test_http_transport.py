@@ -0,0 +1,56 @@
+import os
+import sys
+import builtins
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import http_transport
+from material_classifier import MaterialClassifier
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "REQUEST_TIMEOUT", 12)
+    monkeypatch.setattr(Config, "HTTP_CONNECT_TIMEOUT", 3)
+    monkeypatch.setattr(Config, "HTTP_POOL_SIZE", 40)
+    monkeypatch.setattr(Config, "HTTP_KEEPALIVE_CONNECTIONS", 10)
+    monkeypatch.setattr(Config, "HTTP_KEEPALIVE_EXPIRY", 45)
+    monkeypatch.setattr(MaterialClassifier, "_clients", {})
+    yield
+
+
+def test_timeout_and_pool_limits_follow_config():
+    timeout = http_transport.request_timeout()
+    limits = http_transport.connection_limits()
+
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (3, 12, 12, 12)
+    assert (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry) == (40, 10, 45)
+
+
+def test_shared_client_enforces_timeout_and_leaves_retries_to_classifier():
+    first = MaterialClassifier()
+    second = MaterialClassifier()
+
+    assert first.client is second.client
+    assert first.client.max_retries == 0
+    assert first.client.timeout.read == 12
+
+
+def test_http2_falls_back_when_h2_missing(monkeypatch):
+    monkeypatch.setattr(Config, "HTTP2_ENABLED", True)
+    real_import = builtins.__import__
+
+    def no_h2(name, *args, **kwargs):
+        if name == "h2":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_h2)
+
+    assert http_transport.http2_enabled() is False
@@ -0,0 +1,148 @@
+import os
+import sys
+import pandas as pd
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from keyword_matcher import KeywordAutomaton, KeywordMatcher
+
+
+def make_mapping():
+    # {(normalized_main, normalized_sub): (main, sub, keywords, explanation, common_brands)}
+    return {
+        ("传感器类", "温度传感器"): ("传感器类", "温度传感器", "温度传感器、热电偶", "", "OMRON、欧姆龙"),
+        ("传感器类", "接近传感器"): ("传感器类", "接近传感器", "接近开关, 传感器", "", "SICK"),
+        ("plc/io模块/柜体", "plc"): ("PLC/IO模块/柜体", "PLC", "可编程控制器，CPU", "", "SIEMENS、西门子"),
+        ("其他", "无关键词"): ("其他", "无关键词", "", "", ""),
+    }
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = KeywordAutomaton()
+    for word in ["he", "she", "his", "hers"]:
+        automaton.add(word, word)
+    automaton.build()
+
+    found = sorted(value for _, value in automaton.iter_matches("ushers"))
+    assert found == ["he", "hers", "she"]
+
+
+def test_match_keywords_returns_rule_order():
+    matcher = KeywordMatcher(make_mapping())
+
+    # "温度传感器" also contains the shorter keyword "传感器" of a later rule
+    matches = matcher.match_keywords("PT100 温度传感器")
+    assert [(m[0], m[1]) for m in matches] == [
+        ("传感器类", "温度传感器"),
+        ("传感器类", "接近传感器"),
+    ]
+    assert matches[0][2] == "OMRON、欧姆龙"
+
+
+def test_match_keywords_normalizes_case_and_spaces():
+    matcher = KeywordMatcher(make_mapping())
+
+    matches = matcher.match_keywords("s7-1200 c p u")
+    assert [(m[0], m[1]) for m in matches] == [("PLC/IO模块/柜体", "PLC")]
+
+
+def test_match_keywords_counts_repeated_keyword_once():
+    matcher = KeywordMatcher(make_mapping())
+
+    matches = matcher.match_keywords("热电偶热电偶")
+    assert len(matches) == 1
+
+
+def test_match_keywords_no_match_or_empty():
+    matcher = KeywordMatcher(make_mapping())
+
+    assert matcher.match_keywords("螺钉") == []
+    assert matcher.match_keywords("") == []
+    assert matcher.match_keywords(None) == []
+
+
+def test_match_dataframe_agrees_with_row_matching():
+    matcher = KeywordMatcher(make_mapping())
+    rows = [
+        {"物料名称": "温度传感器", "图号/型号": "PT100", "分类/品牌": "SICK", "材料": ""},
+        {"物料名称": "温度传感器", "图号/型号": "PT100", "分类/品牌": "", "材料": ""},
+        {"物料名称": "模块", "图号/型号": "CPU 1214C", "分类/品牌": "西门子", "材料": ""},
+        {"物料名称": "螺钉", "图号/型号": "M4x10", "分类/品牌": "市购", "材料": "碳钢"},
+        {"物料名称": None, "图号/型号": "", "分类/品牌": "", "材料": "热电偶"},
+    ]
+    df = pd.DataFrame(rows, index=[10, 11, 12, 13, 14])
+
+    result = matcher.match_dataframe(df)
+
+    assert list(result.index) == [10, 11, 12, 13, 14]
+    for row, (_, out) in zip(rows, result.iterrows()):
+        expected = matcher.match_by_keywords_and_brand(row) or ("", "")
+        assert (out["main_category"], out["sub_category"]) == expected
+    assert result["needs_llm"].tolist() == [False, False, False, True, False]
+    # brand disambiguation picks the rule whose 常用品牌 contains SICK
+    assert result.at[10, "sub_category"] == "接近传感器"
+
+
+def test_match_dataframe_accepts_short_column_names():
+    matcher = KeywordMatcher(make_mapping())
+    df = pd.DataFrame([{"物料名称": "", "型号": "接近开关", "品牌": ""}])
+
+    result = matcher.match_dataframe(df)
+
+    assert result.at[0, "sub_category"] == "接近传感器"
+    assert not result.at[0, "needs_llm"]
+
+
+def test_brand_index_built_once_per_category():
+    matcher = KeywordMatcher(make_mapping())
+
+    assert matcher._category_brands[("传感器类", "温度传感器")] == frozenset({"omron", "欧姆龙"})
+    assert matcher._brand_index["sick"] == {("传感器类", "接近传感器")}
+
+
+def test_brand_disambiguation_in_both_directions():
+    matcher = KeywordMatcher(make_mapping())
+
+    # material brand contains a common brand
+    result = matcher.match_by_keywords_and_brand({"物料名称": "温度传感器", "分类/品牌": "SICK AG"})
+    assert result == ("传感器类", "接近传感器")
+
+    # material brand is a fragment of a common brand
+    result = matcher.match_by_keywords_and_brand({"物料名称": "温度传感器", "品牌": "omr"})
+    assert result == ("传感器类", "温度传感器")
+
+    # no brand hit falls back to the first keyword match
+    result = matcher.match_by_keywords_and_brand({"物料名称": "温度传感器", "分类/品牌": "未知品牌"})
+    assert result == ("传感器类", "温度传感器")
+
+
+def test_match_fields_tags_hits_by_source_field():
+    matcher = KeywordMatcher(make_mapping())
+
+    tagged = matcher.match_fields({
+        "物料名称": "热电偶",
+        "图号/型号": "CPU 315",
+        "分类/品牌": "",
+        "材料": "传感器",
+    })
+
+    assert [(field, match[1]) for field, match in tagged] == [
+        ("物料名称", "温度传感器"),
+        ("型号", "PLC"),
+        ("材料", "接近传感器"),
+    ]
+
+
+def test_match_fields_does_not_match_across_field_boundaries():
+    matcher = KeywordMatcher(make_mapping())
+
+    # "热电" at the end of one field and "偶" at the start of the next must not join
+    assert matcher.match_fields({"物料名称": "热电", "型号": "偶"}) == []
+
+
+def test_match_by_multiple_fields_respects_field_priority():
+    matcher = KeywordMatcher(make_mapping())
+
+    matches = matcher.match_by_multiple_fields({"物料名称": "螺钉", "型号": "CPU", "材料": "热电偶"})
+    assert [(m[0], m[1]) for m in matches] == [("PLC/IO模块/柜体", "PLC")]
@@ -1,6 +1,7 @@
 import os
 import sys
 import pytest
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -111,28 +112,33 @@ def test_classify_batch_single_item():
     assert results[0]['status'] == 'success'
 
 
-def test_classify_batch_triggers_sleep_between_items():
-    """Test that classify_batch calls sleep between items."""
+def test_classify_batch_charges_rate_limiter_per_api_call(monkeypatch):
+    """Test that classify_batch is throttled by the rate limiter, not by sleeping between items."""
+    monkeypatch.setattr(Config, 'DEEPSEEK_API_KEY', 'testkey')
+    monkeypatch.setattr(Config, 'DEEPSEEK_API_URL', 'https://example.com/api')
+    monkeypatch.setattr(Config, 'DEEPSEEK_MODEL', 'dummy-model')
+    monkeypatch.setattr(MaterialClassifier, '_rate_limiter', None)
     mc = MaterialClassifier()
     
     def fake_create(**kwargs):
-        inp = kwargs.get('input') or ''
-        if inp == Config.PROMPT_TEMPLATE:
-            return DummyResp('init', 'OK')
-        return DummyResp('r1', '{"main_category":"传感器类","sub_category":"压力扭矩传感器"}')
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
     
-    mc.client = make_client_with_create(fake_create)
+    mc.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
     
-    with patch('time.sleep') as mock_sleep:
+    acquired = []
+    limiter = MaterialClassifier.get_rate_limiter()
+    with patch.object(limiter, 'acquire', side_effect=acquired.append), patch('time.sleep') as mock_sleep:
         results = mc.classify_batch([
-            {'物料名称': '传感器1', '图号/型号': 'SNS-001'},
-            {'物料名称': '传感器2', '图号/型号': 'SNS-002'},
-            {'物料名称': '传感器3', '图号/型号': 'SNS-003'},
+            {'物料名称': 'XQ-001', '图号/型号': 'SNS-001'},
+            {'物料名称': 'XQ-002', '图号/型号': 'SNS-002'},
+            {'物料名称': 'XQ-003', '图号/型号': 'SNS-003'},
         ])
     
-    # Should call sleep twice (between items 1-2 and 2-3, but not after the last item)
-    assert mock_sleep.call_count == 2
-    assert mock_sleep.call_args_list[0] == ((Config.API_RATE_LIMIT,),)
+    # One limiter charge per API request, no fixed delay between items
+    assert [r['classification']['classification_source'] for r in results] == ['deepseek_api'] * 3
+    assert len(acquired) == 3
+    mock_sleep.assert_not_called()
 
 
 def test_api_key_missing_raises():
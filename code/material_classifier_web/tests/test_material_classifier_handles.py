@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import material_classifier
+from material_classifier import MaterialClassifier
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    yield
+
+
+def test_handles_share_rule_set_and_client():
+    first = MaterialClassifier()
+    second = MaterialClassifier()
+
+    assert first is not second
+    assert first.rule_set is second.rule_set
+    assert first.keyword_matcher is second.keyword_matcher
+    assert first.client is second.client
+
+
+def test_creating_handles_never_reloads_rules(monkeypatch):
+    MaterialClassifier()
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("rule set must only be loaded once")
+
+    monkeypatch.setattr(material_classifier, "load_rule_set", fail_load)
+
+    handles = [MaterialClassifier() for _ in range(100)]
+    assert len({id(h.rule_set) for h in handles}) == 1
+
+
+def test_concurrent_first_use_loads_rules_once(monkeypatch):
+    loaded_rule_set = MaterialClassifier().rule_set
+    monkeypatch.setattr(MaterialClassifier, "_rule_set", None)
+    monkeypatch.setattr(MaterialClassifier, "_classification_mapping", None)
+
+    loads = []
+
+    def counting_load(*args, **kwargs):
+        loads.append(1)
+        return loaded_rule_set
+
+    monkeypatch.setattr(material_classifier, "load_rule_set", counting_load)
+
+    start = threading.Barrier(8)
+    handles = []
+
+    def create():
+        start.wait(5)
+        handles.append(MaterialClassifier())
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == [1]
+    assert all(h.rule_set is loaded_rule_set for h in handles)
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_classifier import MaterialClassifier
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "MAX_RETRIES", 1)
+    yield
+
+
+def make_chat_client(fn):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fn)))
+
+
+def make_completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+MATERIALS = [
+    {"物料名称": "XQ-001", "图号/型号": "AAA"},
+    {"物料名称": "XQ-002", "图号/型号": "BBB"},
+    {"物料名称": "XQ-003", "图号/型号": "CCC"},
+]
+
+
+def test_batch_results_keyed_by_id_and_only_failures_retried(monkeypatch):
+    clf = MaterialClassifier()
+    user_prompts = []
+
+    def fake_create(**kwargs):
+        user_prompt = kwargs["messages"][1]["content"]
+        user_prompts.append(user_prompt)
+        if "条物料逐一进行分类" in user_prompt:
+            # out of order, item 2 has a category that does not exist
+            return make_completion("```json\n" + json.dumps([
+                {"id": 3, "main_category": "气动", "sub_category": "气缸"},
+                {"id": "1", "main_category": "PLC/IO模块/柜体", "sub_category": "PLC"},
+                {"id": 2, "main_category": "不存在的大类", "sub_category": "不存在"},
+            ], ensure_ascii=False) + "\n```")
+        assert "XQ-002" in user_prompt
+        return make_completion('{"main_category":"软件/测试","sub_category":"UPS电源"}')
+
+    monkeypatch.setattr(clf, "client", make_chat_client(fake_create))
+
+    results = clf.classify_llm_batch(MATERIALS, batch_size=20)
+
+    assert len(user_prompts) == 2
+    assert [r["status"] for r in results] == ["success"] * 3
+    assert results[0]["classification"]["sub_category"] == "PLC"
+    assert results[0]["classification"]["classification_source"] == "deepseek_api_batch"
+    assert results[1]["classification"]["sub_category"] == "UPS电源"
+    assert results[1]["classification"]["classification_source"] == "deepseek_api"
+    assert results[2]["original_data"] is MATERIALS[2]
+
+
+def test_failed_batch_request_falls_back_to_single_calls(monkeypatch):
+    clf = MaterialClassifier()
+    calls = {"batch": 0, "single": 0}
+
+    def fake_create(**kwargs):
+        if "条物料逐一进行分类" in kwargs["messages"][1]["content"]:
+            calls["batch"] += 1
+            return make_completion("无法给出结果")
+        calls["single"] += 1
+        if "XQ-003" in kwargs["messages"][1]["content"]:
+            raise Exception("API Error")
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}')
+
+    monkeypatch.setattr(clf, "client", make_chat_client(fake_create))
+
+    results = clf.classify_llm_batch(MATERIALS, batch_size=2)
+
+    assert calls == {"batch": 2, "single": 3}
+    assert [r["status"] for r in results] == ["success", "success", "failed"]
+    assert "API Error" in results[2]["error"]
+
+
+def test_classify_batch_sends_only_keyword_misses_to_llm(monkeypatch):
+    clf = MaterialClassifier()
+    batch_prompts = []
+
+    def fake_create(**kwargs):
+        batch_prompts.append(kwargs["messages"][1]["content"])
+        return make_completion('[{"id": 1, "main_category": "PLC/IO模块/柜体", "sub_category": "PLC"}]')
+
+    monkeypatch.setattr(clf, "client", make_chat_client(fake_create))
+
+    results = clf.classify_batch([{"物料名称": "可编程控制器"}, MATERIALS[0]], llm_batch_size=20)
+
+    assert len(batch_prompts) == 1
+    assert "XQ-001" in batch_prompts[0] and "可编程控制器" not in batch_prompts[0]
+    assert results[0]["classification"]["classification_source"] == "keyword_matcher"
+    assert results[1]["classification"]["classification_source"] == "deepseek_api_batch"
@@ -0,0 +1,57 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_classifier import MaterialClassifier
+from api_metrics import TokenUsageStats
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_usage_stats", TokenUsageStats())
+    yield
+
+
+def make_chat_client(fn):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fn)))
+
+
+def make_completion(text, usage=None):
+    message = SimpleNamespace(content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_system_prompt_is_reused_byte_for_byte(monkeypatch):
+    clf = MaterialClassifier()
+    system_prompts = []
+
+    def fake_create(**kwargs):
+        system_prompts.append(kwargs["messages"][0]["content"])
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10,
+                                prompt_cache_hit_tokens=90, prompt_cache_miss_tokens=10)
+        return make_completion('{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}', usage)
+
+    monkeypatch.setattr(clf, "client", make_chat_client(fake_create))
+
+    clf._call_deepseek_api("prompt 1")
+    clf._call_deepseek_api("prompt 2")
+
+    assert len(system_prompts) == 2
+    assert system_prompts[0] is system_prompts[1]
+    assert system_prompts[0] is clf.build_comprehensive_prompt()
+    category_id = clf.rule_set.category_ids[("plc/io模块/柜体", "plc")]
+    assert f"- [{category_id}] 大类：PLC/IO模块/柜体，二级类：PLC" in system_prompts[0]
+
+    usage = MaterialClassifier.get_usage_stats()
+    assert usage["requests"] == 2
+    assert usage["prompt_cache_hit_tokens"] == 180
+    assert usage["prompt_cache_miss_tokens"] == 20
+    assert usage["prompt_cache_hit_rate"] == 0.9
@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import pandas as pd
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from material_classifier import MaterialClassifier
+from rule_set import RuleFileWatcher
+from config import Config
+
+
+def write_rules(path, rows):
+    df = pd.DataFrame(rows, columns=["序号", "一级分类", "二级分类", "关键字", "释义", "常用品牌"])
+    df.to_excel(path, index=False)
+
+
+@pytest.fixture(autouse=True)
+def set_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "RULE_SNAPSHOT_FILE", "")
+
+    rules_file = tmp_path / "rules.xlsx"
+    write_rules(rules_file, [[1, "传感器类", "温度传感器", "热电偶", "", ""]])
+    monkeypatch.setattr(Config, "CLASSIFICATION_EXPLANATION_FILE", str(rules_file))
+
+    # keep the shared rule set of other tests untouched
+    monkeypatch.setattr(MaterialClassifier, "_rule_set", None)
+    monkeypatch.setattr(MaterialClassifier, "_classification_mapping", None)
+    yield rules_file
+
+
+def test_reload_rules_swaps_rule_set_when_file_changes(set_config):
+    clf = MaterialClassifier()
+    old_rule_set = clf.rule_set
+
+    # unchanged file: nothing to do
+    assert MaterialClassifier.reload_rules() is False
+    assert clf.rule_set is old_rule_set
+
+    write_rules(set_config, [[1, "气动类", "气缸（执行机构）", "气缸", "", ""]])
+    assert MaterialClassifier.reload_rules() is True
+
+    assert clf.rule_set is not old_rule_set
+    assert list(clf.classification_mapping) == [("气动类", "气缸（执行机构）")]
+    assert clf.keyword_matcher.match_by_keywords_and_brand({"物料名称": "气缸"}) == ("气动类", "气缸（执行机构）")
+    assert "气缸（执行机构）" in clf.rule_set.system_prompt
+
+
+def test_failed_reload_keeps_current_rules(set_config):
+    clf = MaterialClassifier()
+    old_rule_set = clf.rule_set
+
+    write_rules(set_config, [])
+    assert MaterialClassifier.reload_rules() is False
+    assert clf.rule_set is old_rule_set
+
+
+def test_in_flight_classification_keeps_its_rule_set(set_config, monkeypatch):
+    clf = MaterialClassifier()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def slow_api(prompt, rule_set=None, system_prompt=None):
+        entered.set()
+        release.wait(5)
+        return {"main_category": "传感器类", "sub_category": "温度传感器", "classification_source": "deepseek_api"}
+
+    monkeypatch.setattr(clf, "_call_deepseek_api", slow_api)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(clf.classify_material({"物料名称": "未知物料"})))
+    worker.start()
+    assert entered.wait(5)
+
+    # swap the rules while the call is in flight; the old category no longer exists
+    write_rules(set_config, [[1, "气动类", "气缸（执行机构）", "气缸", "", ""]])
+    assert MaterialClassifier.reload_rules() is True
+    release.set()
+    worker.join(5)
+
+    assert results == [{"main_category": "传感器类", "sub_category": "温度传感器", "classification_source": "deepseek_api"}]
+
+
+def test_rule_file_watcher_calls_back_on_change(tmp_path):
+    path = tmp_path / "watched.xlsx"
+    path.write_bytes(b"v1")
+    changes = []
+    watcher = RuleFileWatcher(str(path), lambda: changes.append(1), interval=60)
+
+    assert watcher.check() is False
+    path.write_bytes(b"version 2")
+    assert watcher.check() is True
+    assert watcher.check() is False
+    assert changes == [1]
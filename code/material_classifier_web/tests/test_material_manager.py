@@ -37,7 +37,7 @@ def test_process_material_with_mocked_classifier(monkeypatch):
     def fake_classify(info):
         return {"main_category": "PLC/IO模块/柜体", "sub_category": "PLC"}
 
-    manager.classifier.classify_material = fake_classify
+    monkeypatch.setattr(manager.classifier, "classify_material", fake_classify)
 
     material = {
         "物料名称": "Test Part",
@@ -0,0 +1,152 @@
+import os
+import sys
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from model_prefix_trie import ModelPrefixTrie, normalize_model
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from result_history import ResultHistory
+from rule_set import load_rule_set
+from config import Config
+
+PLC = ("PLC/IO模块/柜体", "PLC")
+CYLINDER = ("气动", "气缸")
+
+
+def build_trie():
+    trie = ModelPrefixTrie()
+    for model in ("6ES7 214-1AG40", "6ES7 315-2EH14", "6ES7 511-1AK02"):
+        trie.add(model, PLC)
+    for model in ("CDQ2B20-10D", "CDQ2B32-20D", "CDQ2A25-15"):
+        trie.add(model, CYLINDER)
+    trie.add("CDJ2B16-30", PLC)
+    return trie
+
+
+def test_normalize_model():
+    assert normalize_model(" ６es7 214 ") == "6ES7214"
+    assert normalize_model(None) == ""
+    assert normalize_model(float("nan")) == ""
+
+
+def test_lookup_uses_deepest_pure_prefix():
+    trie = build_trie()
+
+    label, prefix, support, purity = trie.lookup("6es7 317-2ek14", min_length=4, min_support=2, min_purity=0.9)
+    assert (label, prefix, support, purity) == (PLC, "6ES7", 3, 1.0)
+
+    # "CD" is mixed, "CDQ2" is pure
+    label, prefix, _, _ = trie.lookup("CDQ2B50-40D", min_length=2, min_support=2, min_purity=0.9)
+    assert (label, prefix) == (CYLINDER, "CDQ2B")
+    assert len(trie) == 7
+
+
+@pytest.mark.parametrize(
+    "model, min_length, min_support, min_purity",
+    [
+        ("XYZ-100", 2, 1, 0.5),        # unseen prefix
+        ("CDJ2B16-30", 4, 2, 0.9),     # only one sample below CDJ
+        ("CD", 2, 2, 0.9),             # 3 cylinders vs 1 PLC under "CD"
+        ("6ES", 4, 1, 0.5),            # shorter than the minimum prefix
+        ("", 1, 1, 0.5),
+    ],
+)
+def test_lookup_rejects_weak_prefixes(model, min_length, min_support, min_purity):
+    assert build_trie().lookup(model, min_length, min_support, min_purity) is None
+
+
+def write_results(path, rows):
+    pd.DataFrame(rows, columns=["物料名称", "图号/型号", "分类/品牌", "功能大类", "二级分类", "分类状态", "分类来源"]).to_excel(path, index=False)
+
+
+def test_incomplete_result_history_cannot_be_instantiated():
+    class MissingAddRecord(ResultHistory):
+        def _clear(self):
+            super()._clear()
+
+    with pytest.raises(TypeError):
+        MissingAddRecord()
+    with pytest.raises(TypeError):
+        ResultHistory()
+
+
+def test_incremental_update_and_rebuild(tmp_path):
+    trie_file = str(tmp_path / "cache" / "trie.pkl")
+    pattern = str(tmp_path / "*.xlsx")
+    rule_set = load_rule_set()
+    first = tmp_path / "a.xlsx"
+    write_results(first, [
+        ["PLC", "6ES7 214", "西门子", "PLC/IO模块/柜体", "PLC", "success", "deepseek_api"],
+        ["PLC", "6ES7 315", "西门子", "PLC/IO模块/柜体", "PLC", "failed", ""],
+        ["PLC", "6ES7 511", "西门子", "PLC/IO模块/柜体", "PLC", "success", "model_prefix"],
+    ])
+
+    trie = ModelPrefixTrie.load_from_results(trie_file, [pattern], rule_set)
+    # failed rows and rows inferred by the trie itself are not learned
+    assert len(trie) == 1
+
+    write_results(tmp_path / "b.xlsx", [["气缸", "CDQ2B20", "SMC", "气动", "气缸", "success", "keyword_matcher"]])
+    trie = ModelPrefixTrie.load_from_results(trie_file, [pattern], rule_set)
+    assert len(trie) == 2
+    assert set(trie.sources) == {str(first), str(tmp_path / "b.xlsx")}
+
+    # unchanged files are not imported again
+    assert ModelPrefixTrie.load_from_results(trie_file, [pattern], rule_set).update_from_files(sorted(trie.sources), rule_set) is False
+
+    os.remove(first)
+    trie = ModelPrefixTrie.load_from_results(trie_file, [pattern], rule_set)
+    assert len(trie) == 1
+    assert trie.lookup("CDQ2B20", 4, 1, 0.9)[0] == CYLINDER
+
+
+@pytest.fixture
+def classifier(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "MODEL_PREFIX_MIN_LENGTH", 4)
+    monkeypatch.setattr(Config, "MODEL_PREFIX_MIN_SUPPORT", 2)
+    monkeypatch.setattr(Config, "MODEL_PREFIX_MIN_PURITY", 0.9)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+
+    write_results(tmp_path / "results.xlsx", [
+        ["控制器", "XQ-0017", "", "PLC/IO模块/柜体", "PLC", "success", "deepseek_api"],
+        ["控制器", "XQ-0018", "", "PLC/IO模块/柜体", "PLC", "success", "deepseek_api"],
+    ])
+    monkeypatch.setattr(Config, "RESULT_HISTORY_PATTERNS", [str(tmp_path / "*.xlsx")])
+
+    clf = MaterialClassifier()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf, calls
+
+
+def test_model_prefix_tier_answers_before_llm(classifier):
+    clf, calls = classifier
+
+    result = clf.classify_material({"物料名称": "未知模块", "图号/型号": "XQ-0019"})
+
+    assert result == {"main_category": "PLC/IO模块/柜体", "sub_category": "PLC", "classification_source": "model_prefix"}
+    assert calls == []
+
+    assert clf.classify_material({"物料名称": "未知模块", "图号/型号": "YZ-778"})["classification_source"] == "deepseek_api"
+    assert len(calls) == 1
+
+
+def test_model_prefix_tier_can_be_disabled(classifier, monkeypatch):
+    clf, calls = classifier
+    monkeypatch.setattr(Config, "MODEL_PREFIX_MIN_SUPPORT", 0)
+
+    assert MaterialClassifier.refresh_model_prefix_trie() is None
+    assert clf.classify_material({"物料名称": "未知模块", "图号/型号": "XQ-0019"})["classification_source"] == "deepseek_api"
@@ -0,0 +1,165 @@
+import os
+import sys
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import neighbor_index
+from neighbor_index import NeighborIndex, load_labeled_materials, material_features, train_neighbor_index
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from rule_set import RuleSet
+from config import Config
+
+MATERIALS = [
+    ({"物料名称": "内六角圆柱头螺钉", "型号": "GB/T70.1-M4×10", "材料": "碳钢,镀锌,12.9级", "品牌": "市购"}, ("紧固/标准件", "螺钉")),
+    ({"物料名称": "内六角圆柱头螺钉", "型号": "GB/T70.1-M5×12", "材料": "不锈钢", "品牌": "市购"}, ("紧固/标准件", "螺钉")),
+    ({"物料名称": "六角螺母", "型号": "GB/T6170-M8", "材料": "碳钢", "品牌": "市购"}, ("紧固/标准件", "螺母")),
+    ({"物料名称": "直线导轨", "型号": "HGH20CA", "品牌": "HIWIN"}, ("机械运动部件", "导轨、滑轨")),
+    ({"物料名称": "深沟球轴承", "型号": "6204-2RS", "品牌": "NSK"}, ("机械运动部件", "轴承类")),
+]
+
+
+def build_index():
+    return NeighborIndex.build([m for m, _ in MATERIALS], [label for _, label in MATERIALS])
+
+
+def test_features_are_field_tagged():
+    features = material_features({"物料名称": "轴承", "型号": "轴承", "品牌": "ＮＳＫ"})
+
+    assert features["n:轴承"] == 1 and features["m:轴承"] == 1
+    assert features["b:nsk"] == 1
+
+
+def test_query_finds_similar_labeled_material():
+    index = build_index()
+
+    label, similarity = index.query({"物料名称": "内六角圆柱头螺钉", "型号": "GB/T70.1-M4×16", "品牌": "市购"}, 0.5)
+    assert label == ("紧固/标准件", "螺钉")
+    assert 0.5 <= similarity <= 1.0
+
+    assert index.query({"物料名称": "触摸屏", "型号": "TPC7062"}, 0.5) is None
+    assert index.query({}, 0.0) is None
+
+
+@pytest.mark.parametrize("dense_features", [0, 5, 256])
+def test_query_batch_matches_single_queries(monkeypatch, dense_features):
+    # all-sparse, mixed and all-dense scoring must agree with the single-query path
+    monkeypatch.setattr(neighbor_index, "DENSE_FEATURE_COUNT", dense_features)
+    index = build_index()
+    queries = [m for m, _ in MATERIALS] + [{"物料名称": "导轨滑块", "型号": "HGH20"}, {"物料名称": "未知"}]
+    queries.append(dict(queries[0]))
+
+    # force several score-matrix chunks
+    monkeypatch.setattr(neighbor_index, "MAX_SCORE_CELLS", len(index) * 2)
+    batch = index.query_batch(queries, 0.3)
+
+    assert batch == [index.query(q, 0.3) for q in queries]
+    for (material, label), hit in zip(MATERIALS, batch):
+        assert hit[0] == label
+        assert hit[1] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    index_file = tmp_path / "index" / "neighbor_index.npz"
+    index.save(str(index_file))
+
+    loaded = NeighborIndex.load(str(index_file))
+
+    assert len(loaded) == len(index)
+    assert loaded.labels == index.labels
+    query = {"物料名称": "六角螺母", "型号": "GB/T6170-M10"}
+    assert loaded.query(query, 0.3) == index.query(query, 0.3)
+    assert os.listdir(tmp_path / "index") == ["neighbor_index.npz"]
+
+
+def test_train_from_labeled_excel(tmp_path):
+    rows = [
+        {"物料名称": "六角螺母", "图号/型号": "M8", "分类/品牌": "市购", "材料/描述": "碳钢", "功能大类": "23 紧固/标准件", "二级分类": "螺母"},
+        {"物料名称": "神秘物料", "图号/型号": "X1", "分类/品牌": "", "材料/描述": "", "功能大类": "不存在", "二级分类": "不存在"},
+        {"物料名称": "无标注", "图号/型号": "X2", "分类/品牌": "", "材料/描述": "", "功能大类": "", "二级分类": ""},
+    ]
+    data_file = tmp_path / "labeled.xlsx"
+    pd.DataFrame(rows).to_excel(data_file, index=False)
+    rule_set = RuleSet({("紧固/标准件", "螺母"): ("紧固/标准件", "螺母", "", "", "")})
+
+    assert len(load_labeled_materials(str(data_file))) == 2
+    index = train_neighbor_index([str(data_file)], rule_set)
+
+    assert len(index) == 1
+    assert index.labels == [("紧固/标准件", "螺母")]
+
+
+@pytest.fixture
+def classifier_with_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "NEIGHBOR_MIN_SIMILARITY", 0.8)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+
+    index_file = tmp_path / "neighbor_index.npz"
+    NeighborIndex.build(
+        [{"物料名称": "XQ-001 专用夹具"}, {"物料名称": "旧分类物料"}],
+        [("PLC/IO模块/柜体", "PLC"), ("已删除大类", "已删除二级类")],
+    ).save(str(index_file))
+    monkeypatch.setattr(Config, "NEIGHBOR_INDEX_FILE", str(index_file))
+
+    clf = MaterialClassifier()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+    return clf, calls
+
+
+def test_neighbor_hit_skips_llm(classifier_with_index):
+    clf, calls = classifier_with_index
+
+    result = clf.classify_material({"物料名称": "XQ-001 专用夹具"})
+
+    assert result == {"main_category": "PLC/IO模块/柜体", "sub_category": "PLC", "classification_source": "neighbor_index"}
+    assert calls == []
+
+
+def test_stale_or_distant_neighbors_fall_through_to_llm(classifier_with_index):
+    clf, calls = classifier_with_index
+
+    assert clf.classify_material({"物料名称": "旧分类物料"})["classification_source"] == "deepseek_api"
+    assert clf.classify_material({"物料名称": "YZ-778"})["classification_source"] == "deepseek_api"
+    assert len(calls) == 2
+
+
+def test_batch_path_queries_neighbors_together(classifier_with_index, monkeypatch):
+    clf, calls = classifier_with_index
+    batches = []
+    original = NeighborIndex.query_batch
+
+    def spy(self, materials, min_similarity):
+        batches.append(len(materials))
+        return original(self, materials, min_similarity)
+
+    monkeypatch.setattr(NeighborIndex, "query_batch", spy)
+
+    results = clf.classify_batch([{"物料名称": "XQ-001 专用夹具"}, {"物料名称": "YZ-778"}], llm_batch_size=10)
+
+    assert batches == [2]
+    assert results[0]["classification"]["classification_source"] == "neighbor_index"
+    assert results[1]["status"] == "success"
+    # only the neighbour miss reaches the LLM
+    assert calls and all("XQ-001" not in call["messages"][-1]["content"] for call in calls)
+
+
+def test_missing_index_file_disables_tier(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "NEIGHBOR_INDEX_FILE", str(tmp_path / "missing.npz"))
+
+    assert MaterialClassifier.get_neighbor_index() is None
+    assert MaterialClassifier._neighbor_index_loaded is True
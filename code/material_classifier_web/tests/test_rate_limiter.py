@@ -0,0 +1,78 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rate_limiter import RateLimiter, TokenBucket
+from material_classifier import MaterialClassifier
+from config import Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now = 10
+    assert bucket.reserve() == 0
+
+
+def test_rate_limiter_settles_token_estimate_with_actual_usage():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_second=None, tokens_per_minute=600, clock=clock)
+
+    assert limiter.reserve(500) == 0
+    # the estimate was too high: the unused tokens are returned to the bucket
+    limiter.settle(500, 100)
+    assert limiter.reserve(500) == 0
+    assert limiter.reserve(100) == pytest.approx(10.0)
+
+
+def test_unlimited_rate_limiter_never_waits():
+    limiter = RateLimiter(requests_per_second=0, tokens_per_minute=0)
+
+    assert all(limiter.reserve(10 ** 6) == 0 for _ in range(100))
+
+
+def test_keyword_matches_do_not_touch_rate_limiter(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+
+    clf = MaterialClassifier()
+    acquired = []
+    limiter = SimpleNamespace(
+        estimate_tokens=RateLimiter.estimate_tokens,
+        acquire=acquired.append,
+        settle=lambda estimated, actual: None,
+    )
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", limiter)
+
+    def fake_create(**kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}'))],
+            usage=None,
+        )
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+
+    results = clf.classify_batch([{"物料名称": "可编程控制器"}, {"物料名称": "XQ-001"}, {"物料名称": "可编程控制器"}])
+
+    assert [r["status"] for r in results] == ["success"] * 3
+    assert len(acquired) == 1
+    assert acquired[0] > 0
@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from request_hedging import LatencyTracker, RequestHedger
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+def make_hedger(samples=(0.01,) * 10, budget=1.0):
+    tracker = LatencyTracker(window_size=100)
+    for seconds in samples:
+        tracker.record(seconds)
+    return RequestHedger(tracker, percentile=90, budget=budget, min_samples=5, min_delay=0.01)
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker(window_size=100)
+    assert tracker.percentile(95) is None
+    assert tracker.snapshot()["p95"] is None
+
+    for seconds in range(1, 101):
+        tracker.record(float(seconds))
+    assert tracker.percentile(50) == 50.0
+    assert tracker.percentile(95) == 95.0
+    snapshot = tracker.snapshot()
+    assert (snapshot["samples"], snapshot["p99"], snapshot["max"]) == (100, 99.0, 100.0)
+
+    # only the most recent window is kept
+    tracker.record(1000.0)
+    assert len(tracker) == 100
+    assert tracker.percentile(1) == 2.0
+
+
+def test_no_hedging_without_enough_samples():
+    hedger = make_hedger(samples=(0.01,) * 4)
+    thread_ids = []
+
+    assert hedger.hedge_delay() is None
+    assert hedger.call(lambda sent: thread_ids.append(threading.get_ident()) or "ok", None) == "ok"
+    # the request ran inline in the caller's thread
+    assert thread_ids == [threading.get_ident()]
+
+
+def test_slow_request_is_hedged_and_first_response_wins():
+    hedger = make_hedger()
+    release = threading.Event()
+    discarded = []
+
+    def slow(sent):
+        sent()
+        release.wait(5)
+        return "primary"
+
+    def hedge():
+        return "hedge"
+
+    assert hedger.call(slow, hedge, on_discard=discarded.append) == "hedge"
+    release.set()
+
+    stats = hedger.snapshot()
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"]) == (1, 1, 1)
+    for _ in range(100):
+        if discarded:
+            break
+        threading.Event().wait(0.01)
+    assert discarded == ["primary"]
+
+
+def test_hedge_budget_limits_duplicate_requests():
+    hedger = make_hedger(budget=0.5)
+    hedge_calls = []
+
+    def slowish(sent):
+        sent()
+        threading.Event().wait(0.05)
+        return "primary"
+
+    for _ in range(4):
+        assert hedger.call(slowish, lambda: hedge_calls.append(1) or threading.Event().wait(1)) == "primary"
+
+    assert len(hedge_calls) == 2
+    assert hedger.snapshot()["hedges"] == 2
+
+
+def test_failures_fall_back_to_other_request_and_raise_primary_error():
+    hedger = make_hedger()
+    release = threading.Event()
+
+    def failing_primary(sent):
+        sent()
+        release.wait(5)
+        raise RuntimeError("primary failed")
+
+    def failing_hedge():
+        release.set()
+        raise ValueError("hedge failed")
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        hedger.call(failing_primary, failing_hedge)
+
+    def slow_then_fail(sent):
+        sent()
+        threading.Event().wait(0.05)
+        raise RuntimeError("primary failed")
+
+    assert hedger.call(slow_then_fail, lambda: "hedge") == "hedge"
+
+
+def test_local_queueing_does_not_trigger_hedges():
+    hedger = make_hedger()
+    hedge_calls = []
+
+    def queued(sent):
+        # waiting for a concurrency slot takes longer than the hedge delay, the provider itself is fast
+        threading.Event().wait(0.1)
+        sent()
+        return "primary"
+
+    def failed_before_sending(sent):
+        raise RuntimeError("no slot")
+
+    assert hedger.call(queued, lambda: hedge_calls.append(1) or "hedge") == "primary"
+    with pytest.raises(RuntimeError, match="no slot"):
+        hedger.call(failed_before_sending, lambda: hedge_calls.append(1) or "hedge")
+
+    assert hedge_calls == []
+    assert hedger.snapshot()["hedges"] == 0
+
+
+def test_classifier_hedges_slow_completion(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(Config, "LLM_HEDGE_PERCENTILE", 95)
+    monkeypatch.setattr(Config, "LLM_HEDGE_BUDGET", 1.0)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+
+    clf = MaterialClassifier()
+    release = threading.Event()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            # the first classification is fast, the second one hangs until its hedge has answered
+            release.wait(5)
+        content = '{"main_category":"气动","sub_category":"气缸"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+
+    assert clf.classify_material({"物料名称": "XQ-001"})["classification_source"] == "deepseek_api"
+    assert clf.classify_material({"物料名称": "XQ-002"})["classification_source"] == "deepseek_api"
+    release.set()
+
+    stats = MaterialClassifier.get_latency_stats()
+    assert len(calls) == 3
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"]) == (2, 1, 1)
+    assert stats["samples"] >= 2
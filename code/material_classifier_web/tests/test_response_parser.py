@@ -0,0 +1,88 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from response_parser import iter_json_object_spans, parse_classification_content
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+def test_plain_and_fenced_json():
+    expected = {"main_category": "气动", "sub_category": "气缸"}
+
+    assert parse_classification_content('{"main_category":"气动","sub_category":"气缸"}') == expected
+    assert parse_classification_content('```json\n{"main_category":"气动","sub_category":"气缸"}\n```') == expected
+
+
+def test_last_classification_object_wins_over_trailing_objects():
+    content = (
+        '思考：候选 {"main_category":"气动","sub_category":"气源系统/气源处理"} 不对，'
+        '最终结果 {"main_category":"气动","sub_category":"气缸","reason":"含{括号}的\\"说明\\""} '
+        '附加信息 {"confidence": 0.9}'
+    )
+
+    result = parse_classification_content(content)
+
+    assert result["sub_category"] == "气缸"
+    assert result["reason"] == '含{括号}的"说明"'
+
+
+def test_nested_objects_are_kept_whole():
+    spans = list(iter_json_object_spans('a {"x": {"y": 1}} b {"z": "}"} {unclosed'))
+
+    assert spans == [(2, 17), (20, 30)]
+
+
+def test_unclosed_brace_in_reasoning_does_not_hide_later_objects():
+    content = '思考：规则里写了{大类 后面 {"main_category":"气动","sub_category":"气缸"}'
+
+    assert parse_classification_content(content) == {"main_category": "气动", "sub_category": "气缸"}
+    # an unmatched quote inside the unclosed fragment is reset on the rescan as well
+    spans = list(iter_json_object_spans('{"x": 1} {说明" {"y": 2} {'))
+    assert spans == [(0, 8), (14, 22)]
+
+
+def test_error_messages():
+    with pytest.raises(ValueError, match="预期的对象格式"):
+        parse_classification_content('[{"main_category":"气动","sub_category":"气缸"}]')
+    with pytest.raises(ValueError, match="缺少必要字段"):
+        parse_classification_content('结果：{"main_category":"气动"}')
+    with pytest.raises(ValueError, match="未找到JSON对象"):
+        parse_classification_content("无法分类")
+
+
+def test_json_mode_requested_from_api(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    clf = MaterialClassifier()
+    requests = []
+
+    def fake_create(**kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}'))],
+            usage=None,
+        )
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+
+    monkeypatch.setattr(Config, "LLM_JSON_MODE", True)
+    clf._call_deepseek_api("物料名称=XQ-001")
+    monkeypatch.setattr(Config, "LLM_JSON_MODE", False)
+    clf._call_deepseek_api("物料名称=XQ-001")
+
+    assert requests[0]["response_format"] == {"type": "json_object"}
+    assert "response_format" not in requests[1]
+    assert requests[0]["model"] == "dummy-model"
+
+
+def test_category_id_response():
+    assert parse_classification_content('{"category_id": 137}') == {"category_id": 137}
+    assert parse_classification_content('思考过程 {"id": 1} 结论 {"category_id": 12}') == {"category_id": 12}
@@ -0,0 +1,81 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import rule_set
+from rule_set import RuleSet, load_rule_set, build_system_prompt
+
+
+def write_rules(path, rows):
+    df = pd.DataFrame(rows, columns=["序号", "一级分类", "二级分类", "关键字", "释义", "常用品牌"])
+    df.to_excel(path, index=False)
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.xlsx"
+    write_rules(path, [
+        [1, "传感器类", "温度传感器", "热电偶、温度传感器", "测温元件", "OMRON"],
+        [None, None, "接近传感器", "接近开关", "", "SICK"],
+    ])
+    return path
+
+
+def test_load_rule_set_builds_mapping_matcher_and_prompt(rules_file, tmp_path):
+    loaded = load_rule_set(str(rules_file), snapshot_file="")
+
+    assert isinstance(loaded, RuleSet)
+    assert ("传感器类", "接近传感器") in loaded.classification_mapping
+    assert loaded.keyword_matcher.match_by_keywords_and_brand({"物料名称": "接近开关"}) == ("传感器类", "接近传感器")
+    category_id = loaded.category_ids[("传感器类", "温度传感器")]
+    assert f"- [{category_id}] 大类：传感器类，二级类：温度传感器，关键词：热电偶、温度传感器，释义：测温元件，常用品牌：OMRON\n" in loaded.system_prompt
+    assert loaded.system_prompt == build_system_prompt(loaded.classification_mapping, loaded.category_ids)
+    assert len(loaded.version) == 64
+
+
+def test_snapshot_skips_excel_parsing_on_next_load(rules_file, tmp_path, monkeypatch):
+    snapshot = tmp_path / "cache" / "snapshot.pkl"
+    first = load_rule_set(str(rules_file), snapshot_file=str(snapshot))
+    assert snapshot.exists()
+
+    def fail_parse(path):
+        raise AssertionError("excel should not be parsed when the snapshot is valid")
+
+    monkeypatch.setattr(rule_set, "parse_classification_file", fail_parse)
+    second = load_rule_set(str(rules_file), snapshot_file=str(snapshot))
+
+    assert second.version == first.version
+    assert second.classification_mapping == first.classification_mapping
+    assert second.system_prompt == first.system_prompt
+
+
+def test_snapshot_rebuilt_when_spreadsheet_changes(rules_file, tmp_path):
+    snapshot = tmp_path / "snapshot.pkl"
+    first = load_rule_set(str(rules_file), snapshot_file=str(snapshot))
+
+    write_rules(rules_file, [[1, "气动类", "气缸（执行机构）", "气缸", "", ""]])
+    second = load_rule_set(str(rules_file), snapshot_file=str(snapshot))
+
+    assert second.version != first.version
+    assert list(second.classification_mapping) == [("气动类", "气缸（执行机构）")]
+
+
+def test_corrupt_snapshot_falls_back_to_excel(rules_file, tmp_path):
+    snapshot = tmp_path / "snapshot.pkl"
+    snapshot.write_bytes(b"not a pickle")
+
+    loaded = load_rule_set(str(rules_file), snapshot_file=str(snapshot))
+
+    assert len(loaded.classification_mapping) == 2
+
+
+def test_empty_rules_file_raises(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    write_rules(path, [])
+
+    with pytest.raises(ValueError):
+        load_rule_set(str(path), snapshot_file="")
@@ -0,0 +1,158 @@
+import os
+import sys
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+# make project modules importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from single_flight import AsyncSingleFlight, SingleFlight
+from material_classifier import MaterialClassifier
+from rate_limiter import RateLimiter
+from config import Config
+
+
+def wait_for_waiters(flight, key, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= count:
+                return
+        time.sleep(0.001)
+    raise AssertionError("waiters did not join the in-flight call")
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    outcomes = []
+    threads = [threading.Thread(target=lambda: outcomes.append(flight.do("key", work))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, "key", 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(outcomes) == [("result", False)] + [("result", True)] * 3
+    assert flight.in_flight() == 0
+
+
+def test_error_is_shared_and_key_released():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("API Error")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("key", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, "key", 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["API Error", "API Error"]
+    assert flight.do("key", lambda: "retry") == ("retry", False)
+
+
+def test_async_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        outcomes = await asyncio.gather(*(flight.do("key", work) for _ in range(4)))
+        return outcomes, flight.in_flight()
+
+    outcomes, in_flight = asyncio.run(run())
+
+    assert calls == [1]
+    assert sorted(outcomes) == [("result", False)] + [("result", True)] * 3
+    assert in_flight == 0
+
+
+def test_async_error_is_shared_and_key_released():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("API Error")
+
+    async def retry():
+        return "retry"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        outcomes = await asyncio.gather(flight.do("key", failing), flight.do("key", failing), return_exceptions=True)
+        return outcomes, await flight.do("key", retry)
+
+    outcomes, retried = asyncio.run(run())
+
+    assert [str(e) for e in outcomes] == ["API Error", "API Error"]
+    assert retried == ("retry", False)
+
+
+def test_duplicate_materials_trigger_one_api_call(monkeypatch):
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "testkey")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_URL", "https://example.com/api")
+    monkeypatch.setattr(Config, "DEEPSEEK_MODEL", "dummy-model")
+    monkeypatch.setattr(MaterialClassifier, "_rate_limiter", RateLimiter())
+    flight = SingleFlight()
+    monkeypatch.setattr(MaterialClassifier, "_single_flight", flight)
+
+    clf = MaterialClassifier()
+    release = threading.Event()
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"main_category":"PLC/IO模块/柜体","sub_category":"PLC"}'))],
+            usage=None,
+        )
+
+    monkeypatch.setattr(clf, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))))
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(clf.classify_material({"物料名称": "XQ-001"})))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while not flight.in_flight() and time.time() < deadline:
+        time.sleep(0.001)
+    wait_for_waiters(flight, next(iter(flight._calls)), 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert [r["sub_category"] for r in results] == ["PLC"] * 3
+    assert results[0] is not results[1]
@@ -8,7 +8,6 @@
 import sys
 import io
 import pandas as pd
-import time
 import concurrent.futures
 import threading
 from datetime import datetime
@@ -223,13 +222,13 @@ class ClassifierValidator:
                 'error': str(e)
             }
 
-    def validate_batch(self, max_samples: int = None, max_workers: int = 5) -> List[Dict]:
+    def validate_batch(self, max_samples: int = None, max_workers: int = None) -> List[Dict]:
         """
         批量验证
 
         参数:
             max_samples: 最大样本数(None表示全部)
-            max_workers: 最大线程数，默认为5
+            max_workers: 最大线程数，默认为Config.LLM_MAX_CONCURRENCY（实际的大模型并发由分类器自适应控制）
 
         返回:
             验证结果列表
@@ -246,6 +245,7 @@ class ClassifierValidator:
             samples = self.validation_data
         total_samples = len(samples)
 
+        max_workers = max_workers or Config.LLM_MAX_CONCURRENCY
         logger.info(f"开始批量验证: 共 {total_samples} 个样本，使用 {max_workers} 个线程")
 
         # 创建线程安全的结果列表和锁
@@ -258,12 +258,16 @@ class ClassifierValidator:
         # 保存临时文件路径，用于后续清理
         self.temp_files.append(temp_result_file)
 
-        # 线程函数，用于初始化自己的MaterialClassifier实例并处理单个物料
+        # 每个工作线程持有一个分类器句柄（规则集和API客户端在句柄之间共享）
+        thread_state = threading.local()
+
+        # 线程函数，使用本线程的分类器句柄处理单个物料
         def process_material(idx, material_data):
 
             try:
-                # 为每个线程创建独立的MaterialClassifier实例
-                classifier = MaterialClassifier()
+                classifier = getattr(thread_state, "classifier", None)
+                if classifier is None:
+                    classifier = thread_state.classifier = MaterialClassifier()
 
                 logger.info(f"进度: {idx+1}/{total_samples}")
                 result = self.validate_single(material_data, classifier=classifier)
@@ -273,9 +277,6 @@ class ClassifierValidator:
                     results.append(result)
                     self._write_result_to_file(temp_result_file, result)
 
-                # API调用间隔
-                time.sleep(Config.API_RATE_LIMIT)
-
             except Exception as e:
                 logger.error(f"处理物料失败: {material_data['物料名称']} - {e}")
                 # 即使失败也记录结果